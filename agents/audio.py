@@ -1,6 +1,14 @@
+import os
+import re
+import queue
+import uuid
+from typing import Callable, Optional
 from schemas.state import AgentState
 from schemas.audio import AudioMetadata
 from utils import structured_generator
+from tracing import span
+from token_budget import compact, with_legend
+from speculation import speculate, take, fingerprint, speculation_key
 
 SYSTEM_PROMPT = """
 You are an audio director for educational content.
@@ -31,6 +39,15 @@ Output STRICT JSON following this schema:
 
 
 
+def generate_audio_metadata(script, storyboard) -> AudioMetadata:
+    """Times the narration against the storyboard; no session side effects."""
+    return structured_generator(
+        system_prompt=SYSTEM_PROMPT,
+        user_prompt=with_legend(f"Generate audio timing for:\nNarration: {script.narration}\nVisuals: {compact(storyboard)}"),
+        output_schema=AudioMetadata,
+        agent="audio"
+    )
+
 def audio_agent(state: AgentState) -> AgentState:
     """Data processing node for the Audio Agent."""
     script = state["current_script"]
@@ -47,31 +64,119 @@ def audio_agent(state: AgentState) -> AgentState:
         cached = session.get_cached(cache_key)
         audio_meta = AudioMetadata(**cached)
     else:
-        audio_meta = structured_generator(
-            system_prompt=SYSTEM_PROMPT,
-            user_prompt=f"Generate audio timing for:\nNarration: {script.narration}\nVisuals: {storyboard.model_dump_json()}",
-            output_schema=AudioMetadata
-        )
+        # Started while the critic was reviewing this storyboard, if SPECULATE=1
+        audio_meta = take("audio", speculation_key(session, index), fingerprint(script, storyboard))
+        if audio_meta is None:
+            audio_meta = generate_audio_metadata(script, storyboard)
         if session:
             session.set_cached(cache_key, audio_meta.model_dump())
             print(f"--- AUDIO: Metadata cached ---")
     
+    return {"current_audio_metadata": audio_meta}
+
+def spoken_fingerprint(text: str) -> str:
+    """Fingerprint of a narration with whitespace normalized, to compare it with the spoken sentences."""
+    return fingerprint(re.sub(r"\s+", " ", text).strip())
+
+def _remove_parts(parts):
+    for part in parts:
+        try:
+            os.remove(part)
+        except FileNotFoundError:
+            pass
+
+def stream_narration_to_tts(session, index: int, stream) -> Callable[[Optional[str]], None]:
+    """Synthesizes the narration sentence by sentence while the teacher is still streaming it.
+
+    Each finished sentence of `narration` is spoken into its own part file;
+    `tts_agent` joins the parts if the sentences actually spoken add up to
+    the final narration. Call the returned function with the final
+    narration, or None on failure. MP3 streams concatenate cleanly; gTTS
+    itself joins its chunks this way. Synthesis runs on its own thread, not
+    a speculation worker, since it lasts as long as the teacher's call.
+    """
+    if not session:
+        return lambda narration: None
+    sentences = queue.Queue()
+    audio_dir = session.get_path("audio")
+    # Parts of an earlier attempt that is being cancelled must not share names with this one
+    stream_id = uuid.uuid4().hex[:8]
+
+    def synthesize(cancel):
+        from gtts import gTTS
+        audio_dir.mkdir(parents=True, exist_ok=True)
+        parts, spoken = [], []
+        while True:
+            try:
+                kind, text = sentences.get(timeout=0.2)
+            except queue.Empty:
+                if cancel.is_set():
+                    _remove_parts(parts)
+                    return None
+                continue
+            if kind == "restart":
+                _remove_parts(parts)
+                parts, spoken = [], []
+            elif kind == "done":
+                if text is None:
+                    _remove_parts(parts)
+                    return None
+                return spoken_fingerprint(" ".join(spoken)), parts
+            elif not cancel.is_set():
+                path = str(audio_dir / f"step_{index}_part_{stream_id}_{len(parts)}.mp3")
+                try:
+                    with span("tts.sentence", cat="tts", step=index, chars=len(text)):
+                        gTTS(text=text, lang='en', slow=False).save(path)
+                except Exception:
+                    _remove_parts(parts + [path])
+                    raise
+                parts.append(path)
+                spoken.append(text)
+
+    speculate("tts", speculation_key(session, index), None, synthesize, dedicated=True)
+    stream.on_sentence("narration", lambda sentence: sentences.put(("sentence", sentence)))
+    stream.on_restart(lambda: sentences.put(("restart", None)))
+    return lambda narration: sentences.put(("done", narration))
+
+def tts_agent(state: AgentState) -> AgentState:
+    """Synthesizes the narration as soon as the script exists.
+
+    Runs as its own graph branch alongside the storyboard/critic loop; the
+    narration doesn't change once the teacher has written it.
+    """
+    script = state["current_script"]
+    session = state.get("session")
+    index = state.get("current_step_index", 0)
+
     # Generate actual audio file using TTS
     audio_file_path = None
     if session:
         try:
-            from gtts import gTTS
-            import os
-            
             # Create audio file
             audio_dir = session.get_path("audio")
             audio_dir.mkdir(parents=True, exist_ok=True)
-            audio_file_path = str(audio_dir / f"scene_{storyboard.scene_id}.mp3")
+            audio_file_path = str(audio_dir / f"scene_{script.step_id}.mp3")
             
-            # Generate TTS
-            print(f"--- AUDIO: Generating speech file... ---")
-            tts = gTTS(text=script.narration, lang='en', slow=False)
-            tts.save(audio_file_path)
+            # Sentences synthesized while the teacher was streaming (STREAM_OUTPUT=1)
+            parts = take("tts", speculation_key(session, index), spoken_fingerprint(script.narration))
+            # Sentences of streams that went stale, failed or were replaced by a retry
+            _remove_parts(p for p in audio_dir.glob(f"step_{index}_part_*.mp3") if str(p) not in (parts or []))
+            if parts:
+                print(f"--- AUDIO: Joining {len(parts)} sentences spoken while streaming ---")
+                with open(audio_file_path, "wb") as out:
+                    for part in parts:
+                        with open(part, "rb") as f:
+                            out.write(f.read())
+                        os.remove(part)
+            else:
+                from gtts import gTTS
+
+                # Generate TTS
+                print(f"--- AUDIO: Generating speech file... ---")
+                with span("tts", cat="tts", step=index, chars=len(script.narration)) as tts_span:
+                    tts = gTTS(text=script.narration, lang='en', slow=False)
+                    tts.save(audio_file_path)
+                    tts_span.set(bytes=os.path.getsize(audio_file_path))
             print(f"--- AUDIO: Successfully saved to {audio_file_path} ---")
             
             # Verify file was created
@@ -91,8 +196,4 @@ def audio_agent(state: AgentState) -> AgentState:
     else:
         print("--- AUDIO: Warning - No session manager, skipping audio file generation ---")
     
-    return {
-        "current_audio_metadata": audio_meta,
-        "audio_file_path": audio_file_path
-    }
-
+    return {"audio_file_path": audio_file_path}
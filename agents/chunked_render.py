@@ -0,0 +1,132 @@
+import os
+import subprocess
+import tempfile
+from typing import List, Optional, Tuple
+from tracing import span
+
+# Chunked rendering of long scenes (RENDER_CHUNKS). One Manim process renders
+# a scene serially, so a long scene is cut into chunks of consecutive
+# animations, rendered by parallel Manim processes with `-n first,last`, and
+# stitched with ffmpeg's concat demuxer without re-encoding.
+#
+# Manim runs construct() from the start in every chunk and skips drawing the
+# animations before `first`, so each chunk starts from exactly the mobject
+# state the full scene has at that point. Cuts are placed on narration
+# segment boundaries (AudioMetadata.segments), mapped to animations through
+# the run times recorded by the last-frame preview (see
+# agents/renderer.render_preview). The frames on both sides of every join are
+# compared before the chunks are accepted.
+
+DEFAULT_MIN_SECONDS = 20.0     # Shorter scenes don't amortise the extra Manim start-ups
+DEFAULT_JOIN_THRESHOLD = 0.03  # Mean absolute difference (0-1) of the frames at a join
+JOIN_FRAME_SIZE = (64, 36)     # Frames are compared downscaled to grayscale
+
+def chunk_count() -> int:
+    """Maximum number of chunks per scene: RENDER_CHUNKS, "auto" for one per core, 0 to disable."""
+    value = os.getenv("RENDER_CHUNKS", "0")
+    if value == "auto":
+        return os.cpu_count() or 1
+    return int(value or 0)
+
+def min_chunked_seconds() -> float:
+    return float(os.getenv("RENDER_CHUNK_MIN_SECONDS", DEFAULT_MIN_SECONDS))
+
+def animation_run_times(layout: Optional[dict]) -> List[float]:
+    """Run time of each play()/wait() in order, from a preview layout; [] if not recorded."""
+    if not layout:
+        return []
+    snapshots = [s for s in layout.get("snapshots", []) if s.get("animation") is not None]
+    if any(s.get("run_time") is None for s in snapshots):
+        return []
+    return [float(s["run_time"]) for s in snapshots]
+
+def plan_chunks(run_times: List[float], cut_times: List[float], max_chunks: int) -> List[Tuple[int, Optional[int]]]:
+    """Splits the animations into at most `max_chunks` ranges of similar duration.
+
+    Cuts only go before an animation starting near one of `cut_times`. Ranges
+    are (first, last) animation numbers; the last range is open-ended
+    (last=None) so animations the preview didn't see are still rendered.
+    """
+    starts, total = [], 0.0
+    for run_time in run_times:
+        starts.append(total)
+        total += run_time
+    candidates = set()
+    for t in cut_times:
+        if 0 < t < total:
+            candidates.add(min(range(1, len(starts)), key=lambda i: abs(starts[i] - t), default=None))
+    candidates.discard(None)
+    if max_chunks < 2 or not candidates:
+        return [(0, None)]
+    cuts = set()
+    for k in range(1, max_chunks):
+        ideal = total * k / max_chunks
+        cuts.add(min(candidates, key=lambda i: abs(starts[i] - ideal)))
+    bounds = [0, *sorted(cuts)]
+    return [(first, bounds[n + 1] - 1 if n + 1 < len(bounds) else None) for n, first in enumerate(bounds)]
+
+def _gray_frames(video_path: str, input_args: List[str], output_args: List[str]) -> Optional[bytes]:
+    """Decodes frames of a video to downscaled grayscale bytes, or None if ffmpeg failed."""
+    width, height = JOIN_FRAME_SIZE
+    fd, raw_path = tempfile.mkstemp(suffix=".gray")
+    os.close(fd)
+    try:
+        subprocess.run(["ffmpeg", "-y", "-v", "error", *input_args, "-i", video_path, *output_args,
+                        "-vf", f"scale={width}:{height}", "-pix_fmt", "gray", "-f", "rawvideo", raw_path],
+                       check=True, capture_output=True)
+        with open(raw_path, "rb") as f:
+            return f.read()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    finally:
+        os.remove(raw_path)
+
+def join_difference(before_path: str, after_path: str) -> Optional[float]:
+    """Mean absolute difference (0-1) between the last frame of one chunk and the first of the next.
+
+    Consecutive animations continue from the same mobject state, so a large
+    difference means a chunk did not start where the previous one ended.
+    Returns None when the frames could not be decoded.
+    """
+    width, height = JOIN_FRAME_SIZE
+    size = width * height
+    # The last half second of the first chunk; its final frame is the join
+    last = _gray_frames(before_path, ["-sseof", "-0.5"], [])
+    first = _gray_frames(after_path, [], ["-frames:v", "1"])
+    if not last or not first or len(last) % size or len(first) != size:
+        return None
+    last = last[-size:]
+    return sum(abs(a - b) for a, b in zip(last, first)) / (255.0 * size)
+
+def join_threshold() -> float:
+    return float(os.getenv("RENDER_CHUNK_JOIN_THRESHOLD", DEFAULT_JOIN_THRESHOLD))
+
+def stitch(chunk_paths: List[str], output_path: str, index: int = 0):
+    """Concatenates the chunk videos without re-encoding; raises CalledProcessError on failure."""
+    list_path = os.path.splitext(output_path)[0] + "_chunks.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in chunk_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    with span("ffmpeg.stitch", cat="subprocess", step=index, chunks=len(chunk_paths)):
+        subprocess.run(["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_path],
+                       check=True, capture_output=True)
+
+def merge_profiles(profiles: List[dict], elapsed: float) -> dict:
+    """One render profile for the whole scene from the chunks' profiles (see render_profile.py)."""
+    animations = sorted((a for p in profiles for a in p["animations"]), key=lambda a: a["index"])
+    animation_s = sum(p["animation_s"] for p in profiles)
+    glyphs = [p["glyph_cache"] for p in profiles if p.get("glyph_cache")]
+    merged = {
+        "returncode": 0,
+        "total_s": elapsed,
+        "animation_s": animation_s,
+        # Summed over chunks that ran in parallel, so it can exceed total_s
+        "overhead_s": sum(p["overhead_s"] for p in profiles),
+        "frames": sum(p["frames"] for p in profiles),
+        "animations": animations,
+        "cached_animations": sorted(i for p in profiles for i in p["cached_animations"]),
+        "chunks": len(profiles),
+    }
+    if glyphs:
+        merged["glyph_cache"] = {name: sum(g[name] for g in glyphs) for name in glyphs[0]}
+    return merged
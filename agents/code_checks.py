@@ -0,0 +1,111 @@
+import ast
+import builtins
+import functools
+import importlib.util
+from typing import Dict, List, Optional, Set
+from pydantic import BaseModel
+
+# Fast, local checks of generated Manim code. Used to pick a winner among
+# best-of-N codegen candidates without an LLM review:
+# - the code parses and defines `GeneratedScene.construct`;
+# - it imports manim the way the codegen prompt requires;
+# - global names and attributes of Manim classes resolve against the installed
+#   Manim (e.g. `Axes.get_graph`, removed in Manim Community). On instances
+#   only called methods are checked: data attributes such as `axes.x_axis`
+#   or `mob.points` are set in __init__ and don't exist on the class. Skipped
+#   when Manim isn't importable in this process.
+
+SCENE_CLASS = "GeneratedScene"
+
+class CodeCheck(BaseModel):
+    passed: bool
+    issues: List[str]
+    api_checked: bool = False
+
+@functools.lru_cache(maxsize=1)
+def manim_namespace() -> Optional[Dict[str, object]]:
+    """Names exported by `from manim import *`, or None if Manim isn't installed."""
+    if importlib.util.find_spec("manim") is None:
+        return None
+    import manim
+    names = getattr(manim, "__all__", None) or [n for n in dir(manim) if not n.startswith("_")]
+    return {name: getattr(manim, name) for name in names if hasattr(manim, name)}
+
+def _defined_names(tree: ast.AST) -> Set[str]:
+    defined = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            defined.add(node.name)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            defined.add(node.id)
+        elif isinstance(node, ast.arg):
+            defined.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                defined.add((alias.asname or alias.name).split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            defined.add(node.name)
+    return defined
+
+def _star_imports(tree: ast.AST) -> Set[str]:
+    return {
+        node.module for node in ast.walk(tree)
+        if isinstance(node, ast.ImportFrom) and node.module and any(a.name == "*" for a in node.names)
+    }
+
+def _api_issues(tree: ast.AST, namespace: Dict[str, object]) -> List[str]:
+    issues = []
+    defined = _defined_names(tree) | set(dir(builtins))
+    # Variables bound directly to a Manim class instance, e.g. `axes = Axes(...)`
+    instances = {}
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+                and isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Name)
+                and isinstance(namespace.get(node.value.func.id), type)):
+            instances[node.targets[0].id] = namespace[node.value.func.id]
+
+    called = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+
+    reported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            if node.id not in defined and node.id not in namespace and node.id not in reported:
+                reported.add(node.id)
+                issues.append(f"line {node.lineno}: `{node.id}` is not defined and is not part of Manim")
+        elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            owner = node.value.id
+            target = namespace.get(owner) if owner not in defined else None
+            if target is None and owner in instances and id(node) in called:
+                # Methods resolve on the class; instance attributes don't
+                target, owner = instances[owner], f"{owner} ({instances[owner].__name__})"
+            if target is None or not isinstance(target, type) or isinstance(node.ctx, ast.Store):
+                continue
+            key = f"{owner}.{node.attr}"
+            if key not in reported and not hasattr(target, node.attr):
+                reported.add(key)
+                issues.append(f"line {node.lineno}: `{key}` does not exist in the installed Manim")
+    return issues
+
+@functools.lru_cache(maxsize=64)
+def check_code(code: str) -> CodeCheck:
+    """Parses the code and resolves its Manim API usage."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return CodeCheck(passed=False, issues=[f"line {e.lineno}: SyntaxError: {e.msg}"])
+
+    issues = []
+    if not any(isinstance(n, ast.ImportFrom) and n.module == "manim" for n in ast.walk(tree)):
+        issues.append("Missing `from manim import *`.")
+    scene = next((n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == SCENE_CLASS), None)
+    if scene is None:
+        issues.append(f"No `{SCENE_CLASS}` class is defined.")
+    elif not any(isinstance(n, ast.FunctionDef) and n.name == "construct" for n in scene.body):
+        issues.append(f"`{SCENE_CLASS}` has no `construct` method.")
+
+    namespace = manim_namespace()
+    # Other star imports could define anything; don't guess
+    api_checked = namespace is not None and _star_imports(tree) <= {"manim"}
+    if api_checked:
+        issues.extend(_api_issues(tree, namespace))
+    return CodeCheck(passed=not issues, issues=issues, api_checked=api_checked)
@@ -1,6 +1,15 @@
+import time
 from pydantic import BaseModel
 from schemas.state import AgentState
 from utils import structured_generator, get_gemini_llm
+from token_budget import compact, with_legend
+from iteration_budget import step_difficulty, should_review, record_review
+from agents.renderer import render_scene, scene_module_name
+from agents.code_checks import check_code
+from agents.manim_codegen import codegen_candidates
+from pipeline_stats import get_stats
+from speculation import speculation_enabled, speculate, discard, fingerprint, speculation_key
+from work_queue import runs_locally
 
 SYSTEM_PROMPT = """
 You are a strict Python Code Reviewer for Manim animations.
@@ -31,7 +40,7 @@ def code_critic_agent(state: AgentState) -> AgentState:
     """Nodes for the Code Critic Agent.
     
     This agent uses Gemini to review the generated Manim code.
-    It runs for a maximum of 2 iterations to catch errors.
+    The number of iterations is chosen by `iteration_budget` from history.
     """
     code = state.get("manim_code", "")
     storyboard = state.get("current_storyboard")
@@ -52,29 +61,50 @@ def code_critic_agent(state: AgentState) -> AgentState:
         if "code_approved" in result:
             return result
 
-    MAX_ITERATIONS = 2
+    difficulty = step_difficulty(state)
+    started = state.get("code_started_at")
+    review, reason = should_review("code_critic", difficulty, iterations, time.time() - started if started else None)
     
-    print(f"--- CODE CRITIC: Reviewing code (turn {iterations + 1}/{MAX_ITERATIONS}) ---")
-    
-    # Check strict cycle limit
-    if iterations >= MAX_ITERATIONS:
-        print(f"--- CODE CRITIC: Limit reached ({MAX_ITERATIONS}). Force approving to proceed. ---")
+    # Check adaptive cycle limit
+    if not review:
+        print(f"--- CODE CRITIC: Limit reached ({reason}). Force approving to proceed. ---")
         result = {
             "code_approved": True,
             "code_critique_feedback": "Force approved after max iterations.",
+            "code_forced": True,
             # We don't increment iterations further to avoid confusion, 
             # though the loop should have stopped anyway.
         }
         if session: session.set_cached(cache_key, result)
         return result
 
+    print(f"--- CODE CRITIC: Reviewing code ({reason}) ---")
+
+    # Pre-render while the review is in flight; the renderer commits it on approval.
+    # The "_spec" module keeps it from clobbering files of a real render.
+    key = speculation_key(session, index)
+    rendered = session and session.has_cached(f"step_{index}_mp4_file_path")
+    if speculation_enabled() and runs_locally("renderer") and storyboard is not None and not rendered:
+        speculate("render", key, fingerprint(code, storyboard), render_scene, code, storyboard, session, index,
+                  scene_module_name(storyboard, session, "_spec"))
+
     gemini_llm = get_gemini_llm()
+
+    # Best-of-N codegen already ran the local checks; pass on what they found
+    candidates = codegen_candidates()
+    local_issues = check_code(code).issues if candidates > 1 else []
+    # What the last-frame preview found in the previous version (see renderer._preview_gate)
+    failure = state.get("render_failure")
+    preview_notes = failure["details"] if failure and failure["reason"] in ("layout", "preview_error") else ""
     
     response = structured_generator(
         system_prompt=SYSTEM_PROMPT,
-        user_prompt=f"Review this Manim Code:\nCODE:\n```python\n{code}\n```\n\nStoryboard: {storyboard.model_dump_json() if storyboard else 'N/A'}",
+        user_prompt=with_legend(f"Review this Manim Code:\nCODE:\n```python\n{code}\n```\n\nStoryboard: {compact(storyboard) if storyboard else 'N/A'}"
+                                + (f"\nLOCAL CHECKS: {' '.join(local_issues)}" if local_issues else "")
+                                + (f"\nPREVIOUS PREVIEW (verify it is fixed): {preview_notes}" if preview_notes else "")),
         output_schema=CodeCriticResponse,
-        llm=gemini_llm
+        llm=gemini_llm,
+        agent="code_critic"
     )
     
     if response.approved:
@@ -86,12 +116,21 @@ def code_critic_agent(state: AgentState) -> AgentState:
         }
     else:
         print(f"--- CODE CRITIC: REJECTED: {response.feedback} ---")
+        discard("render", key)
         result = {
             "code_approved": False,
             "code_critique_feedback": response.feedback,
             "code_critic_iterations": iterations + 1 # Increment for state tracking
         }
     
+    record_review("code_critic", difficulty, iterations, response.approved)
+    if iterations == 0:
+        # First-review approval rate per candidate count (see manim_codegen._best_of)
+        stats = get_stats()
+        stats.increment(f"codegen.best_of.{candidates}.reviewed")
+        if response.approved:
+            stats.increment(f"codegen.best_of.{candidates}.approved")
+    
     if session:
         session.set_cached(cache_key, result)
         
@@ -1,6 +1,7 @@
 import os
 import subprocess
 from schemas.state import AgentState
+from tracing import span
 
 def concatenator_agent(state: AgentState) -> AgentState:
     """Concatenates all generated video segments into a final video."""
@@ -11,7 +12,8 @@ def concatenator_agent(state: AgentState) -> AgentState:
         print("--- CONCATENATOR: Missing session or curriculum, cannot concat ---")
         return {}
 
-    video_dir = session.get_path("videos")
+    # Absolute paths: ffmpeg runs inside the video directory below
+    video_dir = session.get_path("videos").resolve()
     output_filename = "final_complete_video.mp4"
     final_output_path = video_dir / output_filename
     
@@ -66,7 +68,9 @@ def concatenator_agent(state: AgentState) -> AgentState:
         ]
         
         # Run in the video directory so relative paths in text file work
-        subprocess.run(cmd, check=True, cwd=str(video_dir), capture_output=True)
+        with span("ffmpeg.concat", cat="subprocess", inputs=len(input_files)) as concat_span:
+            subprocess.run(cmd, check=True, cwd=str(video_dir), capture_output=True)
+            concat_span.set(bytes=os.path.getsize(final_output_path))
         
         print(f"--- CONCATENATOR: Success! Final video: {final_output_path} ---")
         return {"mp4_file_path": str(final_output_path)}
@@ -1,6 +1,17 @@
+import time
 from pydantic import BaseModel
 from schemas.state import AgentState
 from utils import structured_generator
+from token_budget import compact, with_legend
+from agents.precritic import precritique
+from agents.storyboard import storyboard_mode
+from pipeline_stats import get_stats
+from iteration_budget import step_difficulty, should_review, record_review
+from agents.audio import generate_audio_metadata
+from agents.manim_codegen import generate_manim_code, codegen_fingerprint
+from schemas.audio import AudioMetadata
+from speculation import speculation_enabled, speculate, discard, fingerprint, speculation_key
+from work_queue import runs_locally
 
 SYSTEM_PROMPT = """
 You are a strict reviewer for educational animations.
@@ -25,6 +36,54 @@ class CriticResponse(BaseModel):
     approved: bool
     feedback: str
 
+def _record_outcome(state: AgentState, result: dict, forced: bool = False):
+    """Records per-mode approval and latency stats to compare fused vs loop."""
+    if not forced:
+        record_review("critic", step_difficulty(state), state.get("critic_iterations", 0), result["approved"])
+    if not result["approved"]:
+        return
+    stats = get_stats()
+    mode = storyboard_mode()
+    stats.increment(f"storyboard.{mode}.steps")
+    if forced:
+        stats.increment(f"storyboard.{mode}.forced")
+    elif state.get("critic_iterations", 0) == 0:
+        stats.increment(f"storyboard.{mode}.first_pass")
+    started = state.get("storyboard_started_at")
+    if started:
+        stats.add_sample(f"storyboard.{mode}.latency", time.time() - started)
+
+def _speculate_downstream(state: AgentState, key: str):
+    """Starts audio timing and codegen for the storyboard under review (SPECULATE=1).
+
+    Results are committed by the audio and manim nodes if the storyboard is
+    approved and discarded here if it is rejected.
+    """
+    if not speculation_enabled() or not (runs_locally("audio") and runs_locally("manim")):
+        return
+    script = state["current_script"]
+    storyboard = state["current_storyboard"]
+    session = state.get("session")
+    index = state.get("current_step_index", 0)
+
+    audio_key = f"step_{index}_audio_metadata"
+    if session and session.has_cached(audio_key):
+        cached_audio, audio = AudioMetadata(**session.get_cached(audio_key)), None
+    else:
+        cached_audio = None
+        audio = speculate("audio", key, fingerprint(script, storyboard),
+                          lambda cancel: generate_audio_metadata(script, storyboard))
+    if session and session.has_cached(f"step_{index}_manim_code_0"):
+        return
+
+    def codegen(cancel):
+        audio_meta = cached_audio or audio.future.result()
+        if cancel.is_set():
+            return None
+        return codegen_fingerprint(storyboard, audio_meta), generate_manim_code(storyboard, audio_meta, session=session)
+
+    speculate("manim", key, None, codegen)
+
 def critic_agent(state: AgentState) -> AgentState:
     """Data processing node for the Critic Agent."""
     script = state["current_script"]
@@ -42,29 +101,79 @@ def critic_agent(state: AgentState) -> AgentState:
             return {
                 "approved": True,
                 "critique_feedback": cached.get("critique_feedback"),
-                "critic_iterations": 0
+                "critic_iterations": 0,
+                "critic_forced": cached.get("critic_forced", False)
             }
     
-    MAX_ITERATIONS = 2  # Prevent infinite loops with local LLMs
-    
-    print(f"--- CRITIC: Reviewing scene {storyboard.scene_id} (iteration {iterations + 1}/{MAX_ITERATIONS}) ---")
+    # The iteration budget adapts to history to prevent wasted loops with local LLMs
+    difficulty = step_difficulty(state)
+    started = state.get("storyboard_started_at")
+    review, reason = should_review("critic", difficulty, iterations, time.time() - started if started else None)
     
-    # Force approve after max iterations
-    if iterations >= MAX_ITERATIONS:
-        print(f"--- CRITIC: FORCE APPROVED after {MAX_ITERATIONS} iterations ---")
+    # Force approve once the budget is spent
+    if not review:
+        print(f"--- CRITIC: FORCE APPROVED after {iterations} iterations ({reason}) ---")
+        result = {
+            "approved": True,
+            "critique_feedback": f"Approved after {iterations} review iterations",
+            "critic_iterations": 0,
+            "critic_forced": True
+        }
+        _record_outcome(state, result, forced=True)
+        if session:
+            session.set_cached(cache_key, result)
+        return result
+
+    print(f"--- CRITIC: Reviewing scene {storyboard.scene_id} ({reason}) ---")
+
+    # Cheap structural review first; only ambiguous storyboards reach the LLM
+    pre = precritique(script, storyboard)
+    stats = get_stats()
+    stats.increment(f"precritic.{pre.verdict}")
+    reviewed = sum(stats.get(f"precritic.{v}") for v in ("approve", "reject", "ambiguous"))
+    skipped = reviewed - stats.get("precritic.ambiguous")
+    print(f"--- CRITIC: Pre-critic {pre.verdict.upper()} (confidence {pre.confidence:.2f}); "
+          f"LLM skip rate {skipped}/{reviewed} ---")
+
+    # A fused storyboard that passed its own critique only needs the pre-check
+    if pre.verdict == "approve" or (state.get("self_approved") and pre.verdict != "reject"):
+        source = "structural pre-check" if pre.verdict == "approve" else "fused self-critique"
+        print(f"--- CRITIC: APPROVED by {source} ---")
         result = {
             "approved": True,
-            "critique_feedback": f"Approved after {MAX_ITERATIONS} review iterations",
+            "critique_feedback": f"Approved by {source}.",
             "critic_iterations": 0
         }
+        _record_outcome(state, result)
         if session:
             session.set_cached(cache_key, result)
         return result
-    
+
+    if pre.verdict == "reject":
+        feedback = " ".join(pre.issues)
+        print(f"--- CRITIC: REJECTED (pre-check): {feedback} ---")
+        result = {
+            "approved": False,
+            "critique_feedback": feedback,
+            "critic_iterations": iterations + 1
+        }
+        # Recorded like the pre-check approvals, so per-iteration approval rates aren't biased upward
+        _record_outcome(state, result)
+        if session:
+            session.set_cached(cache_key, result)
+        return result
+
+    key = speculation_key(session, index)
+    _speculate_downstream(state, key)
+
     response = structured_generator(
         system_prompt=SYSTEM_PROMPT,
-        user_prompt=f"Review this Pair:\nSCRIPT: {script.model_dump_json()}\nSTORYBOARD: {storyboard.model_dump_json()}",
-        output_schema=CriticResponse
+        user_prompt=with_legend(
+            f"Review this Pair:\nSCRIPT: {compact(script)}\nSTORYBOARD: {compact(storyboard)}"
+            + (f"\nSTRUCTURAL NOTES: {' '.join(pre.issues)}" if pre.issues else "")
+        ),
+        output_schema=CriticResponse,
+        agent="critic"
     )
     
     # Process result
@@ -77,11 +186,14 @@ def critic_agent(state: AgentState) -> AgentState:
         }
     else:
         print(f"--- CRITIC: REJECTED: {response.feedback} ---")
+        discard("audio", key)
+        discard("manim", key)
         result = {
             "approved": False,
             "critique_feedback": response.feedback,
             "critic_iterations": iterations + 1
         }
+    _record_outcome(state, result)
         
     # Cache the result
     if session:
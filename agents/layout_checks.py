@@ -0,0 +1,85 @@
+import os
+from typing import List, Optional
+from render_profile import MANIM_TYPES
+
+# Layout checks on the mobject bounding boxes recorded by a preview render
+# (see agents/renderer.render_preview). The preview snapshots the top-level
+# mobjects after every animation and at the end of the scene:
+#
+#   {"frame": [w, h], "three_d": false,
+#    "snapshots": [{"animation": 0, "mobjects": [{"class": "Text", "text": "f(x)", "box": [x0, y0, x1, y1]}]}]}
+#
+# Flagged: mobjects extending past the frame, and text overlapping other
+# text, dots or arrows.
+
+EDGE_TOLERANCE = 0.1     # Scene units a mobject may extend past the frame
+MAX_ISSUES = 6
+OVERLAP_TYPES = {"text", "dot", "arrow"}   # Containers, axes, lines and surfaces overlap by design
+
+def overlap_threshold() -> float:
+    """Fraction of the smaller box that must be covered to count as overlapping."""
+    return float(os.getenv("LAYOUT_OVERLAP", "0.3"))
+
+def _describe(mobject: dict, storyboard) -> str:
+    name = mobject["class"]
+    text = mobject.get("text")
+    if text:
+        name = f"{name} '{text[:30]}'"
+        for obj in storyboard.objects if storyboard else []:
+            if obj.label and obj.label.strip() == text.strip():
+                return f"object '{obj.id}' ({name})"
+    return name
+
+def _area(box) -> float:
+    return max(box[2] - box[0], 0.0) * max(box[3] - box[1], 0.0)
+
+def _coverage(a, b) -> float:
+    """Intersection area over the smaller box's area."""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    smaller = min(_area(a), _area(b))
+    return width * height / smaller if smaller else 0.0
+
+def _edges(box, width: float, height: float) -> List[str]:
+    edges = []
+    for side, overflow in (("left", -width / 2 - box[0]), ("right", box[2] - width / 2),
+                           ("bottom", -height / 2 - box[1]), ("top", box[3] - height / 2)):
+        if overflow > EDGE_TOLERANCE:
+            edges.append(f"{overflow:.1f} units past the {side} edge")
+    return edges
+
+def check_layout(layout: Optional[dict], storyboard=None) -> List[str]:
+    """Returns concrete layout problems, or [] if there are none or no layout was recorded."""
+    if not layout or not layout.get("snapshots"):
+        return []
+    width, height = layout["frame"]
+    threshold = overlap_threshold()
+    issues, seen = [], set()
+
+    def report(key, message):
+        if key not in seen:
+            seen.add(key)
+            issues.append(message)
+
+    for snapshot in layout["snapshots"]:
+        when = "at the end" if snapshot.get("animation") is None else f"after animation {snapshot['animation']}"
+        mobjects = [m for m in snapshot["mobjects"] if _area(m["box"]) > 0 or m.get("text")]
+        if not layout.get("three_d"):
+            for m in mobjects:
+                edges = _edges(m["box"], width, height)
+                if edges:
+                    name = _describe(m, storyboard)
+                    report(("edge", name), f"{name} is off screen {when}: {', '.join(edges)}.")
+        for i, a in enumerate(mobjects):
+            for b in mobjects[i + 1:]:
+                types = (MANIM_TYPES.get(a["class"]), MANIM_TYPES.get(b["class"]))
+                if not all(t in OVERLAP_TYPES for t in types) or "text" not in types:
+                    continue
+                coverage = _coverage(a["box"], b["box"])
+                if coverage >= threshold:
+                    names = sorted((_describe(a, storyboard), _describe(b, storyboard)))
+                    report(("overlap", *names), f"{names[0]} and {names[1]} overlap {when} "
+                                                f"({coverage:.0%} of the smaller one is covered).")
+    return issues[:MAX_ISSUES]
@@ -1,8 +1,18 @@
 from pydantic import BaseModel
 from schemas.state import AgentState
-from utils import structured_generator
-from langchain_openai import ChatOpenAI
+from utils import structured_generator, get_openai_llm, get_gemini_llm, get_llm
+from token_budget import compact, with_legend
+from speculation import take, fingerprint, speculation_key
+from pipeline_stats import get_stats
+from agents.code_checks import CodeCheck, check_code
+from agents.renderer import render_preview, scene_module_name
+from agents.layout_checks import check_layout
+from agents.retime import retime_enabled
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Tuple
+import contextvars
 import os
+import time
 
 SYSTEM_PROMPT = """
 You are a Manim expert.
@@ -14,7 +24,16 @@ Inputs:
 
 Rules:
 - Use STANDARD Manim Community classes (e.g., Circle, Square, Text, FadeIn, Write, Transform).
-- DO NOT use any external or custom libraries like `manim_templates` unless explicitly provided.
+- DO NOT use any external or custom libraries, except the `manim_templates` geometry templates below.
+- For surfaces, parametric curves and function graphs, use the vectorized templates; they render much faster:
+  - `from manim_templates.surface import create_surface`, then
+    `create_surface(lambda u, v: (u, v, 0.3 * (u**2 + v**2)), u_range=[-3, 3], v_range=[-3, 3], resolution=24)`
+    instead of `Surface(...)`. Extra keyword arguments (e.g. `fill_opacity`, `checkerboard_colors`) go to Surface.
+  - `from manim_templates.graph import create_graph, create_parametric_curve`, then
+    `create_graph(axes, lambda x: np.sin(x), x_range=[-3, 3])` instead of `axes.plot(...)`, and
+    `create_parametric_curve(lambda t: (np.cos(t), np.sin(t), 0 * t), t_range=[0, TAU])` instead of `ParametricFunction(...)`.
+  - Their functions receive NumPy arrays of all points at once: use `np.sin`, `np.exp`, `np.where`, never `math.*`,
+    `if` on the values or Python loops.
 - Use `self.wait(duration)` to sync with audio segments.
 - The class name MUST be `GeneratedScene`.
 - The code must be self-contained and executable.
@@ -34,6 +53,138 @@ class ManimCode(BaseModel):
     code: str
     explanation: str
 
+DEFAULT_TEMPERATURES = "0.0,0.4,0.8"
+
+# Providers best-of-N candidates can be drawn from (CODEGEN_PROVIDERS)
+PROVIDERS = {
+    "openai": lambda: get_openai_llm(),
+    "gemini": lambda: get_gemini_llm(),
+    "ollama": lambda: get_llm(),
+}
+
+def codegen_candidates() -> int:
+    """Candidates generated concurrently per codegen call (CODEGEN_CANDIDATES, default 1)."""
+    return max(1, int(os.getenv("CODEGEN_CANDIDATES", "1")))
+
+def _candidate_llms(n: int) -> List[Tuple[str, object]]:
+    """Cycles through CODEGEN_PROVIDERS and CODEGEN_TEMPERATURES for n candidates."""
+    providers = [p.strip() for p in os.getenv("CODEGEN_PROVIDERS", "openai").split(",") if p.strip()]
+    temperatures = [float(t) for t in os.getenv("CODEGEN_TEMPERATURES", DEFAULT_TEMPERATURES).split(",")]
+    candidates = []
+    for i in range(n):
+        provider, temperature = providers[i % len(providers)], temperatures[i % len(temperatures)]
+        llm = PROVIDERS[provider]()
+        if "temperature" in type(llm).model_fields:
+            llm = llm.model_copy(update={"temperature": temperature})
+        candidates.append((f"{provider}@{temperature}", llm))
+    return candidates
+
+def _generate(user_prompt: str, llm, label: str) -> ManimCode:
+    """One codegen call; `label` names the provider (and temperature) in the error log."""
+    try:
+        return structured_generator(
+            system_prompt=SYSTEM_PROMPT,
+            user_prompt=with_legend(user_prompt),
+            output_schema=ManimCode,
+            llm=llm,
+            agent="manim"
+        )
+    except Exception as e:
+        print(f"--- MANIM: {label} error: {e} ---")
+        raise e
+
+def check_candidate(code: str, module_name: str, storyboard=None) -> CodeCheck:
+    """Local checks, plus a last-frame preview render and layout checks with CODEGEN_PREVIEW=1."""
+    check = check_code(code)
+    if check.passed and os.getenv("CODEGEN_PREVIEW", "0") == "1":
+        preview = render_preview(code, module_name)
+        if preview["status"] != "ok":
+            details = " | ".join(preview.get("stderr_tail") or ["Manim could not be run"])
+            issues = [f"The last-frame preview failed: {details}"]
+        else:
+            issues = check_layout(preview["layout"], storyboard)
+        if issues:
+            check = CodeCheck(passed=False, issues=issues, api_checked=check.api_checked)
+    return check
+
+def _best_of(n: int, user_prompt: str, storyboard, session) -> ManimCode:
+    """Generates n candidates concurrently; the first to pass local checks wins."""
+    stats = get_stats()
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=n, thread_name_prefix="codegen")
+    futures = {
+        executor.submit(contextvars.copy_context().run, _generate, user_prompt, llm, label): (i, label)
+        for i, (label, llm) in enumerate(_candidate_llms(n))
+    }
+    best, best_issues = None, None
+    stats.increment(f"codegen.best_of.{n}.calls")
+    try:
+        for future in as_completed(futures):
+            i, label = futures[future]
+            try:
+                candidate = future.result()
+            except Exception as e:
+                print(f"--- MANIM: Candidate {i} ({label}) failed: {e} ---")
+                continue
+            check = check_candidate(candidate.code, scene_module_name(storyboard, session, f"_candidate{i}"), storyboard)
+            stats.increment(f"codegen.candidates.{'passed' if check.passed else 'failed'}")
+            if check.passed:
+                print(f"--- MANIM: Candidate {i} ({label}) passed local checks ---")
+                stats.increment(f"codegen.best_of.{n}.hit")
+                stats.add_sample(f"codegen.best_of.{n}.latency", time.perf_counter() - started)
+                return candidate
+            print(f"--- MANIM: Candidate {i} ({label}) failed local checks: {' '.join(check.issues)} ---")
+            if best is None or len(check.issues) < len(best_issues):
+                best, best_issues = candidate, check.issues
+    finally:
+        # Not waited for, but LLM calls already in flight can't be stopped:
+        # they finish in the background, holding their llm_slot, and their
+        # tokens are still billed. Only candidates not yet started are cancelled.
+        running = sum(not f.done() for f in futures)
+        if running:
+            stats.increment(f"codegen.best_of.{n}.unfinished", running)
+        executor.shutdown(wait=False, cancel_futures=True)
+    if best is None:
+        raise RuntimeError(f"All {n} codegen candidates failed")
+    print(f"--- MANIM: No candidate passed local checks; using the one with the fewest issues ---")
+    stats.add_sample(f"codegen.best_of.{n}.latency", time.perf_counter() - started)
+    return best
+
+def codegen_fingerprint(storyboard, audio_meta) -> str:
+    """What generated code depends on, for reusing speculative codegen.
+
+    With retiming on, the audio timing only sets wait() lengths, which the
+    renderer aligns to the narration anyway (see agents/retime.py).
+    """
+    return fingerprint(storyboard) if retime_enabled() else fingerprint(storyboard, audio_meta)
+
+def generate_manim_code(storyboard, audio_meta, previous_code: str = None, feedback: str = None,
+                        session=None) -> ManimCode:
+    """Writes (or, given feedback, fixes) the scene code; no session cache writes.
+
+    With CODEGEN_CANDIDATES > 1 it is best-of-N (see `_best_of`).
+    """
+    if feedback and previous_code is not None:
+        user_prompt = f"""
+        PREVIOUS CODE:
+        {previous_code}
+        
+        CRITIC FEEDBACK:
+        {feedback}
+        
+        Please FIX the code.
+        Storyboard: {compact(storyboard)}
+        Audio: {compact(audio_meta)}
+        """
+    else:
+        user_prompt = f"Storyboard: {compact(storyboard)}\nAudio: {compact(audio_meta)}"
+
+    n = codegen_candidates()
+    if n > 1:
+        return _best_of(n, user_prompt, storyboard, session)
+    # Use OpenAI as requested.
+    return _generate(user_prompt, get_openai_llm(), "openai")
+
 def manim_codegen_agent(state: AgentState) -> AgentState:
     """Data processing node for the Manim Codegen Agent."""
     storyboard = state["current_storyboard"]
@@ -55,46 +206,21 @@ def manim_codegen_agent(state: AgentState) -> AgentState:
         print(f"--- MANIM: Loading cached code for step {index} (iter {iterations}) ---")
         return {"manim_code": session.get_cached(cache_key)}
 
-    # Use OpenAI as requested.
-    # Note: 'gpt-4.1' isn't a standard model ID. Using 'gpt-4o' as the current best model.
-    # If the user specifically intended a custom proxy mapping 'gpt-4.1', we'd use that,
-    # but based on common usage, 'gpt-4o' is the safest, high-performance bet.
-    openai_llm = ChatOpenAI(
-        model="gpt-4o-mini", 
-        temperature=0.0
-    )
-    
+    # Start of this step's code loop, used for the code critic's latency budget
+    started = {} if state.get("code_started_at") else {"code_started_at": time.time()}
+
     if feedback and iterations > 0:
         print(f"--- MANIM: Fixing code based on feedback (Iter {iterations}) ---")
-        user_prompt = f"""
-        PREVIOUS CODE:
-        {state.get('manim_code')}
-        
-        CRITIC FEEDBACK:
-        {feedback}
-        
-        Please FIX the code.
-        Storyboard: {storyboard.model_dump_json()}
-        Audio: {audio_meta.model_dump_json()}
-        """
+        result = generate_manim_code(storyboard, audio_meta, state.get('manim_code'), feedback, session)
     else:
         print(f"--- MANIM: Generating code for scene {storyboard.scene_id} ---")
-        user_prompt = f"Storyboard: {storyboard.model_dump_json()}\nAudio: {audio_meta.model_dump_json()}"
-    
-    try:
-        result = structured_generator(
-            system_prompt=SYSTEM_PROMPT,
-            user_prompt=user_prompt,
-            output_schema=ManimCode,
-            llm=openai_llm
-        )
-    except Exception as e:
-        # Fallback if OpenAI fails (though we should fail hard or retry)
-        print(f"--- MANIM: OpenAI Error: {e} ---")
-        raise e
+        # Started while the critic was reviewing the storyboard, if SPECULATE=1;
+        # only usable if it was written against the same audio timing, unless retiming fixes that up
+        speculative = take("manim", speculation_key(session, index), codegen_fingerprint(storyboard, audio_meta))
+        result = speculative or generate_manim_code(storyboard, audio_meta, session=session)
     
     # Cache the result
     if session:
         session.set_cached(cache_key, result.code)
         
-    return {"manim_code": result.code}
+    return {"manim_code": result.code, **started}
@@ -47,7 +47,8 @@ def planner_agent(state: AgentState) -> AgentState:
         curriculum = structured_generator(
             system_prompt=SYSTEM_PROMPT,
             user_prompt=f"Create a curriculum for the topic: {topic}",
-            output_schema=Curriculum
+            output_schema=Curriculum,
+            agent="planner"
         )
         
         # Cache the result
@@ -0,0 +1,112 @@
+import os
+from collections import Counter
+from typing import List
+from pydantic import BaseModel
+from schemas.script import TeachingScript
+from schemas.storyboard import Storyboard
+
+# Fast, local structural review of a storyboard. Runs before the LLM critic so
+# that obviously broken storyboards are rejected with precise feedback and
+# clean ones are approved without an LLM round-trip.
+
+KNOWN_TYPES = {"dot", "line", "arrow", "text", "axes", "surface", "group"}
+KNOWN_ACTIONS = {"fade_in", "move", "transform", "highlight", "fade_out"}
+
+MAX_OBJECTS = 8            # More than this is rejected as clutter
+CROWDED_OBJECTS = 6        # More than this is penalised
+WORDS_PER_MINUTE = 150     # Same narration pace the audio agent assumes
+DURATION_TOLERANCE = 0.25  # Relative mismatch tolerated without penalty
+DURATION_HARD_LIMIT = 0.5  # Relative mismatch rejected outright
+
+class PreCritique(BaseModel):
+    verdict: str  # approve | reject | ambiguous
+    confidence: float
+    issues: List[str]
+
+def approve_threshold() -> float:
+    return float(os.getenv("PRECRITIC_APPROVE_THRESHOLD", "0.85"))
+
+def expected_duration(script: TeachingScript) -> float:
+    """Seconds needed to narrate the script at the audio agent's pace."""
+    return len(script.narration.split()) / WORDS_PER_MINUTE * 60
+
+def _targets(animation) -> List[str]:
+    # Targets are usually a single id but the LLM sometimes lists several
+    return [t.strip() for t in animation.target.split(",") if t.strip()]
+
+def precritique(script: TeachingScript, storyboard: Storyboard) -> PreCritique:
+    """Scores a storyboard's referential integrity, clutter and timing."""
+    errors = []     # Hard failures: reject without asking the LLM
+    warnings = []   # Soft issues: lower the confidence
+    penalty = 0.0
+
+    ids = [obj.id for obj in storyboard.objects]
+    known_ids = set(ids)
+
+    if not storyboard.objects:
+        errors.append("The storyboard has no objects.")
+    if not storyboard.animations:
+        errors.append("The storyboard has no animations.")
+
+    duplicates = sorted(i for i, n in Counter(ids).items() if n > 1)
+    if duplicates:
+        errors.append(f"Object ids must be unique; duplicated: {', '.join(duplicates)}.")
+
+    if len(ids) > MAX_OBJECTS:
+        errors.append(f"Too many objects ({len(ids)}); use at most {MAX_OBJECTS} to avoid clutter.")
+    elif len(ids) > CROWDED_OBJECTS:
+        warnings.append(f"The scene is crowded ({len(ids)} objects).")
+        penalty += 0.1
+
+    for obj in storyboard.objects:
+        if obj.type not in KNOWN_TYPES:
+            warnings.append(f"Object '{obj.id}' has unknown type '{obj.type}'.")
+            penalty += 0.1
+
+    animated = set()
+    faded_out = set()
+    for i, animation in enumerate(storyboard.animations, start=1):
+        targets = _targets(animation)
+        missing = [t for t in targets if t not in known_ids]
+        if not targets or missing:
+            errors.append(
+                f"Animation {i} ({animation.action}) targets '{animation.target}', "
+                f"which is not one of the objects: {', '.join(ids) or 'none'}."
+            )
+            continue
+        if animation.action not in KNOWN_ACTIONS:
+            warnings.append(f"Animation {i} uses unknown action '{animation.action}'.")
+            penalty += 0.1
+        for target in targets:
+            if target in faded_out and animation.action != "fade_in":
+                warnings.append(f"Animation {i} animates '{target}' after it was faded out.")
+                penalty += 0.15
+            if animation.action == "fade_out":
+                faded_out.add(target)
+            elif animation.action == "fade_in":
+                faded_out.discard(target)
+        animated.update(targets)
+
+    unused = [i for i in ids if i not in animated]
+    if unused:
+        warnings.append(f"Objects never animated: {', '.join(unused)}.")
+        penalty += 0.05 * len(unused)
+
+    expected = expected_duration(script)
+    if expected > 0:
+        mismatch = abs(storyboard.duration - expected) / expected
+        if mismatch > DURATION_HARD_LIMIT:
+            errors.append(
+                f"Duration is {storyboard.duration}s but the narration needs about "
+                f"{expected:.0f}s; set duration close to {expected:.0f}."
+            )
+        elif mismatch > DURATION_TOLERANCE:
+            warnings.append(f"Duration {storyboard.duration}s differs from the ~{expected:.0f}s narration.")
+            penalty += 0.2
+
+    if errors:
+        return PreCritique(verdict="reject", confidence=1.0, issues=errors + warnings)
+
+    confidence = max(0.0, 1.0 - penalty)
+    verdict = "approve" if confidence >= approve_threshold() else "ambiguous"
+    return PreCritique(verdict=verdict, confidence=confidence, issues=warnings)
@@ -1,14 +1,73 @@
 import subprocess
 import os
+import time
+import glob
+import json
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from schemas.state import AgentState
+from iteration_budget import step_difficulty, record_forced_render
+from tracing import span
+from concurrency import render_slot, free_render_slots
+from render_profile import RenderProfiler, write_profile
+from render_limits import (render_timeout, record_render_time, popen_kwargs, limited_command, kill_process_group,
+                           register, unregister, cancel_render, classify_failure, should_retry_render,
+                           FAILURE_ADVICE)
+from speculation import take, fingerprint, speculation_key
+from pipeline_stats import get_stats
+from agents.layout_checks import check_layout
+from agents.retime import retime_enabled, lengths_agree, align
+from agents.chunked_render import (chunk_count, min_chunked_seconds, animation_run_times, plan_chunks,
+                                   join_difference, join_threshold, stitch, merge_profiles)
+
+DEFAULT_PREVIEW_TIMEOUT = 60.0
+
+def incremental_enabled() -> bool:
+    """Keep Manim's partial movie files between renders of a scene (RENDER_INCREMENTAL, default on).
+
+    Manim names each play()/wait() segment by a hash of the animation, the
+    camera and the mobjects on screen before it, and reuses a segment whose
+    hash it has already rendered. Module names are stable per session and
+    scene, so a repair iteration only re-renders the segments it changed, and
+    a render that was killed resumes from its last finished segment.
+    """
+    return os.getenv("RENDER_INCREMENTAL", "1") == "1"
+
+def partial_movie_dir(module_name: str, scene_name: str = "GeneratedScene") -> str:
+    return f"media/videos/{module_name}/480p15/partial_movie_files/{scene_name}"
+
+def _drop_inflight_partial(module_name: str, since: float):
+    """Removes the segment a killed render was writing; it may be truncated."""
+    written = [p for p in glob.glob(f"{partial_movie_dir(module_name)}/*.mp4") if os.path.getmtime(p) >= since]
+    if written:
+        newest = max(written, key=os.path.getmtime)
+        os.remove(newest)
+        print(f"--- RENDERER: Dropped possibly incomplete segment {os.path.basename(newest)} ---")
+
+# Appended to generated scenes so their Text/MathTex glyphs go through the
+# shared cache (manim_templates/glyph_cache.py). construct() only runs after
+# the module has loaded, and the generated code's line numbers don't move.
+GLYPH_CACHE_HOOK = "\n\nimport manim_templates.glyph_cache\nmanim_templates.glyph_cache.install()\n"
+
+def glyph_cache_enabled() -> bool:
+    return os.getenv("GLYPH_CACHE", "1") == "1"
+
+def scene_source(code: str) -> str:
+    """The scene file written for Manim."""
+    return code + GLYPH_CACHE_HOOK if glyph_cache_enabled() else code
+
+def scene_module_name(storyboard, session, suffix: str = "") -> str:
+    # Prefix the module with the session so concurrent topics don't share scene files
+    module_name = f"scene_{storyboard.scene_id}"
+    if session:
+        module_name = f"{session.session_name}_{module_name}"
+    return module_name + suffix
 
 def renderer_agent(state: AgentState) -> AgentState:
     """Executes the Manim code to generate the video."""
-    code = state["manim_code"]
-    storyboard = state["current_storyboard"]
-    scene_name = "GeneratedScene"
-    session = state.get("session")
-    
     session = state.get("session")
     index = state.get("current_step_index", 0)
     cache_key = f"step_{index}_mp4_file_path"
@@ -20,7 +79,51 @@ def renderer_agent(state: AgentState) -> AgentState:
             print(f"--- RENDERER: Loading cached video for step {index} ---")
             return {"mp4_file_path": cached_path}
 
-    file_path = f"manim_scenes/scene_{storyboard.scene_id}.py"
+    # A render started while the code critic was reviewing this exact code
+    storyboard = state["current_storyboard"]
+    outcome = take("render", speculation_key(session, index), fingerprint(state["manim_code"], storyboard))
+    if outcome is None:
+        module_name = scene_module_name(storyboard, session)
+        failure = _preview_gate(state, module_name)
+        if failure:
+            return _failure(state, failure)
+        outcome = _render_chunked(state, module_name) or render_scene(
+            state["manim_code"], storyboard, session, index, module_name)
+    result = _publish(state, outcome, cache_key)
+
+    # Feed render outcomes of force-approved output back into the iteration budgets
+    success = bool(result.get("mp4_file_path"))
+    difficulty = step_difficulty(state)
+    if state.get("critic_forced"):
+        record_forced_render("critic", difficulty, success)
+    if state.get("code_forced"):
+        record_forced_render("code_critic", difficulty, success)
+    if success:
+        result["render_failure"] = None
+    return result
+
+def _failure(state: AgentState, failure: dict) -> AgentState:
+    """Structured render failure; resource failures go back to codegen with advice."""
+    update = {"mp4_file_path": None, "render_failure": failure,
+              "render_attempts": state.get("render_attempts", 0) + 1}
+    advice = FAILURE_ADVICE.get(failure["reason"])
+    if advice:
+        update["code_critique_feedback"] = advice.format(**failure)
+        update["code_approved"] = False
+        update["code_critic_iterations"] = state.get("code_critic_iterations", 0) + 1
+    return update
+
+def render_scene(code: str, storyboard, session, index: int, module_name: str,
+                 cancel: Optional[threading.Event] = None, animations: Optional[str] = None) -> dict:
+    """Runs Manim on the code; has no effect on the session, so it can run speculatively.
+
+    Returns an outcome for `_publish`: status "ok" with the raw Manim output
+    path, "failed" with a structured failure, or "error" when Manim could not
+    be run at all. Setting `cancel` kills the render. `animations` ("first,last"
+    or "first") renders only that range of animations (Manim's `-n`).
+    """
+    scene_name = "GeneratedScene"
+    file_path = f"manim_scenes/{module_name}.py"
     
     # Ensure directory exists
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
@@ -28,11 +131,11 @@ def renderer_agent(state: AgentState) -> AgentState:
     # Write code to file
     try:
         with open(file_path, "w", encoding='utf-8') as f:
-            f.write(code)
+            f.write(scene_source(code))
         print(f"--- RENDERER: written code to {file_path} ---")
     except Exception as e:
         print(f"--- RENDERER: Error writing code file: {e} ---")
-        return {"mp4_file_path": None}
+        return {"status": "error"}
     
     # Execute Manim
     # -qh: Quality High (1080p60)
@@ -42,6 +145,10 @@ def renderer_agent(state: AgentState) -> AgentState:
         env = os.environ.copy()
         cwd = os.getcwd()
         env["PYTHONPATH"] = cwd + os.pathsep + env.get("PYTHONPATH", "")
+        glyph_stats_path = os.path.abspath(f"manim_scenes/{module_name}_glyphs.json")
+        if os.path.exists(glyph_stats_path):
+            os.remove(glyph_stats_path)
+        env["GLYPH_CACHE_STATS_PATH"] = glyph_stats_path
         
         # Check for ffmpeg
         import shutil
@@ -49,69 +156,406 @@ def renderer_agent(state: AgentState) -> AgentState:
             print("--- RENDERER: CRITICAL ERROR - ffmpeg not found in PATH ---")
             print("--- RENDERER: Manim requires ffmpeg to generate videos. ---")
             print("--- RENDERER: Please install ffmpeg (e.g., 'winget install ffmpeg') and restart. ---")
-            return {"mp4_file_path": None}
+            return {"status": "error"}
             
         # Stream output to see progress
         # Using -ql (Low Quality, 480p15) for faster iteration
-        process = subprocess.Popen(
-            ["manim", "-ql", "--disable_caching", file_path, scene_name],
-            env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
+        timeout = render_timeout(storyboard)
+        timed_out = False
+        stderr_tail = deque(maxlen=20)
+        with render_slot(), span("manim.render", cat="subprocess", step=index, scene=storyboard.scene_id,
+                                 timeout=timeout, speculative=cancel is not None and animations is None,
+                                 animations=animations) as render_span:
+            profiler = RenderProfiler()
+            started = time.perf_counter()
+            started_wall = time.time()
+            caching = [] if incremental_enabled() else ["--disable_caching"]
+            selection = ["-n", animations] if animations else []
+            # Own process group plus CPU/memory rlimits, see render_limits.py
+            process = subprocess.Popen(
+                limited_command(["manim", "-ql", *caching, *selection, file_path, scene_name], timeout),
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                universal_newlines=True,
+                **popen_kwargs(timeout)
+            )
+            register(process)
         
-        # Reader thread for stdout
-        def reader(pipe, label):
-            try:
-                with pipe:
-                    for line in iter(pipe.readline, ''):
-                        print(f"[{label}] {line.strip()}")
-            except Exception:
-                pass
-
-        import threading
-        t_out = threading.Thread(target=reader, args=(process.stdout, "MANIM_OUT"))
-        t_err = threading.Thread(target=reader, args=(process.stderr, "MANIM_ERR"))
-        
-        t_out.start()
-        t_err.start()
+            # Reader thread for stdout
+            def reader(pipe, label):
+                try:
+                    with pipe:
+                        for line in iter(pipe.readline, ''):
+                            print(f"[{label}] {line.strip()}")
+                            profiler.feed(line)
+                            if label == "MANIM_ERR":
+                                stderr_tail.append(line.rstrip())
+                except Exception:
+                    pass
+
+            def watch_cancel():
+                while not cancel.wait(0.2):
+                    if process.poll() is not None:
+                        return
+                cancel_render(process)
+
+            threads = [threading.Thread(target=reader, args=(process.stdout, "MANIM_OUT")),
+                       threading.Thread(target=reader, args=(process.stderr, "MANIM_ERR"))]
+            if cancel is not None:
+                threads.append(threading.Thread(target=watch_cancel, daemon=True))
+            for thread in threads:
+                thread.start()
         
-        process.wait()
-        t_out.join()
-        t_err.join()
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                print(f"--- RENDERER: Render exceeded {timeout:.0f}s, killing its process group ---")
+                timed_out = True
+                kill_process_group(process)
+            except BaseException:
+                # Interrupted (Ctrl+C, worker shutdown): don't leave Manim running
+                kill_process_group(process)
+                raise
+            finally:
+                cancelled = unregister(process)
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            profile = profiler.finish(process.returncode)
+            glyphs = _glyph_cache_stats(glyph_stats_path)
+            if glyphs:
+                profile["glyph_cache"] = glyphs
+            render_span.set(returncode=process.returncode, frames=profile["frames"], timed_out=timed_out,
+                            cached_animations=len(profile["cached_animations"]))
 
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, process.args)
+        if incremental_enabled():
+            get_stats().increment_many({"render.partial.cached": len(profile["cached_animations"]),
+                                        "render.partial.rendered": len(profile["animations"])})
+            if timed_out or cancelled or (process.returncode or 0) < 0:
+                _drop_inflight_partial(module_name, started_wall)
+
+        if timed_out or cancelled or process.returncode != 0:
+            reason = classify_failure(process.returncode, timed_out, cancelled, list(stderr_tail))
+            print(f"--- RENDERER: Error during rendering ({reason}) ---")
+            print(f"Return code: {process.returncode}")
+            # Logs have already been streamed to console
+            print("--- RENDERER: Check MANIM_ERR logs above for details ---")
+            return {"status": "failed", "module_name": module_name, "profile": profile, "failure": {
+                "reason": reason,
+                "returncode": process.returncode,
+                "timeout_s": timeout,
+                "elapsed_s": elapsed,
+                "stderr_tail": list(stderr_tail)[-5:],
+            }}
 
         print(f"--- RENDERER: Manim execution completed successfully ---")
         
-    except subprocess.CalledProcessError as e:
-        print(f"--- RENDERER: Error during rendering ---")
-        print(f"Return code: {e.returncode}")
-        # Logs have already been streamed to console
-        print("--- RENDERER: Check MANIM_ERR logs above for details ---")
-        return {"mp4_file_path": None}
     except FileNotFoundError:
         print(f"--- RENDERER: Manim command not found. Please install Manim: pip install manim ---")
-        return {"mp4_file_path": None}
+        return {"status": "error"}
     except Exception as e:
         print(f"--- RENDERER: Unexpected error during rendering: {e} ---")
-        return {"mp4_file_path": None}
-        
-    # Expected output path for -ql (480p15)
+        return {"status": "error"}
+
     # Manim structure: media/videos/<module_name>/480p15/<scene_name>.mp4
-    # module_name is the filename without extension: scene_{storyboard.scene_id}
-    output_path = f"media/videos/scene_{storyboard.scene_id}/480p15/{scene_name}.mp4"
+    return {"status": "ok", "module_name": module_name, "profile": profile, "elapsed_s": elapsed,
+            "output_path": f"media/videos/{module_name}/480p15/{scene_name}.mp4"}
+
+def _glyph_cache_stats(path: str) -> Optional[dict]:
+    """Glyph cache hits and savings a render wrote on exit, also added to the pipeline stats."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            glyphs = json.load(f)
+    except (OSError, ValueError):
+        return None
+    stats = get_stats()
+    stats.increment_many({"glyph_cache.hits": glyphs["hits"], "glyph_cache.misses": glyphs["misses"]})
+    stats.add_sample("glyph_cache.saved", glyphs["saved_s"])
+    return glyphs
+
+# Runs the generated scene with animations skipped and records the top-level
+# mobjects' bounding boxes, the run time of every play() and whether it was a
+# wait() (wait() goes through play()), plus the boxes at the end. The scene
+# is loaded from its file: module names start with the session name, which
+# need not be a valid identifier (e.g. "3d_rotations_scene_1")
+PREVIEW_WRAPPER = """import os, sys, json, importlib.util
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from manim import *
+_spec = importlib.util.spec_from_file_location(
+    {module!r}, os.path.join(os.path.dirname(os.path.abspath(__file__)), {module!r} + ".py"))
+_scene_module = importlib.util.module_from_spec(_spec)
+sys.modules[{module!r}] = _scene_module
+_spec.loader.exec_module(_scene_module)
+GeneratedScene = _scene_module.GeneratedScene
+
+class PreviewScene(GeneratedScene):
+    def _snapshot(self, animation, run_time=None, wait=False):
+        mobjects = []
+        for mobject in self.mobjects:
+            if not any(len(m.points) for m in mobject.get_family()):
+                continue
+            low, high = mobject.get_corner(DL), mobject.get_corner(UR)
+            text = getattr(mobject, "text", None) or getattr(mobject, "tex_string", None)
+            mobjects.append({{"class": type(mobject).__name__, "text": text if isinstance(text, str) else None,
+                             "box": [float(low[0]), float(low[1]), float(high[0]), float(high[1])]}})
+        self._layout.append({{"animation": animation, "run_time": run_time, "wait": wait, "mobjects": mobjects}})
+
+    def setup(self):
+        super().setup()
+        self._layout = []
+
+    def play(self, *args, **kwargs):
+        super().play(*args, **kwargs)
+        animations = getattr(self, "animations", None) or []
+        self._snapshot(len(self._layout), float(getattr(self, "duration", 0) or 0),
+                       bool(animations) and all(isinstance(a, Wait) for a in animations))
+
+    def tear_down(self):
+        super().tear_down()
+        self._snapshot(None)
+        with open(os.environ["PREVIEW_LAYOUT_PATH"], "w") as f:
+            json.dump({{"frame": [config.frame_width, config.frame_height],
+                       "three_d": isinstance(self, ThreeDScene), "snapshots": self._layout}}, f)
+"""
+
+# Last successful preview per module, reused by the chunked render after the preview gate
+_previews = {}
+_previews_lock = threading.Lock()
+
+def render_preview(code: str, module_name: str, index: int = 0) -> dict:
+    """Renders only the last frame (`manim -s`); animations are skipped, not drawn.
+
+    Returns status "ok" with the PNG path and the recorded layout (see
+    agents/layout_checks.py), "failed" with a stderr tail, or "error" when
+    Manim could not be run.
+    """
+    code_hash = fingerprint(code)
+    with _previews_lock:
+        previous = _previews.get(module_name)
+    if previous and previous[0] == code_hash:
+        return previous[1]
+    scene_name = "PreviewScene"
+    file_path = f"manim_scenes/{module_name}.py"
+    wrapper_path = f"manim_scenes/{module_name}_preview.py"
+    layout_path = os.path.abspath(f"manim_scenes/{module_name}_layout.json")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w", encoding='utf-8') as f:
+        f.write(scene_source(code))
+    with open(wrapper_path, "w", encoding='utf-8') as f:
+        f.write(PREVIEW_WRAPPER.format(module=module_name))
+    if os.path.exists(layout_path):
+        os.remove(layout_path)
+    timeout = float(os.getenv("PREVIEW_TIMEOUT", DEFAULT_PREVIEW_TIMEOUT))
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.getcwd() + os.pathsep + env.get("PYTHONPATH", "")
+    env["PREVIEW_LAYOUT_PATH"] = layout_path
+    started = time.perf_counter()
+    try:
+        with render_slot(), span("manim.preview", cat="subprocess", step=index, module=module_name) as preview_span:
+            process = subprocess.Popen(
+                limited_command(["manim", "-ql", "-s", "--disable_caching", wrapper_path, scene_name], timeout),
+                env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                **popen_kwargs(timeout)
+            )
+            register(process)
+            try:
+                _, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                kill_process_group(process)
+                stderr = f"Preview exceeded {timeout:.0f}s"
+            except BaseException:
+                kill_process_group(process)
+                raise
+            finally:
+                unregister(process)
+            preview_span.set(returncode=process.returncode)
+    except FileNotFoundError:
+        print(f"--- RENDERER: Manim command not found. Please install Manim: pip install manim ---")
+        return {"status": "error"}
+    elapsed = time.perf_counter() - started
+    images = glob.glob(f"media/images/{module_name}_preview/{scene_name}*.png")
+    if process.returncode != 0 or not images:
+        return {"status": "failed", "elapsed_s": elapsed,
+                "stderr_tail": [l for l in (stderr or "").splitlines() if l.strip()][-5:]}
+    layout = None
+    if os.path.exists(layout_path):
+        with open(layout_path, 'r', encoding='utf-8') as f:
+            layout = json.load(f)
+    preview = {"status": "ok", "elapsed_s": elapsed, "image_path": max(images, key=os.path.getmtime), "layout": layout}
+    with _previews_lock:
+        _previews[module_name] = (code_hash, preview)
+    return preview
+
+def _preview_gate(state: AgentState, module_name: str) -> Optional[dict]:
+    """Previews the last frame before the full render (RENDER_PREVIEW=1).
+
+    Returns a render failure to send back to codegen when the scene crashes
+    or its layout is broken, or None to go ahead with the full render. Once
+    the retry budget is spent the full render goes ahead regardless.
+    """
+    if os.getenv("RENDER_PREVIEW", "0") != "1":
+        return None
+    storyboard = state["current_storyboard"]
+    index = state.get("current_step_index", 0)
+    stats = get_stats()
+    print(f"--- RENDERER: Previewing the last frame ---")
+    preview = render_preview(state["manim_code"], module_name, index)
+    if preview["status"] == "error":
+        return None
+    stats.add_sample("render.preview.time", preview["elapsed_s"])
+    if preview["status"] == "failed":
+        reason, details = "preview_error", " | ".join(preview["stderr_tail"]) or "no output"
+    else:
+        issues = check_layout(preview["layout"], storyboard)
+        if not issues:
+            stats.increment("render.preview.ok")
+            print(f"--- RENDERER: Preview OK in {preview['elapsed_s']:.1f}s ---")
+            return None
+        reason, details = "layout", " ".join(issues)
+    stats.increment(f"render.preview.{reason}")
+    print(f"--- RENDERER: Preview found problems ({reason}): {details} ---")
+    failure = {"reason": reason, "returncode": None, "timeout_s": None, "elapsed_s": preview["elapsed_s"],
+               "stderr_tail": preview.get("stderr_tail", []), "details": details}
+    if not should_retry_render(dict(state, render_failure=failure, render_attempts=state.get("render_attempts", 0) + 1)):
+        print(f"--- RENDERER: Retry budget spent; rendering anyway ---")
+        return None
+    return failure
+
+def _render_chunked(state: AgentState, module_name: str) -> Optional[dict]:
+    """Renders a long scene as parallel chunks (RENDER_CHUNKS, see agents/chunked_render.py).
+
+    Returns the outcome of the stitched scene or of the first failed chunk,
+    or None to render the scene in one piece: chunking disabled, fewer than
+    two free render slots, a short or single-segment scene, no animation
+    timeline, or a discontinuous join.
+    """
+    max_chunks = chunk_count()
+    audio_meta = state.get("current_audio_metadata")
+    if max_chunks < 2 or not audio_meta or len(audio_meta.segments) < 2:
+        return None
+    # Every chunk replays construct() from the start, so chunks that wait for
+    # each other's render slot (batch.py --max-renders) are slower than one render
+    free = free_render_slots()
+    if free is not None:
+        max_chunks = min(max_chunks, free)
+        if max_chunks < 2:
+            get_stats().increment("render.chunked.no_slots")
+            return None
+    code, storyboard = state["manim_code"], state["current_storyboard"]
+    session, index = state.get("session"), state.get("current_step_index", 0)
+    stats = get_stats()
+    # The preview records each animation's run time; reused if the preview gate just ran
+    preview = render_preview(code, module_name, index)
+    run_times = animation_run_times(preview.get("layout"))
+    if sum(run_times) < min_chunked_seconds():
+        return None
+    chunks = plan_chunks(run_times, [segment.start_time for segment in audio_meta.segments], max_chunks)
+    if len(chunks) < 2:
+        return None
+
+    print(f"--- RENDERER: Rendering {len(run_times)} animations in {len(chunks)} parallel chunks ---")
+    started = time.perf_counter()
+    stop = threading.Event()
+
+    def render_chunk(number: int, first: int, last: Optional[int]) -> dict:
+        selection = f"{first},{last}" if last is not None else str(first)
+        outcome = render_scene(code, storyboard, session, index, f"{module_name}_chunk{number}",
+                               cancel=stop, animations=selection)
+        if outcome["status"] != "ok":
+            # The scene fails as a whole; stop the other chunks
+            stop.set()
+        return outcome
+
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, render_chunk, number, first, last)
+                   for number, (first, last) in enumerate(chunks)]
+        outcomes = [future.result() for future in futures]
+    failed = [o for o in outcomes if o["status"] != "ok"]
+    if failed:
+        stats.increment("render.chunked.failed")
+        # Chunks killed because another one failed report "cancelled"; surface the real cause
+        return next((o for o in failed if o.get("failure", {}).get("reason") != "cancelled"), failed[0])
+
+    paths = [o["output_path"] for o in outcomes]
+    differences = [join_difference(a, b) for a, b in zip(paths, paths[1:])]
+    checked = [d for d in differences if d is not None]
+    if checked and max(checked) > join_threshold():
+        stats.increment("render.chunked.discontinuous")
+        print(f"--- RENDERER: Chunks don't join up (difference {max(checked):.2f}); rendering in one piece ---")
+        return None
+    output_path = f"media/videos/{module_name}/480p15/GeneratedScene.mp4"
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    try:
+        stitch(paths, output_path, index)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"--- RENDERER: Stitching chunks failed ({e}); rendering in one piece ---")
+        return None
+    elapsed = time.perf_counter() - started
+    stats.increment("render.chunked.scenes")
+    stats.add_sample("render.chunked.chunks", len(chunks))
+    stats.add_sample("render.chunked.time", elapsed)
+    print(f"--- RENDERER: Stitched {len(chunks)} chunks in {elapsed:.1f}s "
+          f"({len(checked)}/{len(differences)} joins checked) ---")
+    return {"status": "ok", "module_name": module_name, "profile": merge_profiles([o["profile"] for o in outcomes], elapsed),
+            "elapsed_s": elapsed, "output_path": output_path, "chunks": len(chunks)}
+
+def _retime(state: AgentState, video_path: str, audio_path: str) -> Optional[str]:
+    """Aligns the video to the synthesized narration (RETIME, default on, see agents/retime.py).
+
+    Returns the retimed video with audio, or None to merge them as they are.
+    Retiming costs a libx264 re-encode, plus a preview process for scenes with
+    several segments, so it is skipped when the lengths already agree.
+    """
+    if not retime_enabled():
+        return None
+    if lengths_agree(video_path, audio_path):
+        get_stats().increment("retime.skipped")
+        return None
+    storyboard = state["current_storyboard"]
+    audio_meta = state.get("current_audio_metadata")
+    index = state.get("current_step_index", 0)
+    layout = None
+    if audio_meta and len(audio_meta.segments) > 1:
+        # Animation timeline; reused if the preview gate or a chunked render just ran
+        preview = render_preview(state["manim_code"], scene_module_name(storyboard, state.get("session")), index)
+        layout = preview.get("layout")
+    return align(video_path, audio_path, audio_meta, layout, index)
+
+def _publish(state: AgentState, outcome: dict, cache_key: str) -> AgentState:
+    """Merges the audio into a rendered scene, copies it into the session and caches it."""
+    storyboard = state["current_storyboard"]
+    session = state.get("session")
+    index = state.get("current_step_index", 0)
+    if outcome["status"] == "error":
+        return {"mp4_file_path": None}
+
+    # Keep the per-animation profile next to the scene video (see render_profile.py)
+    if session:
+        write_profile(session.get_path("videos", f"scene_{storyboard.scene_id}.render_profile.json"),
+                      outcome["profile"], storyboard)
+    if outcome["status"] == "failed":
+        return _failure(state, outcome["failure"])
+
+    if not outcome.get("chunks"):
+        # Chunks render in parallel; their wall time says little about a single render
+        record_render_time(storyboard, outcome["elapsed_s"])
+    module_name = outcome["module_name"]
+    output_path = outcome["output_path"]
     
     if os.path.exists(output_path):
         print(f"--- RENDERER: Video successfully rendered to {output_path} ---")
         
         # Combine with audio if available
         audio_path = state.get("audio_file_path")
-        if audio_path and os.path.exists(audio_path):
+        retimed = _retime(state, output_path, audio_path) if audio_path and os.path.exists(audio_path) else None
+        if retimed:
+            output_path = retimed
+        elif audio_path and os.path.exists(audio_path):
             print(f"--- RENDERER: Found audio at {audio_path}. Merging... ---")
             merged_output_path = output_path.replace(".mp4", "_merged.mp4")
             
@@ -131,7 +575,9 @@ def renderer_agent(state: AgentState) -> AgentState:
                     merged_output_path
                 ]
                 
-                subprocess.run(cmd, check=True, capture_output=True)
+                with span("ffmpeg.merge", cat="subprocess", step=index) as merge_span:
+                    subprocess.run(cmd, check=True, capture_output=True)
+                    merge_span.set(bytes=os.path.getsize(merged_output_path))
                 
                 print(f"--- RENDERER: Merged video created at {merged_output_path} ---")
                 output_path = merged_output_path
@@ -163,8 +609,7 @@ def renderer_agent(state: AgentState) -> AgentState:
         print(f"--- RENDERER: Video file not found at {output_path} ---")
         print(f"--- RENDERER: Checking media directory for any generated files... ---")
         # Try to find any mp4 files in media directory
-        import glob
-        media_files = glob.glob("media/**/*.mp4", recursive=True)
+        media_files = glob.glob(f"media/videos/{module_name}/**/*.mp4", recursive=True)
         if media_files:
             print(f"--- RENDERER: Found these video files: ---")
             for mf in media_files:
@@ -0,0 +1,220 @@
+import os
+import re
+import json
+import hashlib
+import subprocess
+from typing import List, Optional, Tuple
+from tracing import span
+from pipeline_stats import get_stats
+
+# Retiming: aligns a rendered scene to its narration in ffmpeg instead of
+# re-rendering it. Generated code paces itself with self.wait() from the
+# estimated AudioMetadata timings, and the synthesized speech never matches
+# them exactly, so each narration segment's part of the video is stretched
+# (the last frame is held) or its wait() spans are shortened to the measured
+# length of that segment's audio. Video and audio then end together instead
+# of one being cut off.
+#
+# Animation run times and which of them are waits come from the last-frame
+# preview (agents/renderer.render_preview). Without them the video is only
+# held at the end until the narration finishes. Results are cached by the
+# hashes of the rendered video and of the audio with its timing.
+
+DEFAULT_CACHE_DIR = "media/retimed"
+DEFAULT_SNAP_SECONDS = 0.75   # How far a segment boundary may move to a pause in the speech
+DEFAULT_TOLERANCE_SECONDS = 0.25  # Lengths closer than this are merged as they are
+MIN_WAIT_SECONDS = 0.1        # Never shorten a wait() below this
+SILENCE = re.compile(r"silence_(?P<edge>start|end):\s*(?P<time>-?[\d.]+)")
+
+def retime_enabled() -> bool:
+    return os.getenv("RETIME", "1") == "1"
+
+def cache_dir() -> str:
+    return os.getenv("RETIME_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+def tolerance_seconds() -> float:
+    return float(os.getenv("RETIME_TOLERANCE_SECONDS", DEFAULT_TOLERANCE_SECONDS))
+
+def animation_timeline(layout: Optional[dict]) -> List[Tuple[float, float, bool]]:
+    """(start, run_time, is_wait) of each play()/wait() from a preview layout; [] if not recorded."""
+    if not layout:
+        return []
+    snapshots = [s for s in layout.get("snapshots", []) if s.get("animation") is not None]
+    if not snapshots or any(s.get("run_time") is None for s in snapshots):
+        return []
+    timeline, start = [], 0.0
+    for snapshot in snapshots:
+        timeline.append((start, float(snapshot["run_time"]), bool(snapshot.get("wait"))))
+        start += float(snapshot["run_time"])
+    return timeline
+
+def media_duration(path: str) -> Optional[float]:
+    try:
+        result = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+                                check=True, capture_output=True, text=True)
+        return float(result.stdout.strip())
+    except (subprocess.CalledProcessError, OSError, ValueError):
+        return None
+
+def lengths_agree(video_path: str, audio_path: str) -> bool:
+    """True if the video and the narration already end together, so retiming isn't worth its re-encode."""
+    video_seconds, audio_seconds = media_duration(video_path), media_duration(audio_path)
+    if video_seconds is None or audio_seconds is None:
+        return False
+    return abs(video_seconds - audio_seconds) <= tolerance_seconds()
+
+def pauses(audio_path: str) -> List[float]:
+    """Midpoints of the pauses in the speech (ffmpeg silencedetect)."""
+    try:
+        result = subprocess.run(["ffmpeg", "-v", "info", "-i", audio_path, "-af", "silencedetect=n=-35dB:d=0.2",
+                                 "-f", "null", "-"], capture_output=True, text=True)
+    except OSError:
+        return []
+    midpoints, start = [], None
+    for match in SILENCE.finditer(result.stderr or ""):
+        if match.group("edge") == "start":
+            start = float(match.group("time"))
+        elif start is not None:
+            midpoints.append((start + float(match.group("time"))) / 2)
+            start = None
+    return midpoints
+
+def audio_boundaries(segments, audio_seconds: float, silences: List[float]) -> List[float]:
+    """Where segments 1..n-1 start in the synthesized audio.
+
+    The estimated start times are scaled to the measured length, then moved
+    to the nearest pause within RETIME_SNAP_SECONDS.
+    """
+    estimated = segments[-1].start_time + segments[-1].duration
+    scale = audio_seconds / estimated if estimated > 0 else 1.0
+    snap = float(os.getenv("RETIME_SNAP_SECONDS", DEFAULT_SNAP_SECONDS))
+    boundaries, previous = [], 0.0
+    for segment in segments[1:]:
+        t = segment.start_time * scale
+        near = [p for p in silences if abs(p - t) <= snap and p > previous]
+        t = min(near, key=lambda p: abs(p - t)) if near else t
+        t = min(max(t, previous), audio_seconds)
+        boundaries.append(t)
+        previous = t
+    return boundaries
+
+def plan_retime(timeline: List[Tuple[float, float, bool]], segments, boundaries: List[float],
+                video_seconds: float, audio_seconds: float) -> List[Tuple[float, Optional[float], float]]:
+    """Pieces of the video to keep, as (start, end, hold): `hold` seconds of the last frame follow.
+
+    Each segment's span of the video starts at the animation nearest to the
+    segment's estimated start. A span that is too short is held at its end; one
+    that is too long has its wait() spans shortened, last wait first. A piece
+    running to the end of the video has end=None.
+    """
+    if not timeline or not boundaries:
+        return [(0.0, None, max(audio_seconds - video_seconds, 0.0))]
+    starts = [start for start, _, _ in timeline]
+    video_cuts, audio_cuts = [0.0], [0.0]
+    for segment, boundary in zip(segments[1:], boundaries):
+        cut = min(starts, key=lambda s: abs(s - segment.start_time))
+        if cut > video_cuts[-1]:
+            video_cuts.append(cut)
+            audio_cuts.append(boundary)
+        # Otherwise no animation starts there; the segment shares the previous span
+    video_cuts.append(video_seconds)
+    audio_cuts.append(audio_seconds)
+
+    pieces = []
+    for k in range(len(video_cuts) - 1):
+        v0, v1 = video_cuts[k], video_cuts[k + 1]
+        delta = (audio_cuts[k + 1] - audio_cuts[k]) - (v1 - v0)
+        removed = []
+        if delta < 0:
+            excess = -delta
+            waits = [(s, s + d) for s, d, wait in timeline if wait and v0 <= s < v1]
+            for s, e in reversed(waits):
+                cut = min(excess, max(min(e, v1) - s - MIN_WAIT_SECONDS, 0.0))
+                if cut > 0:
+                    removed.append((min(e, v1) - cut, min(e, v1)))
+                    excess -= cut
+        keep, position = [], v0
+        for s, e in sorted(removed):
+            keep.append((position, s))
+            position = e
+        keep.append((position, v1))
+        for n, (s, e) in enumerate(keep):
+            hold = max(delta, 0.0) if n == len(keep) - 1 else 0.0
+            if pieces and pieces[-1][2] == 0 and abs(pieces[-1][1] - s) < 1e-6:
+                # Contiguous with the previous piece
+                pieces[-1] = (pieces[-1][0], e, hold)
+            elif e - s > 1e-6 or hold:
+                pieces.append((s, e, hold))
+    start, end, hold = pieces[-1]
+    if abs(end - video_seconds) < 1e-6:
+        pieces[-1] = (start, None, hold)
+    return pieces
+
+def file_hash(path: str, extra: str = "") -> str:
+    digest = hashlib.sha256(extra.encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def retime_video(video_path: str, audio_path: str, pieces, duration: float, output_path: str, index: int = 0):
+    """Cuts, holds and joins the video pieces and adds the audio; raises CalledProcessError on failure.
+
+    `duration` is the length of the joined pieces; the audio is padded with
+    silence to it.
+    """
+    sources = [f"[s{n}]" for n in range(len(pieces))] if len(pieces) > 1 else ["[0:v]"]
+    filters = [f"[0:v]split={len(pieces)}{''.join(sources)}"] if len(pieces) > 1 else []
+    labels = []
+    for n, (start, end, hold) in enumerate(pieces):
+        trim = f"trim=start={start:.3f}" + (f":end={end:.3f}" if end is not None else "")
+        hold_filter = f",tpad=stop_mode=clone:stop_duration={hold:.3f}" if hold > 0 else ""
+        filters.append(f"{sources[n]}{trim},setpts=PTS-STARTPTS{hold_filter}[v{n}]")
+        labels.append(f"[v{n}]")
+    filters.append(f"{''.join(labels)}concat=n={len(pieces)}:v=1:a=0[v]")
+    # The pieces are at least as long as the narration; pad the audio, never cut it
+    filters.append("[1:a]apad[a]")
+    cmd = ["ffmpeg", "-y", "-i", video_path, "-i", audio_path, "-filter_complex", ";".join(filters),
+           "-map", "[v]", "-map", "[a]", "-t", f"{duration:.3f}", "-c:v", "libx264", "-pix_fmt", "yuv420p",
+           "-c:a", "aac", output_path]
+    with span("ffmpeg.retime", cat="subprocess", step=index, pieces=len(pieces)) as retime_span:
+        subprocess.run(cmd, check=True, capture_output=True)
+        retime_span.set(bytes=os.path.getsize(output_path))
+
+def align(video_path: str, audio_path: str, audio_meta, layout: Optional[dict], index: int = 0) -> Optional[str]:
+    """Returns the video retimed to the narration with the audio added, or None if it couldn't be made."""
+    stats = get_stats()
+    timing = json.dumps(audio_meta.model_dump(), sort_keys=True) if audio_meta else ""
+    output_path = os.path.join(cache_dir(), f"{file_hash(video_path)}_{file_hash(audio_path, timing)}.mp4")
+    if os.path.exists(output_path):
+        stats.increment("retime.cached")
+        print(f"--- RENDERER: Reusing retimed video {output_path} ---")
+        return output_path
+
+    video_seconds, audio_seconds = media_duration(video_path), media_duration(audio_path)
+    if video_seconds is None or audio_seconds is None:
+        return None
+    segments = audio_meta.segments if audio_meta else []
+    timeline = animation_timeline(layout)
+    boundaries = audio_boundaries(segments, audio_seconds, pauses(audio_path)) if len(segments) > 1 and timeline else []
+    pieces = plan_retime(timeline, segments, boundaries, video_seconds, audio_seconds)
+    held = sum(hold for _, _, hold in pieces)
+    kept = sum((end if end is not None else video_seconds) - start for start, end, _ in pieces)
+    trimmed = video_seconds - kept
+    os.makedirs(cache_dir(), exist_ok=True)
+    partial_path = output_path + ".part.mp4"
+    try:
+        retime_video(video_path, audio_path, pieces, max(kept + held, audio_seconds), partial_path, index)
+        os.replace(partial_path, output_path)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"--- RENDERER: Retiming failed: {e} ---")
+        stats.increment("retime.failed")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        return None
+    stats.increment("retime.aligned")
+    stats.add_sample("retime.held", held)
+    stats.add_sample("retime.trimmed", trimmed)
+    print(f"--- RENDERER: Retimed {video_seconds:.1f}s of video to {audio_seconds:.1f}s of narration "
+          f"in {len(pieces)} pieces (+{held:.1f}s held, -{trimmed:.1f}s of waits) ---")
+    return output_path
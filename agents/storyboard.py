@@ -1,6 +1,10 @@
+import os
+import time
+from pydantic import BaseModel
 from schemas.state import AgentState
 from schemas.storyboard import Storyboard
 from utils import structured_generator
+from token_budget import compact, with_legend
 
 SYSTEM_PROMPT = """
 You are a visual designer creating educational animations
@@ -39,7 +43,67 @@ Output STRICT JSON following this schema:
 }}
 """
 
+# Fused mode: one call drafts the storyboard, reviews it against the critic's
+# checklist and returns the revised storyboard together with the critique.
+FUSED_SYSTEM_PROMPT = """
+You are a visual designer creating educational animations
+in the style of 3Blue1Brown, and your own strict reviewer.
+
+Your task is to convert a teaching explanation into a
+visual storyboard in three stages:
+1. Draft a storyboard.
+2. Critique the draft for:
+   - Conceptual clarity
+   - Visual alignment with explanation
+   - Overcomplexity
+   - Missing intuition
+   - Every animation target must be the id of an object
+3. Return the REVISED storyboard that fixes every issue you found.
+
+Rules:
+- Use detailed animations for best learning experience.
+- Prefer spatial intuition over text.
+- Introduce objects gradually.
+- Each animation must have a clear purpose.
+- Avoid clutter.
+
+Output STRICT JSON following this schema:
+{{
+  "critique": string,
+  "approved": true | false,
+  "storyboard": {{
+    "scene_id": number,
+    "title": string,
+    "objects": [
+      {{
+        "id": string,
+        "type": "dot | line | arrow | text | axes | surface | group",
+        "label": string | null,
+        "position": "left | right | center | top | bottom | null"
+      }}
+    ],
+    "animations": [
+      {{
+        "action": "fade_in | move | transform | highlight | fade_out",
+        "target": string,
+        "description": string
+      }}
+    ],
+    "duration": number
+  }}
+}}
+
+Set "approved" to true only if the revised storyboard passes your own review.
+"""
+
+class FusedStoryboard(BaseModel):
+    critique: str
+    approved: bool
+    storyboard: Storyboard
 
+def storyboard_mode() -> str:
+    """Deployment switch: 'loop' (storyboard then critic) or 'fused'."""
+    return os.getenv("STORYBOARD_MODE", "loop")
 
 def storyboard_agent(state: AgentState) -> AgentState:
     """Data processing node for the Storyboard Agent."""
@@ -51,25 +115,69 @@ def storyboard_agent(state: AgentState) -> AgentState:
     index = state["current_step_index"]
     cache_key = f"step_{index}_storyboard"
     
+    # A rejection from the critic means the cached storyboard must be revised
+    feedback = state.get("critique_feedback")
+    revising = bool(feedback) and not state.get("approved") and state.get("critic_iterations", 0) > 0
+
     # Check cache
-    if session and session.has_cached(cache_key):
+    if not revising and session and session.has_cached(cache_key):
         print(f"--- STORYBOARD: Loading cached storyboard for step {index} ---")
         cached = session.get_cached(cache_key)
         storyboard = Storyboard(**cached)
         return {"current_storyboard": storyboard}
 
-    print(f"--- STORYBOARD: visualizing '{script.title}' ---")
-    
-    storyboard = structured_generator(
-        system_prompt=SYSTEM_PROMPT,
-        user_prompt=f"Create a storyboard for this explanation:\n{script.model_dump_json()}",
-        output_schema=Storyboard
-    )
+    if revising:
+        print(f"--- STORYBOARD: Revising '{script.title}' based on feedback ---")
+        user_prompt = f"""
+        PREVIOUS STORYBOARD:
+        {compact(state["current_storyboard"], short_keys=False)}
+
+        CRITIC FEEDBACK:
+        {feedback}
+
+        Please FIX the storyboard for this explanation:
+        {compact(script)}
+        """
+    else:
+        print(f"--- STORYBOARD: visualizing '{script.title}' ---")
+        user_prompt = f"Create a storyboard for this explanation:\n{compact(script)}"
+
+    # Start the clock on the first draft; the critic records it on approval
+    result = {"self_approved": False}
+    if not state.get("storyboard_started_at"):
+        result["storyboard_started_at"] = time.time()
+
+    user_prompt = with_legend(user_prompt)
+    storyboard = None
+    if storyboard_mode() == "fused":
+        try:
+            fused = structured_generator(
+                system_prompt=FUSED_SYSTEM_PROMPT,
+                user_prompt=user_prompt,
+                output_schema=FusedStoryboard,
+                agent="storyboard"
+            )
+            storyboard = fused.storyboard
+            result["self_approved"] = fused.approved
+            result["critique_feedback"] = fused.critique
+            print(f"--- STORYBOARD: Self-critique {'APPROVED' if fused.approved else 'REJECTED'}: {fused.critique} ---")
+        except Exception as e:
+            # The separate critic loop remains the fallback
+            print(f"--- STORYBOARD: Fused generation failed ({e}), falling back to plain storyboard ---")
+
+    if storyboard is None:
+        storyboard = structured_generator(
+            system_prompt=SYSTEM_PROMPT,
+            user_prompt=user_prompt,
+            output_schema=Storyboard,
+            agent="storyboard"
+        )
     
     # Cache the result
     if session:
         session.set_cached(cache_key, storyboard.model_dump())
         print(f"--- STORYBOARD: Storyboard cached ---")
     
-    return {"current_storyboard": storyboard}
+    result["current_storyboard"] = storyboard
+    return result
 
@@ -1,6 +1,9 @@
 from schemas.state import AgentState
 from schemas.script import TeachingScript
 from utils import structured_generator
+from token_budget import compact
+from structured_stream import StructuredStream, streaming_enabled
+from agents.audio import stream_narration_to_tts
 
 SYSTEM_PROMPT = """
 You are an exceptional teacher inspired by 3Blue1Brown.
@@ -51,11 +54,24 @@ def teacher_agent(state: AgentState) -> AgentState:
     step = curriculum.steps[index]
     print(f"--- TEACHER: Explaining step {step.id} - {step.title} ---")
     
-    script = structured_generator(
-        system_prompt=SYSTEM_PROMPT,
-        user_prompt=f"Explain this step: {step.model_dump_json()}",
-        output_schema=TeachingScript
-    )
+    # Speak the narration while key_points and analogy are still being generated
+    stream, finish_tts = None, None
+    if streaming_enabled():
+        stream = StructuredStream(TeachingScript)
+        finish_tts = stream_narration_to_tts(session, index, stream)
+
+    script = None
+    try:
+        script = structured_generator(
+            system_prompt=SYSTEM_PROMPT,
+            user_prompt=f"Explain this step: {compact(step)}",
+            output_schema=TeachingScript,
+            agent="teacher",
+            stream=stream
+        )
+    finally:
+        if finish_tts:
+            finish_tts(script.narration if script else None)
     
     # Cache the result
     if session:
@@ -0,0 +1,153 @@
+"""Batch entry point: run many topics through one process.
+
+Topics share a worker pool, provider clients, the pipeline stats and global
+limits on concurrent LLM calls and renders. Progress is written to a manifest
+after every state change, so an interrupted batch resumes where it left off:
+finished topics are skipped and unfinished ones continue from their session
+cache.
+
+Usage:
+    python batch.py topics.txt
+    cat topics.txt | python batch.py - --workers 4 --max-llm-calls 4 --max-renders 2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import traceback
+import contextvars
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional
+
+from session_manager import SessionManager
+from tracing import start_trace, stop_trace
+import concurrency
+
+class BatchManifest:
+    """Per-topic status and results, persisted as JSON after every update."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.topics = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.topics = json.load(f).get("topics", {})
+
+    def _save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"topics": self.topics}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def update(self, topic: str, **fields):
+        with self._lock:
+            self.topics.setdefault(topic, {}).update(fields)
+            self._save()
+
+    def is_done(self, topic: str) -> bool:
+        entry = self.topics.get(topic, {})
+        video = entry.get("video")
+        return entry.get("status") == "done" and bool(video) and os.path.exists(video)
+
+def read_topics(source: str) -> List[str]:
+    """Reads one topic per line from a file or stdin ('-'); '#' starts a comment."""
+    stream = sys.stdin if source == "-" else open(source, 'r', encoding='utf-8')
+    with stream:
+        lines = [line.split("#", 1)[0].strip() for line in stream]
+    # Keep the first occurrence of each topic
+    return list(dict.fromkeys(line for line in lines if line))
+
+def run_topic(topic: str, manifest: BatchManifest) -> Optional[str]:
+    """Runs one topic through the graph and records the outcome."""
+    from main import build_initial_state, run_cached, load_graph, RECURSION_LIMIT
+
+    session = SessionManager(topic)
+    manifest.update(topic, status="running", session_dir=str(session.session_dir),
+                    started_at=time.time(), error=None)
+    started = time.perf_counter()
+    tracer = start_trace(topic)
+    try:
+        with session.running():
+            result = run_cached(session)
+            if result is None:
+                result = load_graph().invoke(build_initial_state(session), {"recursion_limit": RECURSION_LIMIT})
+        video = result.get("mp4_file_path")
+        status = "done" if video and os.path.exists(video) else "failed"
+        manifest.update(topic, status=status, video=video,
+                        error=None if status == "done" else "No final video produced",
+                        finished_at=time.time(), duration_s=time.perf_counter() - started)
+        return video
+    except Exception as e:
+        manifest.update(topic, status="failed", error=f"{type(e).__name__}: {e}",
+                        finished_at=time.time(), duration_s=time.perf_counter() - started)
+        print(traceback.format_exc())
+        return None
+    finally:
+        if tracer:
+            tracer.export(session.session_dir)
+            stop_trace()
+
+def run_batch(topics: List[str], manifest: BatchManifest, workers: int) -> dict:
+    pending = [t for t in topics if not manifest.is_done(t)]
+    skipped = len(topics) - len(pending)
+    if skipped:
+        print(f"--- BATCH: Resuming; {skipped} topic(s) already done ---")
+    for topic in pending:
+        if manifest.topics.get(topic, {}).get("status") != "running":
+            manifest.update(topic, status="pending")
+
+    print(f"--- BATCH: {len(pending)} topic(s) with {workers} worker(s) ---")
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="topic")
+    try:
+        # Each topic gets its own context so per-topic tracers don't collide
+        futures = {
+            executor.submit(contextvars.copy_context().run, run_topic, topic, manifest): topic
+            for topic in pending
+        }
+        for future in as_completed(futures):
+            topic = futures[future]
+            status = manifest.topics[topic]["status"]
+            print(f"--- BATCH: {topic}: {status} ---")
+    except KeyboardInterrupt:
+        print("--- BATCH: Interrupted; rerun the same command to resume ---")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    counts = {}
+    for topic in topics:
+        status = manifest.topics.get(topic, {}).get("status", "pending")
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run many topics through the pipeline.")
+    parser.add_argument("topics", help="File with one topic per line, or '-' for stdin")
+    parser.add_argument("--workers", type=int, default=2, help="Topics processed concurrently")
+    parser.add_argument("--max-llm-calls", type=int, default=4, help="Concurrent LLM calls across topics")
+    parser.add_argument("--max-renders", type=int, default=1, help="Concurrent Manim renders across topics")
+    parser.add_argument("--manifest", default="sessions/batch_manifest.json", help="Status/result manifest path")
+    args = parser.parse_args(argv)
+
+    topics = read_topics(args.topics)
+    if not topics:
+        print("No topics given.")
+        sys.exit(1)
+
+    Path(args.manifest).parent.mkdir(parents=True, exist_ok=True)
+    concurrency.configure(llm_calls=args.max_llm_calls, renders=args.max_renders)
+    manifest = BatchManifest(args.manifest)
+    counts = run_batch(topics, manifest, args.workers)
+
+    print("=" * 50)
+    print("BATCH COMPLETE: " + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    print(f"Manifest: {args.manifest}")
+    if counts.get("failed"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+"""Offline benchmark for the Agentic Teacher pipeline.
+
+Runs the real `compiled_graph` with deterministic fake providers so pipeline
+overhead, session-store cost and scheduling can be measured without paying
+for Ollama, Gemini, OpenAI, gTTS or real renders:
+- LLMs are replaced by `FakeChatModel`, which answers each agent's prompt with
+  schema-valid JSON after a seeded log-normal latency, failing at a given rate
+- gTTS is replaced by a fake module that writes a small mp3 after a delay
+- `manim` and `ffmpeg` are replaced by fake executables on PATH that write
+  small output files where the real tools would
+
+Usage:
+    python benchmark.py --topics 3 --steps 4
+    git stash; python benchmark.py --topics 3 --steps 4 --save-baseline benchmarks/baseline.json; git stash pop
+    python benchmark.py --topics 3 --steps 4 --compare benchmarks/baseline.json
+    python benchmark.py --topics 8 --steps 2 --workers 4 --max-renders 2
+    python benchmark.py --topics 2 --steps 2 --hedge --llm-latency 0.3 --failure-rate 0.2
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from types import ModuleType
+from typing import Any, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+DIFFICULTIES = ["intuitive", "visual", "mathematical", "applied"]
+NARRATION_WORDS = 40
+
+FAKE_SCENE = """from manim import *
+
+class GeneratedScene(Scene):
+    def construct(self):
+        dot = Dot()
+        self.play(FadeIn(dot))
+        self.wait(2)
+"""
+
+# --- Fake LLM ---
+
+def _rendered(prompt: str) -> str:
+    """System prompts as the model sees them, after template brace unescaping."""
+    return prompt.replace("{{", "{").replace("}}", "}").strip()
+
+def _prompt_kinds() -> dict:
+    from agents import planner, teacher, storyboard, critic, audio, manim_codegen, code_critic
+    return {
+        _rendered(planner.SYSTEM_PROMPT): "planner",
+        _rendered(teacher.SYSTEM_PROMPT): "teacher",
+        _rendered(storyboard.SYSTEM_PROMPT): "storyboard",
+        _rendered(storyboard.FUSED_SYSTEM_PROMPT): "fused_storyboard",
+        _rendered(critic.SYSTEM_PROMPT): "critic",
+        _rendered(audio.SYSTEM_PROMPT): "audio",
+        _rendered(manim_codegen.SYSTEM_PROMPT): "manim",
+        _rendered(code_critic.SYSTEM_PROMPT): "code_critic",
+    }
+
+def _first_int(pattern: str, text: str, default: int = 1) -> int:
+    match = re.search(pattern, text)
+    return int(match.group(1)) if match else default
+
+def _storyboard(scene_id: int) -> dict:
+    duration = round(NARRATION_WORDS / 150 * 60)
+    return {
+        "scene_id": scene_id,
+        "title": f"Scene {scene_id}",
+        "objects": [
+            {"id": "axes", "type": "axes", "position": "center"},
+            {"id": "point", "type": "dot", "label": "x"},
+            {"id": "caption", "type": "text", "label": "Idea", "position": "top"},
+        ],
+        "animations": [
+            {"action": "fade_in", "target": "axes", "description": "Show the axes"},
+            {"action": "fade_in", "target": "point", "description": "Place the point"},
+            {"action": "move", "target": "point", "description": "Move the point"},
+            {"action": "fade_in", "target": "caption", "description": "Name the idea"},
+        ],
+        "duration": duration,
+    }
+
+def fake_response(kind: str, user: str, rng: random.Random, steps: int, approve_rate: float) -> dict:
+    """Schema-valid answer for an agent's prompt."""
+    if kind == "planner":
+        return {"topic": "Benchmark", "steps": [
+            {"id": i + 1, "title": f"Step {i + 1}", "goal": "Build intuition.",
+             "difficulty": DIFFICULTIES[i % len(DIFFICULTIES)]}
+            for i in range(steps)
+        ]}
+    if kind == "teacher":
+        step_id = _first_int(r'"id":\s*(\d+)', user)
+        sentence = "Picture a point sliding along a line as we watch it move. "
+        narration = (sentence * math.ceil(NARRATION_WORDS / len(sentence.split()))).strip()
+        narration = " ".join(narration.split()[:NARRATION_WORDS])
+        return {"step_id": step_id, "title": f"Step {step_id}", "narration": narration,
+                "key_points": ["Points move", "Lines guide"], "analogy": "A bead on a wire."}
+    if kind == "storyboard":
+        return _storyboard(_first_int(r'"step_id":\s*(\d+)', user))
+    if kind == "fused_storyboard":
+        return {"critique": "Clear and uncluttered.", "approved": rng.random() < approve_rate,
+                "storyboard": _storyboard(_first_int(r'"step_id":\s*(\d+)', user))}
+    if kind in ("critic", "code_critic"):
+        approved = rng.random() < approve_rate
+        return {"approved": approved, "feedback": "Looks good." if approved else "Simplify the motion."}
+    if kind == "audio":
+        scene_id = _first_int(r'"scene(?:_id)?":\s*(\d+)', user)
+        return {"scene_id": scene_id, "voice_style": "calm", "total_duration": 16.0, "segments": [
+            {"text": "Picture a point.", "start_time": 0.0, "duration": 8.0},
+            {"text": "Watch it move.", "start_time": 8.0, "duration": 8.0},
+        ]}
+    if kind == "manim":
+        return {"code": FAKE_SCENE, "explanation": "A dot fades in."}
+    raise ValueError(f"Unknown prompt kind: {kind}")
+
+STREAM_CHUNK_CHARS = 16
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic stand-in for a chat provider."""
+
+    provider: str = "fake"
+    steps: int = 3
+    median_latency: float = 0.05
+    latency_sigma: float = 0.5
+    failure_rate: float = 0.0
+    approve_rate: float = 0.9
+    seed: int = 0
+
+    _rng: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default=None)
+    _kinds: Any = PrivateAttr(default=None)
+
+    def model_post_init(self, __context):
+        self._rng = random.Random(f"{self.provider}:{self.seed}")
+        self._lock = threading.Lock()
+        self._kinds = _prompt_kinds()
+
+    @property
+    def _llm_type(self) -> str:
+        return f"fake-{self.provider}"
+
+    def _respond(self, messages):
+        system, user = messages[0].content.strip(), messages[-1].content
+        kind = self._kinds.get(system)
+        with self._lock:
+            latency = self.median_latency * math.exp(self._rng.gauss(0, self.latency_sigma))
+            fail = self._rng.random() < self.failure_rate
+            content = json.dumps(fake_response(kind, user, self._rng, self.steps, self.approve_rate))
+        return content, latency, fail
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content, latency, fail = self._respond(messages)
+        time.sleep(latency)
+        if fail:
+            raise RuntimeError(f"{self.provider}: simulated provider failure")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # Same latency, spread over the response like token-by-token generation
+        content, latency, fail = self._respond(messages)
+        if fail:
+            time.sleep(latency)
+            raise RuntimeError(f"{self.provider}: simulated provider failure")
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        for piece in pieces:
+            time.sleep(latency / len(pieces))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+def install_fake_llms(backup: Optional[dict] = None, **profile):
+    """Routes every provider factory (utils.get_*_llm and imported copies) to fakes.
+
+    With `backup`, hedged calls go to a separate fake with that profile
+    instead of another primary.
+    """
+    import utils
+    fakes = {
+        "get_llm": FakeChatModel(provider="ollama", **profile),
+        "get_gemini_llm": FakeChatModel(provider="gemini", **profile),
+        "get_openai_llm": FakeChatModel(provider="openai", **profile),
+    }
+    if backup is not None:
+        fakes["get_hedge_llm"] = FakeChatModel(provider="backup", **{**profile, **backup})
+    modules = [utils] + [m for name, m in list(sys.modules.items()) if name.startswith("agents.")]
+    for module in modules:
+        for factory, fake in fakes.items():
+            if hasattr(module, factory):
+                setattr(module, factory, lambda *_, fake=fake: fake)
+
+# --- Fake TTS and tools ---
+
+def install_fake_tts(latency: float):
+    """Replaces gTTS with a module that writes a small mp3 after `latency` seconds."""
+    module = ModuleType("gtts")
+
+    class gTTS:
+        def __init__(self, text, lang="en", slow=False):
+            self.text = text
+
+        def save(self, path):
+            time.sleep(latency)
+            with open(path, "wb") as f:
+                f.write(b"ID3" + b"\0" * (16 * len(self.text)))
+
+    module.gTTS = gTTS
+    sys.modules["gtts"] = module
+
+FAKE_MANIM = r'''#!{python}
+import os, sys, time
+args = sys.argv[1:]
+options = {}
+positional = []
+i = 0
+while i < len(args):
+    if args[i] in ("--media_dir", "-o", "--output_file", "-n"):
+        options[args[i]] = args[i + 1]
+        i += 2
+    elif args[i].startswith("-"):
+        i += 1
+    else:
+        positional.append(args[i])
+        i += 1
+file_path, scene = positional[0], positional[1]
+module = os.path.splitext(os.path.basename(file_path))[0]
+media_dir = options.get("--media_dir", "media")
+latency = float(os.getenv("BENCH_RENDER_LATENCY", "0.2"))
+# One play()/wait() per entry, matching the fake audio's 16s of narration
+ANIMATIONS = ("Create(Axes)", "FadeIn(Dot)", "Wait(Mobject)")
+RUN_TIMES = (4.0, 4.0, 8.0)
+first, _, last = options.get("-n", "0").partition(",")
+first, last = int(first), int(last) if last else len(ANIMATIONS) - 1
+if "-s" in args:
+    # Last frame only: animations are skipped
+    image_dir = os.path.join(media_dir, "images", module)
+    os.makedirs(image_dir, exist_ok=True)
+    time.sleep(latency / 10)
+    with open(os.path.join(image_dir, scene + "_ManimCE_vfake.png"), "wb") as f:
+        f.write(b"\x89PNG" + b"\0" * 64)
+    if os.getenv("PREVIEW_LAYOUT_PATH"):
+        import json
+        boxes = [{"class": "Dot", "text": None, "box": [-0.1, -0.1, 0.1, 0.1]},
+                 {"class": "Text", "text": "A dot", "box": [-1.0, 0.5, 1.0, 1.0]}]
+        snapshots = [{"animation": n, "run_time": run_time, "wait": desc.startswith("Wait"), "mobjects": boxes}
+                     for n, (desc, run_time) in enumerate(zip(ANIMATIONS, RUN_TIMES))]
+        with open(os.environ["PREVIEW_LAYOUT_PATH"], "w") as f:
+            json.dump({"frame": [14.22, 8.0], "three_d": False,
+                       "snapshots": snapshots + [{"animation": None, "run_time": None, "mobjects": boxes}]}, f)
+    sys.exit(0)
+out_dir = os.path.join(media_dir, "videos", module, "480p15")
+os.makedirs(out_dir, exist_ok=True)
+# Partial movie files keyed by the code up to each animation, like Manim's
+# hash of the animation and the scene state before it
+import hashlib
+caching = "--disable_caching" not in args
+lines = open(file_path).read().splitlines()
+calls = [i for i, line in enumerate(lines) if "self.play(" in line or "self.wait(" in line]
+partial_dir = os.path.join(out_dir, "partial_movie_files", scene)
+os.makedirs(partial_dir, exist_ok=True)
+# tqdm-style progress on stderr, like Manim: one bar per play()/wait()
+for index, desc in enumerate(ANIMATIONS):
+    if not first <= index <= last:
+        continue
+    end = calls[index] + 1 if index < len(calls) else len(lines)
+    segment = os.path.join(partial_dir, hashlib.sha1(chr(10).join(lines[:end]).encode()).hexdigest()[:16] + ".mp4")
+    if caching and os.path.exists(segment):
+        sys.stderr.write(f"Animation {index} : Using cached data (hash : {os.path.basename(segment)})\n")
+        continue
+    sys.stderr.write(f"Animation {index}: {desc}:   0%|          | 0/15 [00:00<?, ?it/s]\r")
+    sys.stderr.flush()
+    time.sleep(latency / 3)
+    sys.stderr.write(f"Animation {index}: {desc}: 100%|##########| 15/15 [00:00<00:00, 60.00it/s]\n")
+    sys.stderr.flush()
+    if caching:
+        with open(segment, "wb") as f:
+            f.write(b"\0" * 1024)
+with open(os.path.join(out_dir, scene + ".mp4"), "wb") as f:
+    f.write(b"\0" * 4096)
+# The shared glyph cache: the first render on the host builds the scene's text
+if "glyph_cache.install()" in open(file_path).read() and os.getenv("GLYPH_CACHE_STATS_PATH"):
+    import json
+    entry = os.path.join(media_dir, "glyph_cache", "fake.npz")
+    hit = os.path.exists(entry)
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    open(entry, "wb").close()
+    with open(os.environ["GLYPH_CACHE_STATS_PATH"], "w") as f:
+        json.dump({"hits": 2 if hit else 0, "misses": 0 if hit else 2, "build_s": 0.0 if hit else 0.4,
+                   "load_s": 0.01 if hit else 0.0, "saved_s": 0.39 if hit else 0.0}, f)
+print("File ready at " + os.path.join(out_dir, scene + ".mp4"))
+'''
+
+FAKE_FFMPEG = r'''#!{python}
+import os, sys, time
+if "-version" in sys.argv:
+    print("ffmpeg version fake")
+    sys.exit(0)
+time.sleep(float(os.getenv("BENCH_FFMPEG_LATENCY", "0.02")))
+if sys.argv[-1] != "-":
+    with open(sys.argv[-1], "wb") as f:
+        f.write(b"\0" * 4096)
+'''
+
+# Durations from file sizes: a fake video lasts 16s, fake speech about 1s per 16 characters
+FAKE_FFPROBE = r'''#!{python}
+import os, sys
+print(os.path.getsize(sys.argv[-1]) / 256.0)
+'''
+
+def install_fake_tools(bin_dir: Path, render_latency: float, ffmpeg_latency: float):
+    """Puts fake `manim`, `ffmpeg` and `ffprobe` executables first on PATH."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, source in (("manim", FAKE_MANIM), ("ffmpeg", FAKE_FFMPEG), ("ffprobe", FAKE_FFPROBE)):
+        path = bin_dir / name
+        path.write_text(source.replace("{python}", sys.executable), encoding="utf-8")
+        path.chmod(0o755)
+    os.environ["PATH"] = str(bin_dir) + os.pathsep + os.environ.get("PATH", "")
+    os.environ["BENCH_RENDER_LATENCY"] = str(render_latency)
+    os.environ["BENCH_FFMPEG_LATENCY"] = str(ffmpeg_latency)
+
+# --- Running and reporting ---
+
+def _percentiles(values: List[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50_s": ordered[len(ordered) // 2],
+        "p95_s": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "mean_s": sum(ordered) / len(ordered),
+    }
+
+def run_benchmark(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="agentic-bench-"))
+    os.environ["PIPELINE_STATS_PATH"] = str(workdir / "sessions" / "pipeline_stats.json")
+    install_fake_tools(workdir / "bin", args.render_latency, args.ffmpeg_latency)
+    install_fake_tts(args.tts_latency)
+
+    from graph import compiled_graph
+    from main import build_initial_state, RECURSION_LIMIT
+    from session_manager import SessionManager
+    import tracing
+
+    backup = None
+    if args.hedge:
+        # A slow or failing primary (--llm-latency, --failure-rate) hedged to a fast, reliable backup
+        os.environ["HEDGE_ENABLED"] = "1"
+        os.environ["HEDGE_DELAY"] = str(args.hedge_delay)
+        backup = {"median_latency": args.backup_latency, "failure_rate": 0.0}
+    install_fake_llms(backup=backup, steps=args.steps, median_latency=args.llm_latency, latency_sigma=args.llm_sigma,
+                      failure_rate=args.failure_rate, approve_rate=args.approve_rate, seed=args.seed)
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    tracer = tracing.start_trace("benchmark", force=True)
+    failures = 0
+    started = time.perf_counter()
+    try:
+        topics = [f"Benchmark Topic {i}" for i in range(args.topics)]
+        if args.workers > 1:
+            # Exercise the batch scheduler and its global limits
+            import concurrency
+            from batch import BatchManifest, run_batch
+            concurrency.configure(llm_calls=args.max_llm_calls, renders=args.max_renders)
+            counts = run_batch(topics, BatchManifest(str(workdir / "batch_manifest.json")), args.workers)
+            failures = counts.get("failed", 0)
+        else:
+            for topic in topics:
+                session = SessionManager(topic)
+                try:
+                    compiled_graph.invoke(build_initial_state(session), {"recursion_limit": RECURSION_LIMIT})
+                except Exception as e:
+                    failures += 1
+                    print(f"--- BENCH: {topic} failed: {e} ---")
+    finally:
+        wall = time.perf_counter() - started
+        tracing.stop_trace()
+        os.chdir(cwd)
+
+    nodes = {}
+    llm_latencies = []
+    for event in tracer.events:
+        if event["ph"] != "X":
+            continue
+        if event["name"].startswith("node."):
+            nodes.setdefault(event["name"][5:], []).append(event["dur"] / 1e6)
+        elif event["name"] == "llm":
+            llm_latencies.append(event["dur"] / 1e6)
+    summary = tracer.summary()
+    store = summary["spans"].get("session.save", {"count": 0, "total_s": 0.0, "attributes": {}})
+
+    results = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("save_baseline", "compare", "threshold", "keep")},
+        "wall_s": wall,
+        "failures": failures,
+        "topics_per_min": args.topics / wall * 60,
+        "steps_per_min": args.topics * args.steps / wall * 60,
+        "nodes": {name: _percentiles(values) for name, values in sorted(nodes.items())},
+        "llm": _percentiles(llm_latencies) if llm_latencies else {},
+        "session_store": {
+            "writes": store["count"],
+            "total_s": store["total_s"],
+            "bytes_written": store["attributes"].get("bytes", 0),
+            "share_of_wall": store["total_s"] / wall if wall else 0.0,
+        },
+    }
+    if args.hedge:
+        from utils import get_hedge_stats
+        results["hedge"] = get_hedge_stats()
+    if args.keep:
+        print(f"--- BENCH: Work directory kept at {workdir} ---")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def config_differences(results: dict, baseline: dict) -> List[str]:
+    """Benchmark settings that differ from the baseline's, which makes their timings incomparable."""
+    old = baseline.get("config", {})
+    return [f"{name}: {old.get(name)!r} -> {value!r}" for name, value in results["config"].items()
+            if name in old and old[name] != value]
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Lists metrics that are more than `threshold` slower than the baseline."""
+    regressions = []
+
+    def check(label, new, old):
+        if old and new > old * (1 + threshold):
+            regressions.append(f"{label}: {old:.4f}s -> {new:.4f}s (+{(new / old - 1) * 100:.0f}%)")
+
+    check("wall", results["wall_s"], baseline.get("wall_s"))
+    check("session_store", results["session_store"]["total_s"], baseline.get("session_store", {}).get("total_s"))
+    for name, stats in results["nodes"].items():
+        old = baseline.get("nodes", {}).get(name)
+        if old:
+            check(f"node.{name}.p95", stats["p95_s"], old["p95_s"])
+    return regressions
+
+def print_report(results: dict):
+    print("=" * 60)
+    print(f"Wall time: {results['wall_s']:.2f}s  failures: {results['failures']}")
+    print(f"Throughput: {results['topics_per_min']:.1f} topics/min, {results['steps_per_min']:.1f} steps/min")
+    print(f"{'node':<14}{'count':>7}{'p50 (s)':>10}{'p95 (s)':>10}")
+    for name, stats in results["nodes"].items():
+        print(f"{name:<14}{stats['count']:>7}{stats['p50_s']:>10.4f}{stats['p95_s']:>10.4f}")
+    store = results["session_store"]
+    print(f"Session store: {store['writes']} writes, {store['total_s']:.4f}s, "
+          f"{store['bytes_written']} bytes ({store['share_of_wall'] * 100:.1f}% of wall)")
+    hedge = results.get("hedge")
+    if hedge:
+        print(f"Hedging: {hedge['calls']} calls, {hedge['hedge_rate'] * 100:.1f}% hedged, "
+              f"{hedge['failovers']} failovers, {hedge['backup_wins']} backup wins, "
+              f"~{hedge['time_saved']:.2f}s saved")
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline benchmark with fake providers.")
+    parser.add_argument("--topics", type=int, default=3, help="Number of topics (N)")
+    parser.add_argument("--steps", type=int, default=3, help="Curriculum steps per topic (M)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Median fake LLM latency (s)")
+    parser.add_argument("--llm-sigma", type=float, default=0.5, help="Log-normal sigma of LLM latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--approve-rate", type=float, default=0.9, help="Fraction of critic approvals")
+    parser.add_argument("--tts-latency", type=float, default=0.05, help="Fake TTS latency (s)")
+    parser.add_argument("--render-latency", type=float, default=0.2, help="Fake Manim render latency (s)")
+    parser.add_argument("--ffmpeg-latency", type=float, default=0.02, help="Fake ffmpeg latency (s)")
+    parser.add_argument("--workers", type=int, default=1, help="Run topics through batch.py's worker pool")
+    parser.add_argument("--max-llm-calls", type=int, default=4, help="Global LLM call limit with --workers")
+    parser.add_argument("--max-renders", type=int, default=1, help="Global render limit with --workers")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Hedge the (slow/failing) fake providers to a fast fake backup")
+    parser.add_argument("--hedge-delay", type=float, default=0.1,
+                        help="Hedge delay (s) until enough latency samples exist, with --hedge")
+    parser.add_argument("--backup-latency", type=float, default=0.02, help="Median backup latency (s) with --hedge")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a saved baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown reported as regression")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary work directory")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    print_report(results)
+
+    if args.save_baseline:
+        path = Path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"--- BENCH: Baseline saved to {path} ---")
+
+    if args.compare:
+        path = Path(args.compare)
+        if not path.exists():
+            # Timings are machine-specific, so baselines aren't committed; record one from the base commit
+            sys.exit(f"No baseline at {path}. Record one on this machine with --save-baseline {path}")
+        baseline = json.loads(path.read_text(encoding="utf-8"))
+        differences = config_differences(results, baseline)
+        if differences:
+            print("WARNING: the baseline was recorded with other settings:")
+            for line in differences:
+                print(f"  - {line}")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Checks import-time budgets for the CLI entry points.
+
+Each module is imported in a fresh interpreter with `-X importtime`, best of
+--repeat runs. Budgets are relative to a bare `import pydantic` measured the
+same way, so the check follows the speed of the machine (and its current
+load) instead of failing on slow hosts. A module fails if it takes longer
+than its budget (scaled by IMPORT_BUDGET_SCALE) or pulls in a module it must
+not.
+
+    python check_import_time.py
+    python check_import_time.py --top 10    # also list the slowest imports
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+# Provider SDKs are only imported when a client is first created
+LLM_SDKS = ("langchain_openai", "langchain_google_genai", "langchain_ollama", "openai", "google.genai")
+
+# Every budget is a multiple of the time `import pydantic` takes
+BASELINE_MODULE = "pydantic"
+
+# module -> (budget in baseline units, modules that must not be imported).
+# About twice what the modules take, since import times vary between runs.
+BUDGETS = {
+    # Entry points and the cached fast path: no LangGraph, no LLM SDK
+    "main": (1.0, LLM_SDKS + ("langgraph",)),
+    # Mostly pydantic itself, through schemas.state
+    "agents.concatenator": (6.0, LLM_SDKS + ("langgraph",)),
+    "batch": (1.0, LLM_SDKS + ("langgraph",)),
+    "job_server": (2.0, LLM_SDKS + ("langgraph",)),
+    # Building the graph needs LangGraph but still no provider SDK
+    "graph": (40.0, LLM_SDKS),
+}
+
+def measure_once(module: str) -> dict:
+    """Imports `module` in a fresh interpreter; returns cumulative times and loaded modules."""
+    code = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1e6
+    return {"seconds": times.get(module, 0.0), "times": times, "loaded": set(proc.stdout.split())}
+
+def measure(module: str, repeat: int = 3) -> dict:
+    """The fastest of `repeat` imports of `module`."""
+    return min((measure_once(module) for _ in range(max(repeat, 1))), key=lambda result: result["seconds"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import-time budgets.")
+    parser.add_argument("--top", type=int, default=0, help="Show the N slowest imports per module")
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per module; the fastest counts")
+    args = parser.parse_args()
+    scale = float(os.getenv("IMPORT_BUDGET_SCALE", "1.0"))
+
+    baseline = measure(BASELINE_MODULE, args.repeat)["seconds"]
+    print(f"Baseline: import {BASELINE_MODULE} takes {baseline:.3f}s")
+    failures = 0
+    for module, (units, forbidden) in BUDGETS.items():
+        result = measure(module, args.repeat)
+        budget = units * baseline * scale
+        leaked = sorted(m for m in result["loaded"] if m.split(".")[0] in forbidden or m in forbidden)
+        ok = result["seconds"] <= budget and not leaked
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {module}: {result['seconds']:.3f}s (budget {budget:.2f}s)")
+        if leaked:
+            print(f"     imports forbidden modules: {', '.join(sorted({m.split('.')[0] for m in leaked}))}")
+        if args.top:
+            # Interpreter startup imports (site, ...) are also reported; skip
+            # anything slower than the module itself
+            nested = [(n, t) for n, t in result["times"].items() if n != module and t <= result["seconds"]]
+            for name, seconds in sorted(nested, key=lambda item: item[1], reverse=True)[:args.top]:
+                print(f"     {seconds:.3f}s {name}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
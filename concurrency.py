@@ -0,0 +1,47 @@
+import os
+import threading
+from contextlib import nullcontext
+from typing import Optional
+
+# Process-wide limits on concurrent LLM calls and Manim renders, shared by all
+# topics running in the same process (see batch.py). Unlimited unless set via
+# `configure()` or MAX_CONCURRENT_LLM_CALLS / MAX_CONCURRENT_RENDERS.
+
+_lock = threading.Lock()
+_semaphores = {}
+
+def _limit_from_env(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+def configure(llm_calls: Optional[int] = None, renders: Optional[int] = None):
+    """Sets the global limits; None leaves a limit unchanged."""
+    with _lock:
+        if llm_calls is not None:
+            _semaphores["llm"] = threading.BoundedSemaphore(llm_calls)
+        if renders is not None:
+            _semaphores["render"] = threading.BoundedSemaphore(renders)
+
+def _slot(kind: str, env_name: str):
+    with _lock:
+        if kind not in _semaphores:
+            limit = _limit_from_env(env_name)
+            _semaphores[kind] = threading.BoundedSemaphore(limit) if limit else None
+        semaphore = _semaphores[kind]
+    return semaphore if semaphore is not None else nullcontext()
+
+def llm_slot():
+    """Context manager held for the duration of one LLM call."""
+    return _slot("llm", "MAX_CONCURRENT_LLM_CALLS")
+
+def render_slot():
+    """Context manager held for the duration of one Manim render."""
+    return _slot("render", "MAX_CONCURRENT_RENDERS")
+
+def free_render_slots() -> Optional[int]:
+    """Renders that could start right now without waiting; None if renders are unlimited."""
+    slot = render_slot()
+    if isinstance(slot, nullcontext):
+        return None
+    # BoundedSemaphore keeps no public count of its free slots
+    return slot._value
@@ -5,21 +5,59 @@ from agents.planner import planner_agent
 from agents.teacher import teacher_agent
 from agents.storyboard import storyboard_agent
 from agents.critic import critic_agent
-from agents.audio import audio_agent
+from agents.audio import audio_agent, tts_agent
 from agents.manim_codegen import manim_codegen_agent
 from agents.concatenator import concatenator_agent
 from agents.renderer import renderer_agent
+from tracing import traced_node
+from work_queue import queued_node
+from snapshots import snapshot_node
+from render_limits import should_retry_render
 
 graph = StateGraph(AgentState)
 
-graph.add_node("planner", planner_agent)
-graph.add_node("teacher", teacher_agent)
-graph.add_node("storyboard", storyboard_agent)
-graph.add_node("critic", critic_agent)
-graph.add_node("audio", audio_agent)
-graph.add_node("manim", manim_codegen_agent)
-graph.add_node("renderer", renderer_agent)
-graph.add_node("concatenator", concatenator_agent)
+def pipeline_node(name: str, node, entry: bool = False):
+    """Adds tracing, state snapshots and optional work-queue dispatch to a node."""
+    return traced_node(name, snapshot_node(name, queued_node(name, node), entry=entry))
+
+# The storyboard/critic loop is its own graph. LangGraph runs nodes in
+# supersteps and starts the next step only when every node of the current
+# one has finished, so as separate nodes of the main graph each critic
+# review would wait for TTS. As a single node the whole loop overlaps it.
+review_graph = StateGraph(AgentState)
+review_graph.add_node("storyboard", pipeline_node("storyboard", storyboard_agent))
+review_graph.add_node("critic", pipeline_node("critic", critic_agent))
+review_graph.set_entry_point("storyboard")
+review_graph.add_edge("storyboard", "critic")
+
+def check_approval(state: AgentState):
+    if state["approved"]:
+        return END
+    return "storyboard"
+
+review_graph.add_conditional_edges("critic", check_approval)
+compiled_review_graph = review_graph.compile()
+
+def storyboard_review(state: AgentState, config) -> AgentState:
+    """Runs the storyboard/critic loop until the storyboard is approved.
+
+    Returns only the keys the loop changed, so it can merge with the tts
+    branch that runs beside it.
+    """
+    changes = {}
+    for update in compiled_review_graph.stream(state, config, stream_mode="updates"):
+        for result in update.values():
+            changes.update(result or {})
+    return changes
+
+graph.add_node("planner", pipeline_node("planner", planner_agent, entry=True))
+graph.add_node("teacher", pipeline_node("teacher", teacher_agent))
+graph.add_node("storyboard_review", storyboard_review)
+graph.add_node("tts", pipeline_node("tts", tts_agent))
+graph.add_node("audio", pipeline_node("audio", audio_agent))
+graph.add_node("manim", pipeline_node("manim", manim_codegen_agent))
+graph.add_node("renderer", pipeline_node("renderer", renderer_agent))
+graph.add_node("concatenator", traced_node("concatenator", snapshot_node("concatenator", concatenator_agent)))
 
 def step_cleaner_agent(state: AgentState) -> AgentState:
     """Resets the state for the next step."""
@@ -34,12 +72,19 @@ def step_cleaner_agent(state: AgentState) -> AgentState:
         "mp4_file_path": None,
         "audio_file_path": None,
         "critic_iterations": 0,
+        "self_approved": False,
+        "storyboard_started_at": None,
+        "critic_forced": False,
         "code_critique_feedback": None,
         "code_approved": False,
-        "code_critic_iterations": 0
+        "code_critic_iterations": 0,
+        "code_started_at": None,
+        "code_forced": False,
+        "render_failure": None,
+        "render_attempts": 0
     }
 
-graph.add_node("cleaner", step_cleaner_agent)
+graph.add_node("cleaner", traced_node("cleaner", snapshot_node("cleaner", step_cleaner_agent)))
 
 graph.set_entry_point("planner")
 
@@ -53,19 +98,16 @@ def check_curriculum_status(state: AgentState):
     return "teacher"
 
 graph.add_conditional_edges("planner", check_curriculum_status)
-graph.add_edge("teacher", "storyboard")
-graph.add_edge("storyboard", "critic")
-
-def check_approval(state: AgentState):
-    if state["approved"]:
-        return "audio"
-    return "storyboard"
-
-graph.add_conditional_edges("critic", check_approval)
+# Narration is final once the teacher is done, so speech synthesis runs as
+# its own branch next to the storyboard/critic loop; both join before audio
+# timing, which needs the storyboard and the mp3
+graph.add_edge("teacher", "storyboard_review")
+graph.add_edge("teacher", "tts")
+graph.add_edge(["tts", "storyboard_review"], "audio")
 
 from agents.code_critic import code_critic_agent
 
-graph.add_node("code_critic", code_critic_agent)
+graph.add_node("code_critic", pipeline_node("code_critic", code_critic_agent))
 
 graph.add_edge("audio", "manim")
 graph.add_edge("manim", "code_critic")
@@ -80,6 +122,14 @@ graph.add_conditional_edges("code_critic", check_code_approval)
 def check_next_step(state: AgentState):
     curriculum = state.get("curriculum")
     index = state.get("current_step_index", 0)
+
+    failure = state.get("render_failure")
+    if failure and failure["reason"] == "cancelled":
+        print("--- GRAPH: Render cancelled. Stopping. ---")
+        return END
+    if should_retry_render(state):
+        print(f"--- GRAPH: Render failed ({failure['reason']}). Regenerating the scene. ---")
+        return "manim"
     
     if curriculum and index < len(curriculum.steps):
         print(f"--- GRAPH: Looping to step {index} ---")
@@ -0,0 +1,104 @@
+import os
+import random
+from typing import Optional, Tuple
+from pipeline_stats import get_stats
+
+# Review loops (critic, code_critic) used to stop after a fixed 2 iterations.
+# The budget is now chosen from history, per agent and Step.difficulty:
+# - an extra iteration is only spent if it has historically turned enough
+#   rejections into approvals (a lower bar applies when force-approved output
+#   often fails to render, since skipping the review is then costly);
+# - without enough history the old fixed budget applies, and one iteration
+#   beyond the last one with enough history is probed (up to
+#   HARD_MAX_ITERATIONS), so the budget can grow;
+# - iterations that were cut are still probed now and then
+#   (BUDGET_EXPLORE_RATE) and rates use only the most recent reviews, so the
+#   budget can grow again when later iterations start paying off;
+# - a per-step latency budget can cut the loop short.
+
+DEFAULT_MAX_ITERATIONS = 2   # Budget without history: the first review plus one probe
+HARD_MAX_ITERATIONS = 4
+MIN_SAMPLES = 5          # Reviews needed at an iteration before trusting its rate
+MIN_APPROVAL_GAIN = 0.2  # Approval rate that makes a later iteration worthwhile
+FORCED_RENDER_OK = 0.8   # Forced output rendering worse than this halves MIN_APPROVAL_GAIN
+RECENT_REVIEWS = 50      # Reviews per iteration the approval rate is computed from
+DEFAULT_EXPLORE_RATE = 0.1
+
+def step_difficulty(state) -> str:
+    """Returns the current Step.difficulty, used to bucket the stats."""
+    curriculum = state.get("curriculum")
+    index = state.get("current_step_index", 0)
+    if curriculum and index < len(curriculum.steps):
+        return curriculum.steps[index].difficulty
+    return "unknown"
+
+def _rate(hits: int, total: int) -> Optional[float]:
+    return hits / total if total else None
+
+def explore_rate() -> float:
+    return float(os.getenv("BUDGET_EXPLORE_RATE", DEFAULT_EXPLORE_RATE))
+
+def _approvals(stats, prefix: str, iteration: int) -> Tuple[int, int]:
+    """(approved, reviewed) over the most recent reviews at an iteration."""
+    outcomes = stats.get_samples(f"{prefix}.iter{iteration}.outcome")[-RECENT_REVIEWS:]
+    if outcomes:
+        return int(sum(outcomes)), len(outcomes)
+    # Stats recorded before outcomes were kept
+    return stats.get(f"{prefix}.iter{iteration}.approved"), stats.get(f"{prefix}.iter{iteration}.reviewed")
+
+def iteration_budget(agent: str, difficulty: str, rng=random) -> int:
+    """Number of review iterations to allow before force-approving."""
+    stats = get_stats()
+    prefix = f"{agent}.{difficulty}"
+    forced_ok = _rate(stats.get(f"{prefix}.forced_render.ok"),
+                      stats.get(f"{prefix}.forced_render.ok") + stats.get(f"{prefix}.forced_render.failed"))
+    min_gain = MIN_APPROVAL_GAIN
+    if forced_ok is not None and forced_ok < FORCED_RENDER_OK:
+        min_gain /= 2
+
+    budget = 1  # The first review is always worth doing
+    for iteration in range(1, HARD_MAX_ITERATIONS):
+        approved, reviewed = _approvals(stats, prefix, iteration)
+        if reviewed < MIN_SAMPLES:
+            # Not enough history: the earlier iterations paid off (or this is
+            # the old fixed budget), so probe this one until it has enough samples
+            budget = iteration + 1
+            break
+        if approved / reviewed < min_gain:
+            # Cut, but re-probed now and then in case it has started paying off
+            if rng.random() < explore_rate():
+                budget = iteration + 1
+            break
+        budget = iteration + 1
+    return budget
+
+def latency_budget(agent: str) -> Optional[float]:
+    """Seconds a step may spend in this agent's loop (e.g. CODE_CRITIC_LATENCY_BUDGET)."""
+    value = os.getenv(f"{agent.upper()}_LATENCY_BUDGET") or os.getenv("STEP_LATENCY_BUDGET")
+    return float(value) if value else None
+
+def should_review(agent: str, difficulty: str, iteration: int, elapsed: Optional[float]) -> Tuple[bool, str]:
+    """Decides whether another review iteration is worth its LLM calls."""
+    budget = iteration_budget(agent, difficulty)
+    if iteration >= budget:
+        return False, f"iteration budget of {budget} reached"
+
+    limit = latency_budget(agent)
+    if limit is not None and elapsed is not None and iteration > 0:
+        # Average cost of an iteration so far predicts the next one
+        per_iteration = elapsed / iteration
+        if elapsed + per_iteration > limit:
+            return False, f"latency budget of {limit:.0f}s would be exceeded"
+    return True, f"iteration {iteration + 1}/{budget}"
+
+def record_review(agent: str, difficulty: str, iteration: int, approved: bool):
+    """Records a review decision made at the given iteration."""
+    stats = get_stats()
+    prefix = f"{agent}.{difficulty}.iter{iteration}"
+    stats.increment_many({f"{prefix}.reviewed": 1, f"{prefix}.approved": int(approved)})
+    stats.add_sample(f"{prefix}.outcome", 1.0 if approved else 0.0)
+
+def record_forced_render(agent: str, difficulty: str, success: bool):
+    """Records whether output force-approved by this agent rendered."""
+    outcome = "ok" if success else "failed"
+    get_stats().increment(f"{agent}.{difficulty}.forced_render.{outcome}")
@@ -0,0 +1,340 @@
+"""Local HTTP job service wrapping `compiled_graph`.
+
+Jobs are kept in a SQLite queue (sessions/jobs.db) and executed by
+long-lived worker processes that import the graph and create provider
+clients once. Interactive jobs are always claimed before bulk jobs, and
+`--interactive-workers` reserves workers that only take interactive jobs.
+
+API:
+    POST /jobs                          {"topic": "...", "priority": "interactive" | "bulk"}
+    GET  /jobs                          list jobs
+    GET  /jobs/<id>                     status and progress (node, step)
+    POST /jobs/<id>/cancel              cancel a queued or running job
+    GET  /jobs/<id>/artifacts           list downloadable videos
+    GET  /jobs/<id>/artifacts/<name>    download final_complete_video.mp4 or scene_<n>.mp4
+
+Usage:
+    python job_server.py --port 8765 --workers 2 --interactive-workers 1
+"""
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+PRIORITIES = {"interactive": 0, "bulk": 1}
+ARTIFACT_NAME = re.compile(r"^(final_complete_video|scene_\d+)\.mp4$")
+
+class JobCancelled(Exception):
+    pass
+
+class JobStore:
+    """Persistent job queue backed by SQLite."""
+
+    def __init__(self, path: str = "sessions/jobs.db"):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    worker TEXT,
+                    node TEXT,
+                    step_index INTEGER,
+                    total_steps INTEGER,
+                    session_dir TEXT,
+                    video TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def submit(self, topic: str, priority: str) -> dict:
+        """Queues a job; an active job for the same topic is returned instead."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE topic = ? AND status IN ('queued', 'running')", (topic,)
+            ).fetchone()
+            if row:
+                # Promote a queued bulk job if an interactive request arrives for it
+                if PRIORITIES[priority] < row["priority"]:
+                    conn.execute("UPDATE jobs SET priority = ? WHERE id = ?", (PRIORITIES[priority], row["id"]))
+                conn.execute("COMMIT")
+                return self.get(row["id"])
+            job_id = uuid.uuid4().hex[:12]
+            conn.execute(
+                "INSERT INTO jobs (id, topic, priority, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, topic, PRIORITIES[priority], time.time()),
+            )
+            conn.execute("COMMIT")
+        return self.get(job_id)
+
+    def claim(self, worker: str, interactive_only: bool = False) -> Optional[dict]:
+        """Atomically takes the highest-priority, oldest queued job."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            query = "SELECT id FROM jobs WHERE status = 'queued'"
+            if interactive_only:
+                query += f" AND priority = {PRIORITIES['interactive']}"
+            row = conn.execute(query + " ORDER BY priority, created_at LIMIT 1").fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ? WHERE id = ?",
+                (worker, time.time(), row["id"]),
+            )
+            conn.execute("COMMIT")
+        return self.get(row["id"])
+
+    def update(self, job_id: str, **fields):
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        return bool(job and job["cancel_requested"])
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self) -> list:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC").fetchall()
+        return [dict(row) for row in rows]
+
+    def requeue_orphans(self) -> int:
+        """Requeues jobs left running by a previous server instance."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND cancel_requested = 0"
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE status = 'running'", (time.time(),)
+            )
+        return cursor.rowcount
+
+def describe(job: dict) -> dict:
+    """Public view of a job row."""
+    view = dict(job)
+    view["priority"] = next(name for name, value in PRIORITIES.items() if value == job["priority"])
+    view["cancel_requested"] = bool(job["cancel_requested"])
+    return view
+
+def list_artifacts(job: dict) -> list:
+    if not job.get("session_dir"):
+        return []
+    video_dir = Path(job["session_dir"]) / "videos"
+    if not video_dir.exists():
+        return []
+    return sorted(p.name for p in video_dir.iterdir() if ARTIFACT_NAME.match(p.name))
+
+# --- Workers ---
+
+def run_job(store: JobStore, job: dict, compiled_graph, build_initial_state, recursion_limit: int):
+    """Streams the graph for one job, recording progress after every node."""
+    from session_manager import SessionManager
+    from tracing import start_trace, stop_trace
+    from render_limits import cancel_active_renders
+
+    session = SessionManager(job["topic"])
+    store.update(job["id"], session_dir=str(session.session_dir))
+    state = build_initial_state(session)
+    tracer = start_trace(job["topic"])
+    # A running render is killed as soon as the job is cancelled, not at the next node
+    done = threading.Event()
+
+    def watch_cancel():
+        while not done.wait(1.0):
+            if store.is_cancel_requested(job["id"]):
+                cancel_active_renders()
+                return
+
+    threading.Thread(target=watch_cancel, daemon=True).start()
+    try:
+        with session.running():
+            for update in compiled_graph.stream(state, {"recursion_limit": recursion_limit}, stream_mode="updates"):
+                for node, result in update.items():
+                    state.update(result or {})
+                    curriculum = state.get("curriculum")
+                    store.update(
+                        job["id"], node=node,
+                        step_index=state.get("current_step_index", 0),
+                        total_steps=len(curriculum.steps) if curriculum else None,
+                    )
+                # Cancellation takes effect between nodes
+                if store.is_cancel_requested(job["id"]):
+                    raise JobCancelled()
+    finally:
+        done.set()
+        if tracer:
+            tracer.export(session.session_dir)
+            stop_trace()
+    return state.get("mp4_file_path")
+
+def worker_loop(db_path: str, name: str, interactive_only: bool, poll_interval: float = 1.0):
+    """Long-lived worker: imports the graph once, then claims jobs forever."""
+    from graph import compiled_graph
+    from main import build_initial_state, RECURSION_LIMIT
+
+    store = JobStore(db_path)
+    print(f"--- JOBS: Worker {name} ready{' (interactive only)' if interactive_only else ''} ---")
+    while True:
+        job = store.claim(name, interactive_only)
+        if not job:
+            time.sleep(poll_interval)
+            continue
+        print(f"--- JOBS: Worker {name} running {job['id']} ({job['topic']}) ---")
+        try:
+            video = run_job(store, job, compiled_graph, build_initial_state, RECURSION_LIMIT)
+            status = "done" if video and os.path.exists(video) else "failed"
+            store.update(job["id"], status=status, video=video, finished_at=time.time(),
+                         error=None if status == "done" else "No final video produced")
+        except JobCancelled:
+            store.update(job["id"], status="cancelled", finished_at=time.time())
+        except Exception as e:
+            store.update(job["id"], status="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time())
+        print(f"--- JOBS: Job {job['id']} finished: {store.get(job['id'])['status']} ---")
+
+# --- HTTP API ---
+
+def make_handler(store: JobStore):
+    class JobHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload):
+            body = json.dumps(payload, indent=2).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _job_or_404(self, job_id: str) -> Optional[dict]:
+            job = store.get(job_id)
+            if not job:
+                self._send_json(404, {"error": f"Unknown job {job_id}"})
+            return job
+
+        def do_POST(self):
+            parts = [p for p in self.path.split("/") if p]
+            if parts == ["jobs"]:
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except (ValueError, json.JSONDecodeError):
+                    return self._send_json(400, {"error": "Body must be JSON"})
+                topic = str(body.get("topic", "")).strip()
+                priority = body.get("priority", "bulk")
+                if not topic or priority not in PRIORITIES:
+                    return self._send_json(400, {"error": "Need 'topic' and priority interactive|bulk"})
+                return self._send_json(201, describe(store.submit(topic, priority)))
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+                if self._job_or_404(parts[1]):
+                    self._send_json(200, describe(store.cancel(parts[1])))
+                return
+            self._send_json(404, {"error": "Not found"})
+
+        def do_GET(self):
+            parts = [p for p in self.path.split("/") if p]
+            if parts == ["jobs"]:
+                return self._send_json(200, [describe(job) for job in store.list()])
+            if len(parts) < 2 or parts[0] != "jobs":
+                return self._send_json(404, {"error": "Not found"})
+            job = self._job_or_404(parts[1])
+            if not job:
+                return
+            if len(parts) == 2:
+                return self._send_json(200, describe(job))
+            if parts[2] == "artifacts" and len(parts) == 3:
+                return self._send_json(200, list_artifacts(job))
+            if parts[2] == "artifacts" and len(parts) == 4 and parts[3] in list_artifacts(job):
+                path = Path(job["session_dir"]) / "videos" / parts[3]
+                self.send_response(200)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Content-Length", str(path.stat().st_size))
+                self.send_header("Content-Disposition", f'attachment; filename="{parts[3]}"')
+                self.end_headers()
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, self.wfile)
+                return
+            self._send_json(404, {"error": "Not found"})
+
+        def log_message(self, format, *args):
+            print(f"--- JOBS: {self.address_string()} {format % args} ---")
+
+    return JobHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Local job server for the Agentic Teacher pipeline.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="Workers that take any job")
+    parser.add_argument("--interactive-workers", type=int, default=1, help="Workers reserved for interactive jobs")
+    parser.add_argument("--db", default="sessions/jobs.db")
+    parser.add_argument("--gc-interval", type=float, default=0,
+                        help="Seconds between session GC runs (quotas from GC_* env vars); 0 disables")
+    args = parser.parse_args()
+
+    store = JobStore(args.db)
+    requeued = store.requeue_orphans()
+    if requeued:
+        print(f"--- JOBS: Requeued {requeued} job(s) from a previous run ---")
+
+    workers = []
+    for i in range(args.workers + args.interactive_workers):
+        interactive_only = i >= args.workers
+        process = multiprocessing.Process(
+            target=worker_loop, args=(args.db, f"w{i}", interactive_only), daemon=True
+        )
+        process.start()
+        workers.append(process)
+
+    if args.gc_interval:
+        from session_gc import start_background_gc
+        start_background_gc(args.gc_interval)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store))
+    print(f"--- JOBS: Listening on http://{args.host}:{args.port} with {len(workers)} worker(s) ---")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("--- JOBS: Shutting down ---")
+    finally:
+        server.server_close()
+        for process in workers:
+            process.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,33 @@
+import os
 import sys
+from typing import Optional
 from session_manager import SessionManager
+from tracing import start_trace, stop_trace
 
-try:
-    from graph import compiled_graph
-except Exception as e:
-    print("\n" + "!"*50)
-    print("CRITICAL IMPORT/CONFIGURATION ERROR")
-    print("!"*50)
-    print(f"Error: {e}")
-    print(f"Type: {type(e).__name__}")
-    print("\nThis is likely due to incompatible library versions (LangChain vs Pydantic).")
-    print("Please run the following command in your terminal to fix this:")
-    print("\n    pip install -r requirements.txt --upgrade\n")
-    print("!"*50 + "\n")
-    sys.exit(1)
+def load_graph():
+    """Imports the compiled graph on first use; a fully cached run never needs it."""
+    try:
+        from graph import compiled_graph
+    except Exception as e:
+        print("\n" + "!"*50)
+        print("CRITICAL IMPORT/CONFIGURATION ERROR")
+        print("!"*50)
+        print(f"Error: {e}")
+        print(f"Type: {type(e).__name__}")
+        print("\nThis is likely due to incompatible library versions (LangChain vs Pydantic).")
+        print("Please run the following command in your terminal to fix this:")
+        print("\n    pip install -r requirements.txt --upgrade\n")
+        print("!"*50 + "\n")
+        sys.exit(1)
+    return compiled_graph
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <topic>")
-        sys.exit(1)
-        
-    topic = sys.argv[1]
-    
-    # Initialize session manager
-    session = SessionManager(topic)
-    print(f"Starting Agentic Teacher for topic: {topic}")
-    print(f"Session directory: {session.session_dir}")
-    print("="*50)
-    
+# Each curriculum step visits ~8 nodes; LangGraph's default limit of 25 stops long curricula
+RECURSION_LIMIT = 200
+
+
+def build_initial_state(session: SessionManager) -> dict:
+    """Builds the graph input for a session, resuming from its cache."""
     # Load cached state if available
     current_step_index = session.get_cached("current_step_index") or 0
     
@@ -50,8 +49,8 @@ def main():
     from schemas.storyboard import Storyboard
     from schemas.audio import AudioMetadata
 
-    initial_state = {
-        "topic": topic,
+    return {
+        "topic": session.topic,
         "current_step_index": current_step_index,
         "curriculum": curriculum,
         "current_script": get_step_cached("script", TeachingScript),
@@ -64,10 +63,63 @@ def main():
         "mp4_file_path": get_step_cached("mp4_file_path"),
         "session": session  # Add session to state
     }
+
+
+def run_cached(session: SessionManager) -> Optional[dict]:
+    """Finishes a topic whose every step is cached without building the graph.
+
+    Only the concatenator runs, so no LLM SDK or LangGraph is imported.
+    Returns None when some step still has to be generated.
+    """
+    curriculum_data = session.get_cached("curriculum")
+    index = session.get_cached("current_step_index") or 0
+    if not curriculum_data or index < len(curriculum_data.get("steps", [])):
+        return None
+    for step in range(index):
+        video = session.get_cached(f"step_{step}_mp4_file_path")
+        if not video or not os.path.exists(video):
+            # Scene videos may have been evicted by session_gc after the final cut
+            final_video = session.get_path("videos", "final_complete_video.mp4")
+            if final_video.exists():
+                print("--- MAIN: Final video already assembled ---")
+                return {"mp4_file_path": str(final_video)}
+            return None
+
+    print("--- MAIN: All steps cached; running the concatenator only ---")
+    from agents.concatenator import concatenator_agent
+    state = build_initial_state(session)
+    state.update(concatenator_agent(state))
+    return state
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python main.py <topic>")
+        sys.exit(1)
+        
+    topic = sys.argv[1]
+    
+    # Initialize session manager
+    session = SessionManager(topic)
+    print(f"Starting Agentic Teacher for topic: {topic}")
+    print(f"Session directory: {session.session_dir}")
+    print("="*50)
+    
+    initial_state = build_initial_state(session)
     
     # Run the graph
     # Note: Using invoke for synchronous execution
-    result = compiled_graph.invoke(initial_state)
+    # With TRACE=1 a Chrome trace and a summary are written to the session directory
+    tracer = start_trace(topic)
+    try:
+        with session.running():
+            result = run_cached(session)
+            if result is None:
+                result = load_graph().invoke(initial_state, {"recursion_limit": RECURSION_LIMIT})
+    finally:
+        if tracer:
+            tracer.export(session.session_dir)
+            stop_trace()
     
     print("="*50)
     print("FINAL OUTPUT:")
@@ -0,0 +1,211 @@
+"""Host-wide cache of Text/MathTex glyph paths, shared by all render processes.
+
+Manim already keeps the SVGs it generates for Text (Pango) and MathTex
+(LaTeX -> dvi -> svg) under media/, named by the string, font, size and
+TeX template. What every render process still rebuilds cold is the parsing
+of those SVGs into Bezier paths. `install()` patches SVGMobject so the
+parsed paths of Text, MarkupText and Tex/MathTex are stored in
+GLYPH_CACHE_DIR (default media/glyph_cache), keyed by a hash of the SVG
+content (so by string, font, size and template) and the parsing settings.
+
+- Entries are written to a temporary file and renamed into place, so
+  concurrent renders never read a partial entry.
+- The cache is bounded by GLYPH_CACHE_MB (default 256); the least recently
+  used entries are evicted first.
+- With GLYPH_CACHE_STATS_PATH set, the process writes its hits, misses and
+  the build time saved there on exit; the renderer adds them to the
+  scene's render profile.
+
+The renderer appends the install call to generated scenes (GLYPH_CACHE=1).
+Report on the cache itself:
+
+    python -m manim_templates.glyph_cache
+"""
+import os
+import json
+import time
+import atexit
+import hashlib
+import tempfile
+import numpy as np
+
+DEFAULT_CACHE_DIR = "media/glyph_cache"
+DEFAULT_LIMIT_MB = 256
+EVICT_EVERY_WRITES = 50
+EVICT_TO = 0.9            # Fraction of the limit left after an eviction
+
+_stats = {"hits": 0, "misses": 0, "build_s": 0.0, "load_s": 0.0, "saved_s": 0.0}
+_writes = 0
+_installed = False
+
+def cache_dir() -> str:
+    return os.getenv("GLYPH_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+def limit_bytes() -> int:
+    return int(float(os.getenv("GLYPH_CACHE_MB", DEFAULT_LIMIT_MB)) * 1024 * 1024)
+
+def _key(mobject) -> str:
+    import manim
+    with open(mobject.get_file_path(), "rb") as f:
+        svg = f.read()
+    digest = hashlib.sha256(svg)
+    for part in (type(mobject).__name__, repr(sorted(mobject.svg_default.items())),
+                 repr(sorted(mobject.path_string_config.items())), manim.__version__):
+        digest.update(part.encode())
+    return digest.hexdigest()[:32]
+
+def _path(key: str) -> str:
+    return os.path.join(cache_dir(), key + ".npz")
+
+def _pack(submobjects, build_s: float) -> dict:
+    def rows(name):
+        arrays = [np.asarray(getattr(m, name), dtype=float).reshape(-1, 4) for m in submobjects]
+        return np.concatenate(arrays) if arrays else np.zeros((0, 4)), np.array([len(a) for a in arrays], dtype=int)
+
+    fill, fill_counts = rows("fill_rgbas")
+    stroke, stroke_counts = rows("stroke_rgbas")
+    return {
+        "points": np.concatenate([m.points for m in submobjects]) if submobjects else np.zeros((0, 3)),
+        "counts": np.array([len(m.points) for m in submobjects], dtype=int),
+        "fill": fill, "fill_counts": fill_counts,
+        "stroke": stroke, "stroke_counts": stroke_counts,
+        "stroke_width": np.array([float(m.stroke_width) for m in submobjects]),
+        "build_s": np.array(build_s),
+    }
+
+def _split(entry: dict, values: str, counts: str) -> list:
+    return np.split(entry[values], np.cumsum(entry[counts])[:-1])
+
+def _unpack(entry: dict) -> list:
+    from manim import VMobject
+    submobjects = []
+    for points, fill, stroke, width in zip(_split(entry, "points", "counts"), _split(entry, "fill", "fill_counts"),
+                                           _split(entry, "stroke", "stroke_counts"), entry["stroke_width"]):
+        mobject = VMobject()
+        mobject.points = points
+        mobject.fill_rgbas = fill
+        mobject.stroke_rgbas = stroke
+        mobject.stroke_width = float(width)
+        submobjects.append(mobject)
+    return submobjects
+
+def _load(key: str):
+    path = _path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            entry = {name: data[name] for name in data.files}
+        os.utime(path)   # Recently used; see evict()
+        return entry
+    except (OSError, ValueError, KeyError):
+        # Evicted or replaced by another process meanwhile
+        return None
+
+def _store(key: str, entry: dict):
+    global _writes
+    directory = cache_dir()
+    tmp_path = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **entry)
+        os.replace(tmp_path, _path(key))
+    except OSError:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    _writes += 1
+    if _writes % EVICT_EVERY_WRITES == 0:
+        evict()
+
+def evict() -> int:
+    """Removes the least recently used entries while the cache is over its limit; returns bytes freed."""
+    entries = []
+    try:
+        with os.scandir(cache_dir()) as it:
+            for item in it:
+                if item.name.endswith(".npz"):
+                    stat = item.stat()
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+    except OSError:
+        return 0
+    total, limit, freed = sum(size for _, size, _ in entries), limit_bytes(), 0
+    if total <= limit:
+        return 0
+    for _, size, path in sorted(entries):
+        if total - freed <= limit * EVICT_TO:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except OSError:
+            pass
+    return freed
+
+def _write_stats():
+    path = os.getenv("GLYPH_CACHE_STATS_PATH")
+    if path and (_stats["hits"] or _stats["misses"]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(_stats, f)
+
+def install() -> bool:
+    """Routes Text/MarkupText/Tex/MathTex SVG parsing through the shared cache."""
+    global _installed
+    if _installed:
+        return True
+    try:
+        from manim import Text, MarkupText, SingleStringMathTex
+        from manim.mobject.svg.svg_mobject import SVGMobject
+    except ImportError:
+        return False
+    cached_classes = (Text, MarkupText, SingleStringMathTex)
+    generate = SVGMobject.generate_mobject
+
+    def generate_mobject(self):
+        if not isinstance(self, cached_classes):
+            return generate(self)
+        try:
+            key = _key(self)
+        except (OSError, AttributeError, TypeError):
+            return generate(self)
+        started = time.perf_counter()
+        entry = _load(key)
+        if entry is not None:
+            self.add(*_unpack(entry))
+            elapsed = time.perf_counter() - started
+            _stats["hits"] += 1
+            _stats["load_s"] += elapsed
+            _stats["saved_s"] += max(float(entry["build_s"]) - elapsed, 0.0)
+            return
+        generate(self)
+        elapsed = time.perf_counter() - started
+        _stats["misses"] += 1
+        _stats["build_s"] += elapsed
+        _store(key, _pack(self.submobjects, elapsed))
+
+    SVGMobject.generate_mobject = generate_mobject
+    atexit.register(_write_stats)
+    evict()
+    _installed = True
+    return True
+
+def main():
+    entries = []
+    if os.path.isdir(cache_dir()):
+        entries = [os.path.join(cache_dir(), n) for n in os.listdir(cache_dir()) if n.endswith(".npz")]
+    size = sum(os.path.getsize(p) for p in entries)
+    build_s = 0.0
+    for path in entries:
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                build_s += float(data["build_s"])
+        except (OSError, ValueError, KeyError):
+            pass
+    print(f"{cache_dir()}: {len(entries)} entries, {size / 1024 / 1024:.1f} of {limit_bytes() / 1024 / 1024:.0f} MB")
+    print(f"Build time stored: {build_s:.1f}s (saved again on every hit)")
+    print("Per-scene hits and savings: python render_profile.py")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import numpy as np
+from manim import ParametricFunction
+from manim_templates.mesh import evaluate, to_points
+
+class MeshFunction(ParametricFunction):
+    """A ParametricFunction whose function is evaluated once over all sample times.
+
+    `func(t)` receives a NumPy array and returns (x, y[, z]) arrays.
+    `coords_to_points`, if given, maps the (n, 3) results to scene points in
+    one call (e.g. through an Axes).
+    """
+
+    def __init__(self, func, t_range=(0, 1), coords_to_points=None, **kwargs):
+        self.vector_function = func
+        self.coords_to_points = coords_to_points
+        t_min, t_max = t_range[0], t_range[1]
+        step = t_range[2] if len(t_range) > 2 else (t_max - t_min) / 200
+        super().__init__(self._point_at, t_range=[t_min, t_max, step], **kwargs)
+
+    def _point_at(self, t):
+        return self._to_scene(to_points(self.vector_function(np.array([t], dtype=float)), 1))[0]
+
+    def _to_scene(self, coords: np.ndarray) -> np.ndarray:
+        if self.coords_to_points is None:
+            return coords
+        points = np.asarray(self.coords_to_points(coords), dtype=float)
+        return points.T if points.shape[0] == 3 and points.shape[-1] != 3 else points
+
+    def generate_points(self):
+        times = np.append(np.arange(self.t_min, self.t_max, self.t_step), self.t_max)
+        points = self._to_scene(evaluate(self.vector_function, times))
+        self.start_new_path(points[0])
+        self.add_points_as_corners(points[1:])
+        if self.use_smoothing:
+            self.make_smooth()
+        return self
+
+def create_parametric_curve(func, t_range=(0, 1), **kwargs):
+    """Curve through `func(t)` = (x, y[, z]) arrays, e.g. `lambda t: (np.cos(t), np.sin(t))`."""
+    return MeshFunction(func, t_range=t_range, **kwargs)
+
+def create_graph(axes, func, x_range=None, **kwargs):
+    """Graph of `func(x)` on `axes`, like `axes.plot(func)`; `func` receives a NumPy array."""
+    if x_range is None:
+        x_range = axes.x_range[:2]
+    dimensions = len(axes.get_axes())
+    graph = MeshFunction(lambda x: (x, func(x)), t_range=x_range,
+                         coords_to_points=lambda coords: axes.coords_to_point(*coords[:, :dimensions].T), **kwargs)
+    graph.underlying_function = func
+    return graph
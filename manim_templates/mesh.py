@@ -0,0 +1,145 @@
+"""Vectorized evaluation of geometry functions with an on-disk cache.
+
+Manim's Surface and ParametricFunction call their Python function once per
+point. The templates in surface.py and graph.py instead evaluate the function
+once over NumPy arrays of all sample points, and keep the results in
+GEOMETRY_CACHE_DIR (default media/geometry_cache), keyed by the function's
+source and the sample points (i.e. its ranges and resolution). The cache is
+shared by every render process on the host.
+"""
+import os
+import hashlib
+import inspect
+import tempfile
+import types
+from typing import Optional
+import numpy as np
+
+DEFAULT_CACHE_DIR = "media/geometry_cache"
+_PLAIN_VALUES = (int, float, complex, str, bytes, bool, type(None), type(Ellipsis))
+_CONSTANT_TYPES = (types.ModuleType, type, types.BuiltinFunctionType, np.ufunc)
+
+def cache_dir() -> str:
+    return os.getenv("GEOMETRY_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+class _Uncacheable(Exception):
+    """A function uses a value whose state a key can't capture."""
+
+def _describe_constant(value) -> str:
+    # Modules, classes and builtins are identified by name
+    return f"{getattr(value, '__module__', None) or ''}.{getattr(value, '__qualname__', None) or value.__name__}"
+
+def function_key(func, _seen=None) -> Optional[str]:
+    """Identifies what a function computes: its source and code, plus the values it uses.
+
+    Functions it closes over or calls from module scope are included
+    recursively; plain constants and arrays by value. Returns None if it
+    uses anything else, e.g. a ValueTracker whose value changes between
+    frames: its repr is the same on every frame, so the key would be too.
+    """
+    try:
+        return _function_key(func, _seen if _seen is not None else set())
+    except _Uncacheable:
+        return None
+
+def _function_key(func, seen) -> str:
+    if inspect.ismethod(func):
+        # Bound methods have their function's code but depend on the instance
+        raise _Uncacheable(func)
+    code = getattr(func, "__code__", None)
+    if code is None:
+        if isinstance(func, _CONSTANT_TYPES):
+            return _describe_constant(func)
+        raise _Uncacheable(func)
+    if id(func) in seen:
+        return code.co_name
+    seen.add(id(func))
+    parts = []
+    try:
+        parts.append(inspect.getsource(func))
+    except (OSError, TypeError):
+        pass
+
+    def describe(value):
+        if getattr(value, "__code__", None) is not None:
+            return _function_key(value, seen)
+        if inspect.iscode(value):
+            # Nested lambdas; their repr contains a memory address
+            return value.co_code.hex() + describe(value.co_consts)
+        if isinstance(value, tuple):
+            return "(" + ",".join(describe(v) for v in value) + ")"
+        if isinstance(value, np.ndarray):
+            return hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest() + str(value.shape)
+        if isinstance(value, _PLAIN_VALUES):
+            return repr(value)
+        raise _Uncacheable(value)
+
+    parts += [code.co_code.hex(), describe(code.co_consts)]
+
+    for cell in func.__closure__ or ():
+        parts.append(describe(cell.cell_contents))
+    # Module-scope names, e.g. `A = 2` used as `lambda u, v: (u, v, A * u)`.
+    # co_names also holds attribute names (the `sin` of `np.sin`); those are
+    # rarely module-scope names too, and if they are they only cost the cache
+    for name in code.co_names:
+        if name not in func.__globals__:
+            continue
+        value = func.__globals__[name]
+        if isinstance(value, _CONSTANT_TYPES):
+            parts.append(f"{name}={_describe_constant(value)}")
+        else:
+            parts.append(f"{name}={describe(value)}")
+    return "\n".join(parts)
+
+def _load(path: str):
+    try:
+        return np.load(path, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+def _store(path: str, points: np.ndarray):
+    # Write to a temporary file and rename it into place, so concurrent
+    # renders never read a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, points)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def to_points(values, count: int) -> np.ndarray:
+    """Stacks a function's (x, y[, z]) result into an (count, 3) array of points."""
+    if isinstance(values, np.ndarray) and values.ndim == 2 and values.shape[0] == count:
+        columns = [values[:, i] for i in range(values.shape[1])]
+    else:
+        columns = list(values)
+    columns = [np.broadcast_to(np.asarray(c, dtype=float), (count,)) for c in columns]
+    if len(columns) == 2:
+        columns.append(np.zeros(count))
+    return np.stack(columns[:3], axis=1)
+
+def evaluate(func, *samples: np.ndarray) -> np.ndarray:
+    """Calls `func` once with whole arrays of sample coordinates; cached on disk.
+
+    Returns an (n, 3) array of points; functions returning (x, y) get z = 0.
+    Functions without a key (see function_key) are evaluated on every call.
+    """
+    samples = [np.ascontiguousarray(s, dtype=float) for s in samples]
+    key = function_key(func)
+    if key is None:
+        with np.errstate(all="ignore"):
+            return to_points(func(*samples), len(samples[0]))
+    digest = hashlib.sha256(key.encode())
+    for s in samples:
+        digest.update(s.tobytes())
+    path = os.path.join(cache_dir(), digest.hexdigest()[:32] + ".npy")
+    points = _load(path) if os.path.exists(path) else None
+    if points is not None and points.shape == (len(samples[0]), 3):
+        return points
+    with np.errstate(all="ignore"):
+        points = to_points(func(*samples), len(samples[0]))
+    _store(path, points)
+    return points
@@ -1,8 +1,32 @@
+import numpy as np
 from manim import Surface
+from manim_templates.mesh import evaluate, to_points
 
-def create_surface():
-    return Surface(
-        lambda u, v: [u, v, 0.3*(u**2 + v**2)],
-        u_range=[-3, 3],
-        v_range=[-3, 3]
-    )
+class MeshSurface(Surface):
+    """A Surface whose function is evaluated once over all mesh points.
+
+    `func(u, v)` receives NumPy arrays and returns (x, y, z) arrays, e.g.
+    `lambda u, v: (u, v, np.sin(u) * np.cos(v))`.
+    """
+
+    def __init__(self, func, **kwargs):
+        self._vector_func = func
+        super().__init__(lambda u, v: to_points(func(np.array([u]), np.array([v])), 1)[0], **kwargs)
+        self._vector_func = None
+
+    def apply_function(self, function, **kwargs):
+        if self._vector_func is None:
+            return super().apply_function(function, **kwargs)
+        # Surface.__init__ maps the flat uv-plane faces through the function
+        faces = self.family_members_with_points()
+        uv = np.concatenate([face.points for face in faces])
+        points = evaluate(self._vector_func, uv[:, 0], uv[:, 1])
+        offsets = np.cumsum([len(face.points) for face in faces])[:-1]
+        for face, face_points in zip(faces, np.split(points, offsets)):
+            face.points = face_points
+        return self
+
+def create_surface(func=None, u_range=(-3, 3), v_range=(-3, 3), resolution=32, **kwargs):
+    if func is None:
+        func = lambda u, v: (u, v, 0.3 * (u**2 + v**2))
+    return MeshSurface(func, u_range=list(u_range), v_range=list(v_range), resolution=resolution, **kwargs)
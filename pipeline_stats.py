@@ -0,0 +1,139 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:   # Windows: updates are only serialized within a process
+    fcntl = None
+
+class PipelineStats:
+    """Persists aggregate counters and samples across runs.
+
+    Unlike the per-topic SessionManager cache, these stats are shared by all
+    sessions and are used to tune agent behaviour (skip rates, approval rates...).
+
+    Several processes (batch workers, the job server, work-queue workers)
+    update the same file: every update re-reads it under an exclusive lock
+    on `<path>.lock` and applies its change to the current contents, so
+    concurrent updates are merged instead of overwriting each other.
+    """
+
+    MAX_SAMPLES = 200
+
+    def __init__(self, path: str = "sessions/pipeline_stats.json"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._lock = threading.Lock()
+        self._version = None
+        self.data = self._load()
+
+    def _file_version(self):
+        try:
+            stat = self.path.stat()
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _load(self) -> dict:
+        """Load existing stats if available."""
+        self._version = self._file_version()
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError):
+                print(f"--- STATS: Could not read {self.path}, starting fresh ---")
+        return {"counters": {}, "samples": {}}
+
+    def _refresh(self):
+        """Reloads the file if another process has written it since it was last read."""
+        if self._file_version() != self._version:
+            self.data = self._load()
+
+    def _save(self):
+        """Save stats atomically so concurrent readers never see a partial file."""
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._version = self._file_version()
+
+    @contextmanager
+    def _update(self):
+        """Re-reads the file under the cross-process lock, yields the data to change, then saves it."""
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.data = self._load()
+                yield self.data
+                self._save()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def increment(self, key: str, amount: int = 1):
+        """Increment a named counter."""
+        self.increment_many({key: amount})
+
+    def increment_many(self, amounts: dict):
+        """Increment several counters with a single write."""
+        with self._update() as data:
+            counters = data["counters"]
+            for key, amount in amounts.items():
+                counters[key] = counters.get(key, 0) + amount
+
+    def get(self, key: str, default: int = 0) -> int:
+        """Get a counter value."""
+        with self._lock:
+            self._refresh()
+            return self.data["counters"].get(key, default)
+
+    def add_sample(self, key: str, value: float):
+        """Append a sample (e.g. a latency) to a bounded series."""
+        with self._update() as data:
+            series = data["samples"].setdefault(key, [])
+            series.append(value)
+            del series[:-self.MAX_SAMPLES]
+
+    def get_samples(self, key: str) -> List[float]:
+        """Get the samples recorded for a key."""
+        with self._lock:
+            self._refresh()
+            return list(self.data["samples"].get(key, []))
+
+_stats: Optional[PipelineStats] = None
+_stats_lock = threading.Lock()
+
+def get_stats() -> PipelineStats:
+    """Returns the process-wide stats store."""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = PipelineStats(os.getenv("PIPELINE_STATS_PATH", "sessions/pipeline_stats.json"))
+    return _stats
+
+def summarize(stats: PipelineStats) -> dict:
+    """Returns counters plus count/mean/p50/p95 for every sample series."""
+    summary = {"counters": dict(stats.data["counters"]), "samples": {}}
+    for key, series in stats.data["samples"].items():
+        ordered = sorted(series)
+        if not ordered:
+            continue
+        summary["samples"][key] = {
+            "count": len(ordered),
+            "mean": sum(ordered) / len(ordered),
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        }
+    return summary
+
+if __name__ == "__main__":
+    # Usage: python pipeline_stats.py
+    # e.g. compare storyboard.loop.* against storyboard.fused.*
+    print(json.dumps(summarize(get_stats()), indent=2))
@@ -0,0 +1,194 @@
+import os
+import sys
+import signal
+import threading
+import subprocess
+from typing import List, Optional
+from pipeline_stats import get_stats
+
+# Guards against renders that never finish (infinite loops, huge Surface
+# resolutions, giant waits):
+# - the wall-clock timeout is predicted from the storyboard and scaled by how
+#   far past predictions have been off (p95 of actual/predicted);
+# - CPU time and address space are capped with rlimits (POSIX only), set by
+#   this module run as a small launcher that execs Manim: preexec_fn is not
+#   safe here since renders start from many threads;
+# - Manim runs in its own process group so a timeout or cancellation kills
+#   it together with its ffmpeg/LaTeX children.
+
+BASE_SECONDS = 15.0             # Interpreter start, imports, partial-movie combine
+SECONDS_PER_VIDEO_SECOND = 1.5  # At -ql (480p15)
+SECONDS_PER_ANIMATION = 1.0
+SECONDS_PER_OBJECT = {"surface": 20.0, "axes": 3.0, "text": 2.0, "group": 1.0}
+DEFAULT_OBJECT_SECONDS = 0.5
+
+TIMEOUT_FACTOR = 3.0
+DEFAULT_MIN_TIMEOUT = 60.0
+DEFAULT_MAX_TIMEOUT = 900.0
+DEFAULT_MEMORY_LIMIT_MB = 4096
+MIN_RATIO_SAMPLES = 5
+KILL_GRACE_SECONDS = 5.0
+DEFAULT_RENDER_RETRIES = 1      # Codegen retries after a timeout or resource failure
+
+def expected_render_seconds(storyboard) -> float:
+    """Predicts the render time of a storyboard from its duration and contents."""
+    seconds = BASE_SECONDS + SECONDS_PER_VIDEO_SECOND * max(storyboard.duration, 0)
+    seconds += SECONDS_PER_ANIMATION * len(storyboard.animations)
+    for obj in storyboard.objects:
+        seconds += SECONDS_PER_OBJECT.get(obj.type, DEFAULT_OBJECT_SECONDS)
+    return seconds
+
+def render_timeout(storyboard) -> float:
+    """Wall-clock limit for one render: RENDER_TIMEOUT if set, otherwise adaptive."""
+    fixed = os.getenv("RENDER_TIMEOUT")
+    if fixed:
+        return float(fixed)
+    ratio = 1.0
+    samples = sorted(get_stats().get_samples("render.time_ratio"))
+    if len(samples) >= MIN_RATIO_SAMPLES:
+        ratio = max(ratio, samples[min(len(samples) - 1, int(0.95 * len(samples)))])
+    timeout = expected_render_seconds(storyboard) * ratio * TIMEOUT_FACTOR
+    low = float(os.getenv("RENDER_MIN_TIMEOUT", DEFAULT_MIN_TIMEOUT))
+    high = float(os.getenv("RENDER_MAX_TIMEOUT", DEFAULT_MAX_TIMEOUT))
+    return min(max(timeout, low), high)
+
+def record_render_time(storyboard, seconds: float):
+    """Feeds a successful render's duration back into the adaptive timeout."""
+    get_stats().add_sample("render.time_ratio", seconds / expected_render_seconds(storyboard))
+
+def cpu_limit(timeout: float) -> Optional[int]:
+    value = os.getenv("RENDER_CPU_LIMIT")
+    if value is not None:
+        return int(float(value)) or None
+    # Manim is mostly single-threaded; leave headroom for the encoder threads
+    return int(timeout * 2)
+
+def memory_limit() -> Optional[int]:
+    megabytes = int(os.getenv("RENDER_MEMORY_LIMIT_MB", DEFAULT_MEMORY_LIMIT_MB))
+    return megabytes * 1024 * 1024 if megabytes else None
+
+def apply_limits(cpu_seconds: Optional[int], memory_bytes: Optional[int]):
+    """Sets the rlimits of the current process (inherited by what it execs)."""
+    import resource
+    if cpu_seconds:
+        # Soft limit sends SIGXCPU; the hard limit a few seconds later kills
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+    if memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+def limited_command(command: List[str], timeout: float) -> List[str]:
+    """Wraps a render command in the launcher that applies the rlimits, on POSIX."""
+    if os.name != "posix":
+        return command
+    cpu_seconds, memory_bytes = cpu_limit(timeout), memory_limit()
+    if not cpu_seconds and not memory_bytes:
+        return command
+    return [sys.executable, os.path.abspath(__file__), "--cpu", str(cpu_seconds or 0),
+            "--memory", str(memory_bytes or 0), "--", *command]
+
+def popen_kwargs(timeout: float) -> dict:
+    """Process-group options for a render subprocess (see limited_command for the rlimits)."""
+    if os.name != "posix":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+def kill_process_group(process: subprocess.Popen):
+    """Terminates a render and all its children, escalating to SIGKILL."""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            process.send_signal(signal.CTRL_BREAK_EVENT)
+        process.wait(timeout=KILL_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+# --- Cancellation ---
+
+_active = set()
+_active_lock = threading.Lock()
+_cancelled = set()
+
+def register(process: subprocess.Popen):
+    with _active_lock:
+        _active.add(process)
+
+def unregister(process: subprocess.Popen) -> bool:
+    """Forgets a finished render; returns True if it was cancelled."""
+    with _active_lock:
+        _active.discard(process)
+        if process.pid in _cancelled:
+            _cancelled.discard(process.pid)
+            return True
+        return False
+
+def cancel_render(process: subprocess.Popen):
+    """Kills one registered render; its `unregister` will report it as cancelled."""
+    with _active_lock:
+        if process not in _active:
+            return
+        _cancelled.add(process.pid)
+    kill_process_group(process)
+
+def cancel_active_renders() -> int:
+    """Kills every render running in this process (e.g. when its job is cancelled)."""
+    with _active_lock:
+        processes = list(_active)
+    for process in processes:
+        cancel_render(process)
+    return len(processes)
+
+def classify_failure(returncode: Optional[int], timed_out: bool, cancelled: bool, stderr_tail: List[str]) -> str:
+    """Names why a render failed: timeout, cancelled, cpu_limit, memory_limit or error."""
+    if cancelled:
+        return "cancelled"
+    if timed_out:
+        return "timeout"
+    if returncode is not None and returncode < 0 and -returncode == getattr(signal, "SIGXCPU", None):
+        return "cpu_limit"
+    if any("MemoryError" in line or "Cannot allocate memory" in line for line in stderr_tail):
+        return "memory_limit"
+    if returncode is not None and returncode < 0 and -returncode == getattr(signal, "SIGKILL", None):
+        # Not sent by us (timeouts and cancellations are handled above): the OOM killer
+        return "memory_limit"
+    return "error"
+
+# Advice passed to the code generator after a resource failure
+FAILURE_ADVICE = {
+    "timeout": "The scene did not finish rendering within {timeout_s:.0f}s. Remove unbounded loops, "
+               "keep self.wait() durations to the audio timing and lower Surface/ParametricFunction resolution.",
+    "cpu_limit": "The render exceeded its CPU time limit. Reduce object counts, Surface resolution and "
+                 "updater-heavy animations.",
+    "memory_limit": "The render ran out of memory. Lower Surface resolution and avoid creating large numbers of mobjects.",
+    # From the last-frame preview (agents/renderer._preview_gate)
+    "preview_error": "The scene crashed before its last frame: {details}",
+    "layout": "The last-frame preview shows layout problems: {details} Keep every object inside the frame and "
+              "space labels apart (e.g. next_to with a buff, arrange, scale down).",
+}
+
+def should_retry_render(state) -> bool:
+    """True if the last render hit a resource limit or failed its preview and codegen may try again."""
+    failure = state.get("render_failure")
+    if not failure or failure["reason"] not in FAILURE_ADVICE:
+        return False
+    return state.get("render_attempts", 0) <= int(os.getenv("RENDER_RETRIES", DEFAULT_RENDER_RETRIES))
+
+def main():
+    # Launcher: python render_limits.py --cpu N --memory BYTES -- manim ...
+    args = sys.argv[1:]
+    separator = args.index("--")
+    options = dict(zip(args[:separator:2], args[1:separator:2]))
+    apply_limits(int(options.get("--cpu", 0)) or None, int(options.get("--memory", 0)) or None)
+    command = args[separator + 1:]
+    os.execvp(command[0], command)
+
+if __name__ == "__main__":
+    main()
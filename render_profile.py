@@ -0,0 +1,264 @@
+"""Render-time profiles parsed from Manim's progress output.
+
+Manim prints a tqdm progress bar per `play()` and `wait()`:
+
+    Animation 3: Create(Axes): 100%|##########| 30/30 [00:01<00:00, 21.3it/s]
+    Waiting 4: 100%|##########| 60/60 [00:00<00:00, 180.2it/s]
+
+`RenderProfiler` turns those lines into per-animation frame counts and
+timings. `render_s` is the time the progress bar was running; `setup_s` is
+the time since the previous animation finished, which is where constructing
+objects (e.g. a Surface) shows up. The renderer saves one profile per scene
+as `videos/scene_<id>.render_profile.json`, together with the storyboard's
+object types and actions.
+
+Aggregate across sessions to see which visual vocabulary is expensive:
+
+    python render_profile.py
+    python render_profile.py --sessions sessions --top 10
+"""
+import re
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter
+from typing import List, Optional
+
+# Logged instead of a progress bar when Manim reuses a partial movie file
+CACHED = re.compile(r"Animation\s+(?P<index>\d+)\s*:\s*Using cached data")
+
+PROGRESS = re.compile(
+    r"(?:Animation\s+(?P<index>\d+)\s*:\s*(?P<desc>.*?)|Waiting\s+(?P<wait>\d+))\s*:\s+(?P<percent>\d+)%\|.*?\|\s*"
+    r"(?P<frame>\d+)/(?P<frames>\d+)\s*\[(?P<elapsed>[\d:]+)"
+)
+
+# Manim animation classes -> storyboard `AnimationStep.action`
+MANIM_ACTIONS = {
+    "FadeIn": "fade_in", "Create": "fade_in", "Write": "fade_in", "DrawBorderThenFill": "fade_in",
+    "GrowFromCenter": "fade_in", "GrowArrow": "fade_in", "GrowFromPoint": "fade_in", "AddTextLetterByLetter": "fade_in",
+    "FadeOut": "fade_out", "Uncreate": "fade_out", "Unwrite": "fade_out", "ShrinkToCenter": "fade_out",
+    "Transform": "transform", "ReplacementTransform": "transform", "TransformMatchingTex": "transform",
+    "TransformMatchingShapes": "transform", "FadeTransform": "transform", "TransformFromCopy": "transform",
+    "_MethodAnimation": "move", "ApplyMethod": "move", "MoveToTarget": "move", "MoveAlongPath": "move",
+    "Rotate": "move", "Rotating": "move",
+    "Indicate": "highlight", "Circumscribe": "highlight", "Flash": "highlight", "FocusOn": "highlight",
+    "Wiggle": "highlight", "ApplyWave": "highlight", "ShowPassingFlash": "highlight",
+    "Wait": "wait",
+}
+
+# Manim mobject classes -> storyboard `VisualObject.type`
+MANIM_TYPES = {
+    "Dot": "dot", "Dot3D": "dot",
+    "Line": "line", "DashedLine": "line", "NumberLine": "line",
+    "Arrow": "arrow", "Vector": "arrow", "DoubleArrow": "arrow", "CurvedArrow": "arrow",
+    "Text": "text", "MathTex": "text", "Tex": "text", "MarkupText": "text", "Paragraph": "text",
+    "Axes": "axes", "ThreeDAxes": "axes", "NumberPlane": "axes", "ParametricFunction": "axes",
+    "Surface": "surface", "OpenGLSurface": "surface",
+    "VGroup": "group", "Group": "group", "VDict": "group",
+}
+
+def parse_progress(line: str) -> Optional[dict]:
+    match = PROGRESS.search(line)
+    if not match:
+        return None
+    if match.group("wait") is not None:
+        index, animation, mobject = int(match.group("wait")), "Wait", ""
+    else:
+        # e.g. "Write(Text('Hello'))": the mobject's class name, without its repr's arguments
+        desc = match.group("desc").replace(", etc.", "")
+        animation, _, rest = desc.partition("(")
+        index, mobject = int(match.group("index")), rest.partition("(")[0].rstrip(")").strip()
+    minutes_seconds = [int(p) for p in match.group("elapsed").split(":")]
+    elapsed = 0
+    for part in minutes_seconds:
+        elapsed = elapsed * 60 + part
+    return {
+        "index": index,
+        "animation": animation.strip(),
+        "mobject": mobject,
+        "frame": int(match.group("frame")),
+        "frames": int(match.group("frames")),
+        "elapsed": elapsed,
+    }
+
+class RenderProfiler:
+    """Collects per-animation timings from Manim output lines, fed from reader threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.animations = {}
+        self.cached = set()
+        self._last_end = self.started
+
+    def feed(self, line: str):
+        cached = CACHED.search(line)
+        if cached:
+            with self._lock:
+                self.cached.add(int(cached.group("index")))
+            return
+        progress = parse_progress(line)
+        if not progress:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            entry = self.animations.get(progress["index"])
+            if entry is None:
+                entry = {
+                    "index": progress["index"],
+                    "animation": progress["animation"],
+                    "mobject": progress["mobject"],
+                    "action": MANIM_ACTIONS.get(progress["animation"], "other"),
+                    "type": MANIM_TYPES.get(progress["mobject"]),
+                    "frames": progress["frames"],
+                    "setup_s": max(now - self._last_end, 0.0),
+                    "_start": now,
+                    "_end": now,
+                }
+                self.animations[progress["index"]] = entry
+            entry["_end"] = now
+            entry["frames"] = progress["frames"]
+            entry["tqdm_elapsed_s"] = progress["elapsed"]
+            self._last_end = now
+
+    def finish(self, returncode: Optional[int] = None) -> dict:
+        total = time.perf_counter() - self.started
+        with self._lock:
+            animations = []
+            for index in sorted(self.animations):
+                entry = dict(self.animations[index])
+                entry["render_s"] = entry.pop("_end") - entry.pop("_start")
+                animations.append(entry)
+        animation_s = sum(a["render_s"] + a["setup_s"] for a in animations)
+        return {
+            "returncode": returncode,
+            "total_s": total,
+            "animation_s": animation_s,
+            # Startup (imports, LaTeX), the time after the last animation and partial-movie combining
+            "overhead_s": max(total - animation_s, 0.0),
+            "frames": sum(a["frames"] for a in animations),
+            "animations": animations,
+            # Reused from partial movie files of an earlier render (incremental rendering)
+            "cached_animations": sorted(self.cached),
+        }
+
+def storyboard_summary(storyboard) -> dict:
+    return {
+        "scene_id": storyboard.scene_id,
+        "title": storyboard.title,
+        "duration": storyboard.duration,
+        "object_types": dict(Counter(o.type for o in storyboard.objects)),
+        "actions": dict(Counter(a.action for a in storyboard.animations)),
+    }
+
+def write_profile(path, profile: dict, storyboard=None) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if storyboard is not None:
+        profile = dict(profile, storyboard=storyboard_summary(storyboard))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+    return path
+
+# --- Aggregation ---
+
+def find_profiles(sessions_dir: str = "sessions") -> List[Path]:
+    return sorted(Path(sessions_dir).glob("*/videos/*.render_profile.json"))
+
+def aggregate(paths: List[Path]) -> dict:
+    """Sums render cost per animation action, object type and Manim class across profiles.
+
+    Object types also get the scene-level view: total render time of scenes
+    whose storyboard uses that type, to catch costs outside progress bars.
+    """
+    by_action, by_type, by_manim, scene_types = {}, {}, {}, {}
+    scenes = []
+    glyphs = {"hits": 0, "misses": 0, "saved_s": 0.0}
+
+    def add(table, key, seconds, frames):
+        entry = table.setdefault(key, {"count": 0, "seconds": 0.0, "frames": 0})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        entry["frames"] += frames
+
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+        for a in profile.get("animations", []):
+            seconds = a["render_s"] + a["setup_s"]
+            add(by_action, a["action"], seconds, a["frames"])
+            add(by_type, a["type"] or ("(wait)" if a["action"] == "wait" else "unknown"), seconds, a["frames"])
+            add(by_manim, f"{a['animation']}({a['mobject']})" if a["mobject"] else a["animation"], seconds, a["frames"])
+        glyph_cache = profile.get("glyph_cache")
+        if glyph_cache:
+            for name in glyphs:
+                glyphs[name] += glyph_cache[name]
+        storyboard = profile.get("storyboard")
+        if storyboard:
+            for object_type in storyboard["object_types"]:
+                add(scene_types, object_type, profile["total_s"], profile.get("frames", 0))
+            scenes.append({
+                "profile": str(path),
+                "title": storyboard["title"],
+                "total_s": profile["total_s"],
+                "duration": storyboard["duration"],
+                "object_types": storyboard["object_types"],
+                "glyph_cache": glyph_cache,
+            })
+    for table in (by_action, by_type, by_manim, scene_types):
+        for entry in table.values():
+            entry["mean_s"] = entry["seconds"] / entry["count"]
+    return {
+        "profiles": len(paths),
+        "by_action": by_action,
+        "by_type": by_type,
+        "by_manim_class": by_manim,
+        "scenes_using_type": scene_types,
+        "slowest_scenes": sorted(scenes, key=lambda s: s["total_s"], reverse=True),
+        # Text/MathTex glyphs reused from the shared cache (manim_templates/glyph_cache.py)
+        "glyph_cache": glyphs,
+    }
+
+def _print_table(title: str, table: dict, top: int):
+    print(f"\n{title}")
+    print(f"{'':<36} {'count':>6} {'total s':>9} {'mean s':>8} {'frames':>8}")
+    for key, entry in sorted(table.items(), key=lambda item: item[1]["seconds"], reverse=True)[:top]:
+        print(f"{key[:36]:<36} {entry['count']:>6} {entry['seconds']:>9.2f} {entry['mean_s']:>8.3f} {entry['frames']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate Manim render profiles across sessions.")
+    parser.add_argument("--sessions", default="sessions", help="Sessions directory")
+    parser.add_argument("--top", type=int, default=15, help="Rows per table")
+    parser.add_argument("--json", action="store_true", help="Print the aggregate as JSON")
+    args = parser.parse_args()
+
+    report = aggregate(find_profiles(args.sessions))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['profiles']} render profile(s)")
+    _print_table("By storyboard action", report["by_action"], args.top)
+    _print_table("By object type", report["by_type"], args.top)
+    _print_table("By Manim animation", report["by_manim_class"], args.top)
+    _print_table("Scenes using object type (whole-scene time)", report["scenes_using_type"], args.top)
+    print("\nSlowest scenes")
+    for scene in report["slowest_scenes"][:args.top]:
+        types = ", ".join(f"{t}x{n}" for t, n in scene["object_types"].items())
+        print(f"  {scene['total_s']:>7.2f}s  {scene['title'][:40]:<40} ({scene['duration']}s; {types})")
+
+    glyphs = report["glyph_cache"]
+    lookups = glyphs["hits"] + glyphs["misses"]
+    if lookups:
+        print(f"\nGlyph cache: {glyphs['hits']}/{lookups} hits ({glyphs['hits'] / lookups:.0%}), "
+              f"{glyphs['saved_s']:.2f}s saved")
+        for scene in sorted(report["slowest_scenes"], key=lambda s: (s["glyph_cache"] or {}).get("saved_s", 0),
+                            reverse=True)[:args.top]:
+            glyph_cache = scene["glyph_cache"]
+            if glyph_cache:
+                print(f"  {glyph_cache['saved_s']:>7.2f}s saved  {glyph_cache['hits']:>4} hits "
+                      f"{glyph_cache['misses']:>4} misses  {scene['title'][:40]}")
+
+if __name__ == "__main__":
+    main()
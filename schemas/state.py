@@ -17,10 +17,17 @@ class AgentState(TypedDict):
     mp4_file_path: Optional[str]
     audio_file_path: Optional[str]
     critic_iterations: int  # Track how many times we've critiqued
+    self_approved: bool  # Fused storyboard mode: the storyboard passed its own critique
+    storyboard_started_at: Optional[float]  # Wall-clock start of this step's storyboard loop
+    critic_forced: bool  # The storyboard was force-approved by the iteration budget
     
     # Code Critique Loop State
     code_critique_feedback: Optional[str]
     code_approved: bool
     code_critic_iterations: int
+    code_started_at: Optional[float]  # Wall-clock start of this step's code loop
+    code_forced: bool  # The code was force-approved by the iteration budget
+    render_failure: Optional[Dict[str, Any]]  # reason (timeout, cpu_limit, memory_limit, cancelled, error), limits, stderr tail
+    render_attempts: int  # Failed renders of this step
     
     session: Any  # SessionManager instance for caching
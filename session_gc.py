@@ -0,0 +1,325 @@
+"""Garbage collection for sessions/, media/ and manim_scenes/.
+
+Artifacts are grouped into eviction tiers and removed least-recently-used
+first, lowest tier first, until every session is under GC_SESSION_QUOTA_MB
+and everything together is under GC_TOTAL_QUOTA_MB. Intermediate artifacts
+older than GC_MAX_AGE_DAYS are removed regardless of quota. Final videos and
+session caches are never removed.
+
+Running sessions are left alone, so collection can run while topics are
+being generated (see `start_background_gc`): a run keeps a heartbeat file in
+its session (SessionManager.running), and sessions whose cache was written
+within GC_ACTIVE_SECONDS also count as running. While any session runs,
+caches shared by all sessions (Tex/text SVGs, glyph and geometry caches,
+retimed videos) are left alone too.
+
+    python session_gc.py --dry-run
+    python session_gc.py --session-quota-mb 200 --total-quota-mb 2000 --max-age-days 7
+"""
+import os
+import re
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from session_manager import HEARTBEAT_FILE, HEARTBEAT_INTERVAL
+
+DEFAULT_ACTIVE_SECONDS = 600
+HEARTBEAT_STALE = HEARTBEAT_INTERVAL * 4   # A run that stopped beating has crashed
+
+# Eviction tiers, cheapest to lose first
+INTERMEDIATE = 0   # Raw Manim output, scene sources, concat lists, state snapshots of finished topics
+REGENERABLE = 1    # Per-scene videos and audio once the final video exists, traces
+PROTECTED = {"final_complete_video.mp4", "cache.json"}   # Render profiles are kept too
+
+SCENE_MODULE = re.compile(r"^(?P<session>.+)_scene_\d+(_\w+)?$")
+CODE_ITERATION = re.compile(r"^step_(?P<step>\d+)_(?P<kind>manim_code|code_critic)_(?P<iteration>\d+)$")
+
+@dataclass
+class Artifact:
+    path: Path
+    size: int
+    last_used: float
+    tier: int
+    kind: str
+    session: Optional[str]
+
+@dataclass
+class GCConfig:
+    session_quota: Optional[int] = None   # bytes
+    total_quota: Optional[int] = None     # bytes
+    max_age: Optional[float] = None       # seconds, intermediate artifacts only
+    active_seconds: float = DEFAULT_ACTIVE_SECONDS
+    dry_run: bool = False
+
+    @classmethod
+    def from_env(cls) -> "GCConfig":
+        def megabytes(name):
+            value = os.getenv(name)
+            return int(float(value) * 1024 * 1024) if value else None
+        max_age_days = os.getenv("GC_MAX_AGE_DAYS")
+        return cls(
+            session_quota=megabytes("GC_SESSION_QUOTA_MB"),
+            total_quota=megabytes("GC_TOTAL_QUOTA_MB"),
+            max_age=float(max_age_days) * 86400 if max_age_days else None,
+            active_seconds=float(os.getenv("GC_ACTIVE_SECONDS", DEFAULT_ACTIVE_SECONDS)),
+        )
+
+def _last_used(stat: os.stat_result) -> float:
+    return max(stat.st_atime, stat.st_mtime)
+
+def _walk(root: Path):
+    # Caches replace files (write to .tmp, rename) all the time; files that
+    # vanish while walking are skipped
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = Path(directory) / name
+            try:
+                stat = path.lstat()
+            except FileNotFoundError:
+                continue
+            if not path.is_symlink():
+                yield path, stat
+
+def _age(path: Path, now: float) -> Optional[float]:
+    try:
+        return now - path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+def active_sessions(sessions_dir: Path, active_seconds: float) -> set:
+    """Sessions with a live run heartbeat or a recently written cache."""
+    now = time.time()
+    active = set()
+    if sessions_dir.exists():
+        for session_dir in sessions_dir.iterdir():
+            heartbeat = _age(session_dir / HEARTBEAT_FILE, now)
+            cache = _age(session_dir / "cache.json", now)
+            if (heartbeat is not None and heartbeat < HEARTBEAT_STALE) or (cache is not None and cache < active_seconds):
+                active.add(session_dir.name)
+    return active
+
+def scan(root: Path) -> List[Artifact]:
+    """Classifies every evictable file under sessions/, media/ and manim_scenes/."""
+    artifacts = []
+    sessions_dir = root / "sessions"
+    finished = {
+        d.name for d in sessions_dir.iterdir()
+        if (d / "videos" / "final_complete_video.mp4").exists()
+    } if sessions_dir.exists() else set()
+
+    for path, stat in _walk(sessions_dir):
+        relative = path.relative_to(sessions_dir).parts
+        if len(relative) < 2 or path.name in PROTECTED or path.name.endswith(".render_profile.json"):
+            # Files directly under sessions/ belong to the batch manifest, job store, stats...
+            continue
+        session, area = relative[0], relative[1]
+        if area in ("steps", "manim_code") or path.name == "files_to_concat.txt":
+            tier, kind = INTERMEDIATE, area if area in ("steps", "manim_code") else "concat_list"
+        elif area == "snapshots" and session in finished:
+            # The log and its blobs go together; an unfinished topic may still be resumed
+            tier, kind = INTERMEDIATE, "snapshots"
+        elif area in ("videos", "audio") and session in finished:
+            tier, kind = REGENERABLE, f"scene_{area}"
+        elif path.name in ("trace.json", "trace_summary.json"):
+            tier, kind = REGENERABLE, "trace"
+        else:
+            continue
+        artifacts.append(Artifact(path, stat.st_size, _last_used(stat), tier, kind, session))
+
+    # Manim output and scene sources are copied into the session once rendered
+    for area in ("media", "manim_scenes"):
+        for path, stat in _walk(root / area):
+            module = path.stem if area == "manim_scenes" else _media_module(path.relative_to(root / area))
+            match = SCENE_MODULE.match(module or "")
+            kind = "scene_source" if area == "manim_scenes" else "manim_media"
+            artifacts.append(Artifact(path, stat.st_size, _last_used(stat), INTERMEDIATE, kind,
+                                      match.group("session") if match else None))
+    return artifacts
+
+def _media_module(relative: Path) -> Optional[str]:
+    # media/videos/<module>/..., media/images/<module>/...; Tex/texts caches are shared
+    parts = relative.parts
+    if len(parts) >= 3 and parts[0] in ("videos", "images"):
+        return parts[1]
+    return None
+
+def prune_code_iterations(session_dir: Path, dry_run: bool = False) -> int:
+    """Drops superseded code iterations of finished steps from a session cache.
+
+    Returns the bytes reclaimed from cache.json.
+    """
+    cache_file = session_dir / "cache.json"
+    if not cache_file.exists():
+        return 0
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        cache = json.load(f)
+    completed = cache.get("current_step_index") or 0
+    latest = {}
+    for key in cache:
+        match = CODE_ITERATION.match(key)
+        if match and int(match.group("step")) < completed:
+            group = (match.group("step"), match.group("kind"))
+            latest[group] = max(latest.get(group, -1), int(match.group("iteration")))
+    stale = [
+        key for key in cache
+        if (match := CODE_ITERATION.match(key))
+        and (match.group("step"), match.group("kind")) in latest
+        and int(match.group("iteration")) < latest[(match.group("step"), match.group("kind"))]
+    ]
+    if not stale:
+        return 0
+    for key in stale:
+        del cache[key]
+    before = cache_file.stat().st_size
+    payload = json.dumps(cache, indent=2, ensure_ascii=False)
+    reclaimed = before - len(payload.encode("utf-8"))
+    if not dry_run:
+        tmp_path = cache_file.with_suffix(".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, cache_file)
+    return max(reclaimed, 0)
+
+def run_gc(root: str = ".", config: Optional[GCConfig] = None) -> dict:
+    """Evicts artifacts by age and quota; returns a report of reclaimed bytes."""
+    config = config or GCConfig.from_env()
+    root = Path(root)
+    active = active_sessions(root / "sessions", config.active_seconds)
+    # Shared caches (session None) may be read by any running session
+    artifacts = [a for a in scan(root) if a.session not in active and (a.session is not None or not active)]
+    now = time.time()
+
+    evicted: Dict[Path, Artifact] = {}
+
+    def evict(artifact: Artifact):
+        if artifact.path in evicted:
+            return
+        try:
+            if not config.dry_run:
+                artifact.path.unlink()
+            evicted[artifact.path] = artifact
+        except OSError as e:
+            print(f"--- GC: Could not remove {artifact.path}: {e} ---")
+
+    if config.max_age is not None:
+        for artifact in artifacts:
+            if artifact.tier == INTERMEDIATE and now - artifact.last_used > config.max_age:
+                evict(artifact)
+
+    def usage(candidates: List[Artifact]) -> int:
+        return sum(a.size for a in candidates if a.path not in evicted)
+
+    def enforce(candidates: List[Artifact], quota: int, protected_bytes: int):
+        over = protected_bytes + usage(candidates) - quota
+        for artifact in sorted(candidates, key=lambda a: (a.tier, a.last_used)):
+            if over <= 0:
+                break
+            if artifact.path not in evicted:
+                evict(artifact)
+                over -= artifact.size
+
+    # Usage counts everything a session owns, including its final video
+    sessions_dir = root / "sessions"
+    if config.session_quota is not None and sessions_dir.exists():
+        for session_dir in sessions_dir.iterdir():
+            if not session_dir.is_dir() or session_dir.name in active:
+                continue
+            owned = [a for a in artifacts if a.session == session_dir.name]
+            owned_paths = {a.path for a in owned}
+            protected_bytes = sum(stat.st_size for path, stat in _walk(session_dir) if path not in owned_paths)
+            enforce(owned, config.session_quota, protected_bytes)
+
+    if config.total_quota is not None:
+        known = {a.path for a in artifacts}
+        protected_bytes = sum(
+            stat.st_size
+            for area in ("sessions", "media", "manim_scenes")
+            for path, stat in _walk(root / area) if path not in known
+        )
+        enforce(artifacts, config.total_quota, protected_bytes)
+
+    cache_bytes = 0
+    if sessions_dir.exists():
+        for session_dir in sessions_dir.iterdir():
+            if session_dir.is_dir() and session_dir.name not in active:
+                cache_bytes += prune_code_iterations(session_dir, config.dry_run)
+
+    if not config.dry_run:
+        _remove_empty_dirs(root, evicted)
+
+    by_kind = {}
+    for artifact in evicted.values():
+        entry = by_kind.setdefault(artifact.kind, {"files": 0, "bytes": 0})
+        entry["files"] += 1
+        entry["bytes"] += artifact.size
+    if cache_bytes:
+        by_kind["code_iterations"] = {"files": 0, "bytes": cache_bytes}
+    return {
+        "dry_run": config.dry_run,
+        "skipped_active_sessions": sorted(active),
+        "files": len(evicted),
+        "reclaimed_bytes": sum(a.size for a in evicted.values()) + cache_bytes,
+        "by_kind": by_kind,
+    }
+
+def _remove_empty_dirs(root: Path, evicted: Dict[Path, Artifact]):
+    parents = sorted({p.parent for p in evicted}, key=lambda p: len(p.parts), reverse=True)
+    stops = {root / "sessions", root / "media", root / "manim_scenes"}
+    for directory in parents:
+        while directory not in stops and directory != root:
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+
+def start_background_gc(interval: float, root: str = ".", config: Optional[GCConfig] = None) -> threading.Thread:
+    """Runs `run_gc` every `interval` seconds in a daemon thread."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                report = run_gc(root, config)
+                if report["files"] or report["reclaimed_bytes"]:
+                    print(f"--- GC: Reclaimed {report['reclaimed_bytes'] / 1e6:.1f} MB from {report['files']} file(s) ---")
+            except Exception as e:
+                print(f"--- GC: Collection failed: {e} ---")
+
+    thread = threading.Thread(target=loop, name="session-gc", daemon=True)
+    thread.start()
+    return thread
+
+def main():
+    parser = argparse.ArgumentParser(description="Evict intermediate pipeline artifacts.")
+    parser.add_argument("--root", default=".", help="Project directory containing sessions/ and media/")
+    parser.add_argument("--session-quota-mb", type=float, help="Per-session disk quota")
+    parser.add_argument("--total-quota-mb", type=float, help="Quota for sessions/, media/ and manim_scenes/ together")
+    parser.add_argument("--max-age-days", type=float, help="Remove intermediate artifacts older than this")
+    parser.add_argument("--active-seconds", type=float, help="Skip sessions written within this many seconds")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be removed")
+    args = parser.parse_args()
+
+    config = GCConfig.from_env()
+    if args.session_quota_mb is not None:
+        config.session_quota = int(args.session_quota_mb * 1024 * 1024)
+    if args.total_quota_mb is not None:
+        config.total_quota = int(args.total_quota_mb * 1024 * 1024)
+    if args.max_age_days is not None:
+        config.max_age = args.max_age_days * 86400
+    if args.active_seconds is not None:
+        config.active_seconds = args.active_seconds
+    config.dry_run = args.dry_run
+
+    report = run_gc(args.root, config)
+    verb = "Would reclaim" if report["dry_run"] else "Reclaimed"
+    print(f"{verb} {report['reclaimed_bytes'] / 1e6:.2f} MB from {report['files']} file(s)")
+    for kind, entry in sorted(report["by_kind"].items()):
+        print(f"  {kind}: {entry['bytes'] / 1e6:.2f} MB ({entry['files']} files)")
+    if report["skipped_active_sessions"]:
+        print(f"Skipped active sessions: {', '.join(report['skipped_active_sessions'])}")
+
+if __name__ == "__main__":
+    main()
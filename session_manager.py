@@ -1,7 +1,13 @@
 import os
 import json
+import threading
 from typing import Optional
 from pathlib import Path
+from contextlib import contextmanager
+from tracing import span, event
+
+HEARTBEAT_FILE = "run.heartbeat"
+HEARTBEAT_INTERVAL = 30.0   # Seconds; session_gc treats much older heartbeats as crashed runs
 
 class SessionManager:
     """Manages session state and caching for topic-based runs."""
@@ -27,8 +33,10 @@ class SessionManager:
     
     def _save_cache(self):
         """Save cache to disk."""
-        with open(self.cache_file, 'w', encoding='utf-8') as f:
-            json.dump(self.cache, f, indent=2, ensure_ascii=False)
+        with span("session.save", cat="io") as save_span:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, indent=2, ensure_ascii=False)
+            save_span.set(bytes=self.cache_file.stat().st_size)
     
     def get_cached(self, key: str) -> Optional[dict]:
         """Get cached data for a key."""
@@ -41,12 +49,39 @@ class SessionManager:
     
     def has_cached(self, key: str) -> bool:
         """Check if key exists in cache."""
-        return key in self.cache
+        hit = key in self.cache
+        event("cache.lookup", cat="io", key=key, hit=hit)
+        return hit
     
     def get_path(self, *parts) -> Path:
         """Get a path within the session directory."""
         return self.session_dir / Path(*parts)
     
+    @contextmanager
+    def running(self):
+        """Marks the session as running for as long as the block runs.
+
+        A heartbeat file is refreshed every HEARTBEAT_INTERVAL seconds, so
+        session_gc leaves the session (and the shared caches) alone even while
+        a long render writes nothing else.
+        """
+        heartbeat = self.session_dir / HEARTBEAT_FILE
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(HEARTBEAT_INTERVAL):
+                heartbeat.touch()
+
+        heartbeat.touch()
+        thread = threading.Thread(target=beat, name="session-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+            heartbeat.unlink(missing_ok=True)
+
     def clear_cache(self):
         """Clear all cached data."""
         self.cache = {}
@@ -0,0 +1,188 @@
+"""Incremental state snapshots for graph runs.
+
+After every node, only the state keys the node changed are appended to
+`<session>/snapshots/log.jsonl`. Values larger than BLOB_THRESHOLD bytes
+(curriculum, storyboards, Manim code...) are stored once under
+`snapshots/blobs/<hash>.json`, keyed by content hash, and referenced from the
+log as {"$blob": "<hash>"}. `rebuild` replays the log to recover the full
+state after any node.
+
+Enabled by default; set SNAPSHOTS=0 to turn it off.
+
+    python snapshots.py sessions/fourier_series --list
+    python snapshots.py sessions/fourier_series --at 12 > state.json
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import functools
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BLOB_THRESHOLD = 256
+START = "__start__"
+
+def snapshots_enabled() -> bool:
+    return os.getenv("SNAPSHOTS", "1") == "1"
+
+def to_jsonable(value):
+    """Converts a state value into plain JSON data."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    return str(value)
+
+def _encode(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+class SnapshotWriter:
+    """Appends per-node deltas for one session."""
+
+    def __init__(self, session_dir):
+        self.dir = Path(session_dir) / "snapshots"
+        self.blob_dir = self.dir / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.dir / "log.jsonl"
+        self._lock = threading.Lock()
+        self._seq = 0
+        if self.log_path.exists():
+            with open(self.log_path, 'rb') as f:
+                self._seq = sum(1 for _ in f)
+        # Hash of the last recorded value per key, to skip unchanged keys
+        self._hashes: Dict[str, str] = {}
+
+    def _store(self, value) -> Tuple[object, str]:
+        """Returns the value to log (inline or a blob reference) and its hash."""
+        encoded = _encode(value)
+        digest = hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:20]
+        if len(encoded) <= BLOB_THRESHOLD:
+            return value, digest
+        blob_path = self.blob_dir / f"{digest}.json"
+        if not blob_path.exists():
+            tmp_path = blob_path.with_suffix(".tmp")
+            tmp_path.write_text(encoded, encoding="utf-8")
+            os.replace(tmp_path, blob_path)
+        return {"$blob": digest}, digest
+
+    def record(self, node: str, changes: dict) -> Optional[int]:
+        """Appends the keys that changed; returns the snapshot number, or None if nothing changed."""
+        with self._lock:
+            if node == START:
+                # A new run (or a resume) starts from a full state
+                self._hashes = {}
+            delta = {}
+            for key, value in changes.items():
+                if key == "session":
+                    continue
+                stored, digest = self._store(to_jsonable(value))
+                if self._hashes.get(key) == digest:
+                    continue
+                self._hashes[key] = digest
+                delta[key] = stored
+            if not delta and node != START:
+                return None
+            self._seq += 1
+            line = _encode({"seq": self._seq, "node": node, "ts": time.time(), "changed": delta})
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+            return self._seq
+
+_writers: Dict[str, SnapshotWriter] = {}
+_writers_lock = threading.Lock()
+
+def get_writer(session) -> SnapshotWriter:
+    key = str(session.session_dir)
+    with _writers_lock:
+        if key not in _writers:
+            _writers[key] = SnapshotWriter(session.session_dir)
+        return _writers[key]
+
+def snapshot_node(name: str, node: Callable, entry: bool = False) -> Callable:
+    """Wraps a graph node so the keys it changes are appended to the session's snapshot log.
+
+    The graph's entry node also records the full input state, which starts a run.
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        session = state.get("session")
+        enabled = session is not None and snapshots_enabled()
+        if enabled and entry:
+            get_writer(session).record(START, state)
+        update = node(state)
+        if enabled and update:
+            get_writer(session).record(name, update)
+        return update
+    return wrapper
+
+# --- Reading ---
+
+def read_log(session_dir) -> List[dict]:
+    log_path = Path(session_dir) / "snapshots" / "log.jsonl"
+    if not log_path.exists():
+        return []
+    with open(log_path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def rebuild(session_dir, at: Optional[int] = None, models: bool = False) -> dict:
+    """Returns the full state after snapshot `at` (default: the latest).
+
+    With `models=True`, curriculum, script, storyboard and audio metadata are
+    returned as their pydantic schemas instead of plain dicts.
+    """
+    entries = [e for e in read_log(session_dir) if at is None or e["seq"] <= at]
+    if not entries:
+        raise ValueError(f"No snapshots in {session_dir}" + (f" up to {at}" if at else ""))
+    # Replay from the start of the run that contains the target snapshot
+    start = max(i for i, e in enumerate(entries) if e["node"] == START) if any(
+        e["node"] == START for e in entries) else 0
+    blob_dir = Path(session_dir) / "snapshots" / "blobs"
+    state = {}
+    for entry in entries[start:]:
+        for key, value in entry["changed"].items():
+            if isinstance(value, dict) and set(value) == {"$blob"}:
+                with open(blob_dir / f"{value['$blob']}.json", 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+            state[key] = value
+    if models:
+        state = _to_models(state)
+    return state
+
+def _to_models(state: dict) -> dict:
+    from schemas.curriculum import Curriculum
+    from schemas.script import TeachingScript
+    from schemas.storyboard import Storyboard
+    from schemas.audio import AudioMetadata
+    types = {
+        "curriculum": Curriculum,
+        "current_script": TeachingScript,
+        "current_storyboard": Storyboard,
+        "current_audio_metadata": AudioMetadata,
+    }
+    return {
+        key: types[key](**value) if key in types and isinstance(value, dict) else value
+        for key, value in state.items()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or rebuild state snapshots of a session.")
+    parser.add_argument("session_dir", help="Session directory, e.g. sessions/fourier_series")
+    parser.add_argument("--list", action="store_true", help="List snapshots and the keys each changed")
+    parser.add_argument("--at", type=int, default=None, help="Snapshot number to rebuild (default: latest)")
+    args = parser.parse_args()
+
+    if args.list:
+        for entry in read_log(args.session_dir):
+            print(f"{entry['seq']:>5}  {entry['node']:<14} {', '.join(entry['changed'])}")
+        return
+    print(json.dumps(rebuild(args.session_dir, args.at), indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import os
+import time
+import hashlib
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, Optional, Tuple
+from pipeline_stats import get_stats
+
+# Speculative execution of downstream work while a reviewer is deciding.
+# With SPECULATE=1:
+# - while the critic's LLM call is in flight, audio timing and Manim codegen
+#   start for the storyboard under review;
+# - while the code critic reviews, the code is pre-rendered.
+# An approval commits the speculative result in place of the real call; a
+# rejection discards it (and kills a speculative render). Speculative work
+# never writes the session cache itself, so discarding has no side effects.
+# Streamed teacher output (STREAM_OUTPUT=1) hands speech synthesized sentence
+# by sentence to the TTS node through the same registry.
+#
+# Stats: speculation.<kind>.started / hit / discarded / stale / failed and
+# the sample series speculation.<kind>.saved (seconds of work done before
+# the consumer needed it).
+
+DEFAULT_WORKERS = 4
+
+def speculation_enabled() -> bool:
+    return os.getenv("SPECULATE", "0") == "1"
+
+def fingerprint(*parts) -> str:
+    """Hash identifying the inputs a speculative result was computed from."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if hasattr(part, "model_dump_json"):
+            part = part.model_dump_json()
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+class Speculation:
+    def __init__(self, kind: str, inputs: str, future: Future, cancel: threading.Event):
+        self.kind = kind
+        self.inputs = inputs
+        self.future = future
+        self.cancel = cancel
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending: Dict[Tuple[str, str], Speculation] = {}
+_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            workers = int(os.getenv("SPECULATION_WORKERS", DEFAULT_WORKERS))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speculate")
+        return _executor
+
+def speculation_key(session, index: int) -> str:
+    return f"{session.session_dir if session else '-'}:{index}"
+
+def _run_dedicated(context, fn: Callable, *args) -> Future:
+    """Runs `fn(*args)` on a thread of its own, for work lasting as long as an upstream call."""
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(fn, *args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="speculate-dedicated", daemon=True).start()
+    return future
+
+def speculate(kind: str, key: str, inputs: Optional[str], fn: Callable, *args, dedicated: bool = False) -> Speculation:
+    """Starts `fn(*args, cancel)` in the background; replaces any older speculation for the key.
+
+    Pass `inputs=None` when the inputs are themselves speculative (codegen
+    waiting on speculative audio timing); `fn` then returns `(inputs, result)`.
+    `dedicated=True` runs it on its own thread instead of the shared pool
+    (SPECULATION_WORKERS), so long waits don't starve other speculation.
+    """
+    discard(kind, key, reason="stale")
+    cancel = threading.Event()
+    # Run in a copy of the caller's context so spans land in the same trace
+    context = contextvars.copy_context()
+    if dedicated:
+        future = _run_dedicated(context, fn, *args, cancel)
+    else:
+        future = _get_executor().submit(context.run, fn, *args, cancel)
+    speculation = Speculation(kind, inputs, future, cancel)
+
+    def done(_):
+        speculation.finished = time.perf_counter()
+
+    future.add_done_callback(done)
+    with _lock:
+        _pending[(kind, key)] = speculation
+    get_stats().increment(f"speculation.{kind}.started")
+    print(f"--- SPECULATE: Started {kind} ---")
+    return speculation
+
+def pending(kind: str, key: str) -> Optional[Speculation]:
+    with _lock:
+        return _pending.get((kind, key))
+
+def take(kind: str, key: str, inputs: str):
+    """Commits a speculative result computed from `inputs`; None if there is none to use.
+
+    Waits for a speculation that is still running: it started earlier than
+    the real call would, so waiting is never slower than recomputing.
+    """
+    with _lock:
+        speculation = _pending.pop((kind, key), None)
+    if speculation is None:
+        return None
+    stats = get_stats()
+    if speculation.inputs is not None and speculation.inputs != inputs:
+        speculation.cancel.set()
+        stats.increment(f"speculation.{kind}.stale")
+        return None
+    needed_at = time.perf_counter()
+    try:
+        result = speculation.future.result()
+    except Exception as e:
+        print(f"--- SPECULATE: {kind} failed ({e}); running it for real ---")
+        stats.increment(f"speculation.{kind}.failed")
+        return None
+    if result is None:
+        stats.increment(f"speculation.{kind}.failed")
+        return None
+    if speculation.inputs is None:
+        computed_from, result = result
+        if computed_from != inputs:
+            stats.increment(f"speculation.{kind}.stale")
+            return None
+    finished = speculation.finished or time.perf_counter()
+    saved = max(min(needed_at, finished) - speculation.started, 0.0)
+    stats.increment(f"speculation.{kind}.hit")
+    stats.add_sample(f"speculation.{kind}.saved", saved)
+    print(f"--- SPECULATE: Committed {kind} ({saved:.1f}s of work done ahead) ---")
+    return result
+
+def discard(kind: str, key: str, reason: str = "discarded"):
+    """Cancels a speculation whose premise (an approval) did not hold."""
+    with _lock:
+        speculation = _pending.pop((kind, key), None)
+    if speculation is None:
+        return
+    speculation.cancel.set()
+    speculation.future.cancel()
+    get_stats().increment(f"speculation.{kind}.{reason}")
+    print(f"--- SPECULATE: Discarded {kind} ({reason}) ---")
+
+def report(stats=None) -> dict:
+    """Hit rate and time saved per speculation kind."""
+    stats = stats or get_stats()
+    kinds = {}
+    for kind in ("tts", "audio", "manim", "render"):
+        started = stats.get(f"speculation.{kind}.started")
+        if not started:
+            continue
+        saved = stats.get_samples(f"speculation.{kind}.saved")
+        kinds[kind] = {
+            "started": started,
+            "hit": stats.get(f"speculation.{kind}.hit"),
+            "discarded": stats.get(f"speculation.{kind}.discarded"),
+            "stale": stats.get(f"speculation.{kind}.stale"),
+            "failed": stats.get(f"speculation.{kind}.failed"),
+            "hit_rate": stats.get(f"speculation.{kind}.hit") / started,
+            "saved_s": sum(saved),
+        }
+    return kinds
+
+if __name__ == "__main__":
+    # Usage: python speculation.py
+    for kind, entry in report().items():
+        print(f"{kind:<7} hit rate {entry['hit_rate']:.0%} ({entry['hit']}/{entry['started']}, "
+              f"{entry['discarded']} discarded, {entry['stale']} stale, {entry['failed']} failed), "
+              f"{entry['saved_s']:.1f}s saved")
@@ -0,0 +1,284 @@
+import os
+import re
+import json
+import time
+from typing import Callable, Dict, List, Optional, Type, get_args, get_origin
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pipeline_stats import get_stats
+from token_budget import count_tokens
+
+# Streaming structured output. With STREAM_OUTPUT=1, `structured_generator`
+# streams the response and parses the JSON incrementally, so:
+# - agents can subscribe to top-level fields as soon as each one is complete,
+#   to list items (e.g. Storyboard.objects) one by one, and to finished
+#   sentences of a string field while it is still being generated;
+# - every completed field and list item is validated against the output
+#   schema, and the stream is aborted at the first invalid one instead of
+#   paying for the rest of a response that would fail validation anyway.
+#
+# Hedged calls (HEDGE_ENABLED) race whole responses and are not streamed; the
+# subscriptions are then replayed from the final result.
+
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+
+def streaming_enabled() -> bool:
+    return os.getenv("STREAM_OUTPUT", "0") == "1"
+
+class StreamAborted(ValueError):
+    """The partial output already fails validation."""
+
+class IncrementalJSONParser:
+    """Finds complete top-level fields and top-level list items in a growing JSON text.
+
+    Text before the first `{` (code fences, prose) is skipped. `feed` returns
+    events: ("field", name, value), ("item", name, index, value) and
+    ("text", name, prefix) for a string value that is still open.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._colon = False
+        self._value_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self._item_index = 0
+
+    def _end_value(self, end: int, events: list):
+        raw = self.buffer[self._value_start:end].strip()
+        try:
+            events.append(("field", self._key, json.loads(raw)))
+        except json.JSONDecodeError as e:
+            raise StreamAborted(f"{self._key}: malformed JSON value ({e})")
+        self._key = None
+        self._colon = False
+        self._value_start = None
+
+    def _end_item(self, end: int, events: list):
+        raw = self.buffer[self._item_start:end].strip()
+        try:
+            events.append(("item", self._key, self._item_index, json.loads(raw)))
+        except json.JSONDecodeError as e:
+            raise StreamAborted(f"{self._key}[{self._item_index}]: malformed JSON item ({e})")
+        self._item_index += 1
+        self._item_start = None
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        events = []
+        buffer = self.buffer
+        for i in range(self._pos, len(buffer)):
+            if self.done:
+                break
+            c = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(buffer[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+            if not self._stack:
+                if c == "{":
+                    self._stack.append(c)
+                continue
+            if c.isspace():
+                continue
+            depth = len(self._stack)
+            if depth == 1 and self._colon and self._value_start is None and c not in ",}":
+                self._value_start = i
+                self._item_index = 0
+            elif depth == 2 and self._stack[1] == "[" and self._item_start is None and c not in ",]":
+                self._item_start = i
+
+            if c == '"':
+                self._in_string = True
+                if depth == 1 and self._key is None:
+                    self._key_start = i
+            elif c in "{[":
+                self._stack.append(c)
+            elif c in "}]":
+                if depth == 2 and self._stack[1] == "[" and self._item_start is not None:
+                    self._end_item(i, events)
+                if depth == 1 and self._value_start is not None:
+                    self._end_value(i, events)
+                self._stack.pop()
+                if not self._stack:
+                    self.done = True
+            elif c == ",":
+                if depth == 1 and self._value_start is not None:
+                    self._end_value(i, events)
+                elif depth == 2 and self._stack[1] == "[" and self._item_start is not None:
+                    self._end_item(i, events)
+            elif c == ":" and depth == 1:
+                self._colon = True
+        self._pos = len(buffer)
+
+        if self._in_string and len(self._stack) == 1 and self._value_start is not None:
+            prefix = _decode_prefix(buffer[self._value_start + 1:])
+            if prefix is not None:
+                events.append(("text", self._key, prefix))
+        return events
+
+def _decode_prefix(raw: str) -> Optional[str]:
+    """Decodes the open part of a JSON string, dropping a trailing partial escape."""
+    for cut in range(0, 7):
+        candidate = raw[:len(raw) - cut] if cut else raw
+        try:
+            return json.loads(f'"{candidate}"')
+        except json.JSONDecodeError:
+            continue
+    return None
+
+class StructuredStream:
+    """Field subscriptions and validation for one streamed structured call."""
+
+    def __init__(self, output_schema: Type[BaseModel]):
+        self.output_schema = output_schema
+        self._fields: Dict[str, List[Callable]] = {}
+        self._items: Dict[str, List[Callable]] = {}
+        self._sentences: Dict[str, List[Callable]] = {}
+        self._restarts: List[Callable] = []
+        self._adapters: Dict[str, TypeAdapter] = {}
+        self._item_adapters: Dict[str, Optional[TypeAdapter]] = {}
+        self.restart()
+
+    def on_field(self, name: str, callback: Callable):
+        """Calls `callback(value)` with the validated value once the field is complete."""
+        self._fields.setdefault(name, []).append(callback)
+        return self
+
+    def on_item(self, name: str, callback: Callable):
+        """Calls `callback(index, item)` for each validated item of a list field."""
+        self._items.setdefault(name, []).append(callback)
+        return self
+
+    def on_sentence(self, name: str, callback: Callable):
+        """Calls `callback(sentence)` for each finished sentence of a string field."""
+        self._sentences.setdefault(name, []).append(callback)
+        return self
+
+    def on_restart(self, callback: Callable):
+        """Calls `callback()` when a retry starts over; earlier events no longer apply."""
+        self._restarts.append(callback)
+        return self
+
+    def restart(self):
+        self.parser = IncrementalJSONParser()
+        self.fields_seen: List[str] = []
+        self._sentence_offsets: Dict[str, int] = {}
+        self.first_field_at: Optional[float] = None
+        for callback in self._restarts:
+            callback()
+
+    def _adapter(self, name: str) -> Optional[TypeAdapter]:
+        field = self.output_schema.model_fields.get(name)
+        if field is None:
+            return None
+        if name not in self._adapters:
+            self._adapters[name] = TypeAdapter(field.annotation)
+        return self._adapters[name]
+
+    def _item_adapter(self, name: str) -> Optional[TypeAdapter]:
+        if name not in self._item_adapters:
+            field = self.output_schema.model_fields.get(name)
+            args = get_args(field.annotation) if field else ()
+            is_list = field is not None and get_origin(field.annotation) in (list, List)
+            self._item_adapters[name] = TypeAdapter(args[0]) if is_list and args else None
+        return self._item_adapters[name]
+
+    def _emit_sentences(self, name: str, text: str, final: bool):
+        callbacks = self._sentences.get(name)
+        if not callbacks:
+            return
+        offset = self._sentence_offsets.get(name, 0)
+        ends = [m.end() for m in SENTENCE_END.finditer(text, offset)]
+        if final and text[offset:].strip():
+            ends.append(len(text))
+        for end in ends:
+            sentence = text[offset:end].strip()
+            offset = end
+            if sentence:
+                for callback in callbacks:
+                    callback(sentence)
+        self._sentence_offsets[name] = offset
+
+    def feed(self, text: str):
+        """Consumes a chunk of the response; raises StreamAborted on invalid output."""
+        for event in self.parser.feed(text):
+            kind, name = event[0], event[1]
+            if kind == "text":
+                self._emit_sentences(name, event[2], final=False)
+            elif kind == "item":
+                adapter = self._item_adapter(name)
+                if adapter is None:
+                    continue
+                try:
+                    item = adapter.validate_python(event[3])
+                except ValidationError as e:
+                    raise StreamAborted(f"{name}[{event[2]}]: {e.errors()[0]['msg']}")
+                for callback in self._items.get(name, []):
+                    callback(event[2], item)
+            elif kind == "field":
+                adapter = self._adapter(name)
+                if adapter is None:
+                    continue
+                try:
+                    value = adapter.validate_python(event[2])
+                except ValidationError as e:
+                    raise StreamAborted(f"{name}: {e.errors()[0]['msg']}")
+                if self.first_field_at is None:
+                    self.first_field_at = time.perf_counter()
+                self.fields_seen.append(name)
+                if isinstance(value, str):
+                    self._emit_sentences(name, value, final=True)
+                for callback in self._fields.get(name, []):
+                    callback(value)
+
+    def replay(self, result: BaseModel):
+        """Delivers the subscriptions from a complete (non-streamed) result."""
+        for name in self.output_schema.model_fields:
+            value = getattr(result, name)
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    for callback in self._items.get(name, []):
+                        callback(index, item)
+            if isinstance(value, str):
+                self._emit_sentences(name, value, final=True)
+            for callback in self._fields.get(name, []):
+                callback(value)
+
+def streamed_invoke(chain, inputs: dict, stream: StructuredStream, agent: Optional[str] = None):
+    """Streams a chain's response through `stream`; returns the aggregated message.
+
+    Raises StreamAborted (after closing the stream) as soon as a completed
+    field or item fails validation.
+    """
+    message = None
+    started = time.perf_counter()
+    chunks = chain.stream(inputs)
+    try:
+        for chunk in chunks:
+            message = chunk if message is None else message + chunk
+            if isinstance(chunk.content, str) and chunk.content:
+                stream.feed(chunk.content)
+    except StreamAborted as e:
+        chunks.close()
+        received = message.content if message is not None else ""
+        stats = get_stats()
+        stats.increment(f"stream.{agent or 'unknown'}.aborted")
+        stats.add_sample(f"stream.{agent or 'unknown'}.aborted_tokens", count_tokens(received))
+        print(f"--- STREAM: Aborted {agent or 'LLM'} output after {count_tokens(received)} tokens: {e} ---")
+        raise
+    if stream.first_field_at is not None:
+        get_stats().add_sample(f"stream.{agent or 'unknown'}.first_field", stream.first_field_at - started)
+    return message
@@ -1,6 +1,4 @@
 import sys
-import json
-from datetime import datetime
 from pathlib import Path
 from langgraph.graph import StateGraph, END
 from schemas.state import AgentState
@@ -8,10 +6,12 @@ from schemas.curriculum import Curriculum, Step
 from agents.teacher import teacher_agent
 from agents.storyboard import storyboard_agent
 from agents.critic import critic_agent
-from agents.audio import audio_agent
+from agents.audio import audio_agent, tts_agent
 from agents.manim_codegen import manim_codegen_agent
 from agents.renderer import renderer_agent
 from session_manager import SessionManager
+from tracing import start_trace, stop_trace, traced_node
+from snapshots import SnapshotWriter, START
 
 # 1. Define Static Curriculum
 static_curriculum = Curriculum(
@@ -26,63 +26,32 @@ static_curriculum = Curriculum(
     ]
 )
 
-# Helper function to save state after each step
-def save_step_state(session: SessionManager, step_name: str, state: AgentState, step_number: int):
-    """Save the current state to a JSON file after each step"""
-    output_dir = session.get_path("steps")
-    output_dir.mkdir(exist_ok=True)
-    
-    # Create a serializable version of the state
-    serializable_state = {}
-    for key, value in state.items():
-        if key == "session":
-            continue  # Skip the session object itself
-        elif hasattr(value, 'model_dump'):
-            # Pydantic models
-            serializable_state[key] = value.model_dump()
-        elif isinstance(value, (str, int, float, bool, type(None))):
-            serializable_state[key] = value
-        elif isinstance(value, dict):
-            serializable_state[key] = value
-        else:
-            serializable_state[key] = str(value)
-    
-    # Add metadata
-    serializable_state['_metadata'] = {
-        'step_name': step_name,
-        'step_number': step_number,
-        'timestamp': datetime.now().isoformat()
-    }
-    
-    # Save to file
-    output_file = output_dir / f"step_{step_number:02d}_{step_name}.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(serializable_state, f, indent=2, ensure_ascii=False)
-    
-    print(f"--- Saved state to: {output_file} ---")
-
 # 2. Re-construct Graph specifically for running from Teacher onwards
 def check_approval(state: AgentState):
     if state["approved"]:
-        return "audio"
+        return "storyboard_approved"
     return "storyboard"
 
 graph = StateGraph(AgentState)
 
 # Note: We SKIP the planner node
-graph.add_node("teacher", teacher_agent)
-graph.add_node("storyboard", storyboard_agent)
-graph.add_node("critic", critic_agent)
-graph.add_node("audio", audio_agent)
-graph.add_node("manim", manim_codegen_agent)
-graph.add_node("renderer", renderer_agent)
+graph.add_node("teacher", traced_node("teacher", teacher_agent))
+graph.add_node("storyboard", traced_node("storyboard", storyboard_agent))
+graph.add_node("critic", traced_node("critic", critic_agent))
+graph.add_node("tts", traced_node("tts", tts_agent))
+graph.add_node("audio", traced_node("audio", audio_agent))
+graph.add_node("manim", traced_node("manim", manim_codegen_agent))
+graph.add_node("renderer", traced_node("renderer", renderer_agent))
+graph.add_node("storyboard_approved", lambda state: {})
 
 # Entry point is TEACHER directly
 graph.set_entry_point("teacher")
 
 graph.add_edge("teacher", "storyboard")
+graph.add_edge("teacher", "tts")
 graph.add_edge("storyboard", "critic")
 graph.add_conditional_edges("critic", check_approval)
+graph.add_edge(["tts", "storyboard_approved"], "audio")
 graph.add_edge("audio", "manim")
 graph.add_edge("manim", "renderer")
 graph.add_edge("renderer", END)
@@ -100,7 +69,6 @@ def main():
     print(f"--- Session directory: {session.session_dir} ---")
     
     # Create subdirectories for outputs
-    session.get_path("steps").mkdir(exist_ok=True)
     session.get_path("audio").mkdir(exist_ok=True)
     session.get_path("videos").mkdir(exist_ok=True)
     session.get_path("manim_code").mkdir(exist_ok=True)
@@ -120,14 +88,15 @@ def main():
         "session": session  # Add session to state
     }
 
+    tracer = start_trace("Neural Networks")
     try:
-        # Stream the graph execution to save state after each step
+        # Stream the graph execution, snapshotting the keys each node changes
         final_state = None
-        step_counter = 0
+        snapshots = SnapshotWriter(session.session_dir)
+        snapshots.record(START, initial_state)
         
         for event in test_graph.stream(initial_state):
             for node_name, result in event.items():
-                step_counter += 1
                 print(f"--- Finished node: {node_name} ---")
                 
                 # Merge result into state for saving
@@ -135,8 +104,9 @@ def main():
                     final_state = initial_state.copy()
                 final_state.update(result)
                 
-                # Save state after each step
-                save_step_state(session, node_name, final_state, step_counter)
+                seq = snapshots.record(node_name, result or {})
+                if seq:
+                    print(f"--- Saved snapshot {seq} to: {snapshots.log_path} ---")
                 
                 # Save manim code to separate file if generated
                 if node_name == "manim" and final_state.get("manim_code"):
@@ -154,7 +124,7 @@ def main():
             # Print summary
             print(f"\nSession Directory: {session.session_dir}")
             print(f"\nGenerated Files:")
-            print(f"  - Steps data: {session.get_path('steps')}")
+            print(f"  - State snapshots: {snapshots.log_path} (rebuild with snapshots.py)")
             
             audio_files = list(session.get_path("audio").glob("*.mp3"))
             if audio_files:
@@ -183,6 +153,10 @@ def main():
         import traceback
         print(f"Test run failed: {e}")
         print(traceback.format_exc())
+    finally:
+        if tracer:
+            tracer.export(session.session_dir)
+            stop_trace()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,59 @@
+import time
+import importlib
+from types import SimpleNamespace
+import pytest
+import agents.planner, agents.teacher, agents.storyboard, agents.critic, agents.audio
+import agents.manim_codegen, agents.code_critic, agents.renderer, agents.concatenator
+import graph
+
+TTS_SECONDS = 0.6
+REVIEW_SECONDS = 0.1
+
+@pytest.fixture
+def timed_graph(monkeypatch):
+    """The real graph topology with sleeping stub agents that log when they start."""
+    started = time.perf_counter()
+    log = []
+
+    def stub(name, seconds=0.0, update=None):
+        def node(state):
+            log.append((name, time.perf_counter() - started))
+            time.sleep(seconds)
+            return update(state) if update else {}
+        return node
+
+    for module, name, node in [
+        (agents.planner, "planner_agent",
+         stub("planner", update=lambda s: {"curriculum": SimpleNamespace(steps=[None]), "current_step_index": 0})),
+        (agents.teacher, "teacher_agent", stub("teacher")),
+        (agents.audio, "tts_agent", stub("tts", TTS_SECONDS)),
+        (agents.storyboard, "storyboard_agent", stub("storyboard", REVIEW_SECONDS)),
+        # Approves the second storyboard
+        (agents.critic, "critic_agent",
+         stub("critic", REVIEW_SECONDS, lambda s: {"critic_iterations": s.get("critic_iterations", 0) + 1,
+                                                   "approved": s.get("critic_iterations", 0) >= 1})),
+        (agents.audio, "audio_agent", stub("audio")),
+        (agents.manim_codegen, "manim_codegen_agent", stub("manim")),
+        (agents.code_critic, "code_critic_agent", stub("code_critic", update=lambda s: {"code_approved": True})),
+        (agents.renderer, "renderer_agent", stub("renderer", update=lambda s: {"current_step_index": 1})),
+        (agents.concatenator, "concatenator_agent", stub("concatenator")),
+    ]:
+        monkeypatch.setattr(module, name, node)
+    monkeypatch.delenv("WORK_QUEUE", raising=False)
+    yield importlib.reload(graph).compiled_graph, log
+    monkeypatch.undo()
+    importlib.reload(graph)
+
+def test_critic_loop_overlaps_tts(timed_graph):
+    compiled_graph, log = timed_graph
+    compiled_graph.invoke({"session": None}, {"recursion_limit": 50})
+    times = {}
+    for name, at in log:
+        times.setdefault(name, []).append(at)
+    teacher_done = times["teacher"][0]
+
+    assert len(times["critic"]) == 2
+    # Both reviews run while TTS is still synthesizing
+    assert times["critic"][1] - teacher_done < TTS_SECONDS - REVIEW_SECONDS / 2
+    # Audio timing waits for both branches
+    assert times["audio"][0] - teacher_done >= TTS_SECONDS
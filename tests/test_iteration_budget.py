@@ -0,0 +1,57 @@
+import pytest
+import pipeline_stats
+from pipeline_stats import PipelineStats
+from iteration_budget import DEFAULT_MAX_ITERATIONS, HARD_MAX_ITERATIONS, MIN_SAMPLES, iteration_budget, record_review
+
+class FixedRandom:
+    def __init__(self, value: float):
+        self.value = value
+
+    def random(self) -> float:
+        return self.value
+
+NEVER, ALWAYS = FixedRandom(1.0), FixedRandom(0.0)
+
+@pytest.fixture
+def stats(tmp_path, monkeypatch):
+    store = PipelineStats(str(tmp_path / "pipeline_stats.json"))
+    monkeypatch.setattr(pipeline_stats, "_stats", store)
+    return store
+
+def review(iteration: int, approved: bool, times: int = MIN_SAMPLES):
+    for _ in range(times):
+        record_review("critic", "visual", iteration, approved)
+
+def test_default_budget_without_history(stats):
+    assert iteration_budget("critic", "visual", NEVER) == DEFAULT_MAX_ITERATIONS
+
+def test_budget_grows_to_hard_max_when_later_iterations_pay_off(stats):
+    review(1, True)
+    assert iteration_budget("critic", "visual", NEVER) == 3   # Probes iteration 2
+    review(2, True)
+    assert iteration_budget("critic", "visual", NEVER) == HARD_MAX_ITERATIONS
+    review(3, True)
+    assert iteration_budget("critic", "visual", NEVER) == HARD_MAX_ITERATIONS
+
+def test_budget_shrinks_when_an_iteration_stops_paying_off(stats):
+    review(1, True)
+    review(2, True)
+    assert iteration_budget("critic", "visual", NEVER) == HARD_MAX_ITERATIONS
+    review(2, False, times=50)
+    assert iteration_budget("critic", "visual", NEVER) == DEFAULT_MAX_ITERATIONS
+    review(1, False, times=50)
+    assert iteration_budget("critic", "visual", NEVER) == 1
+
+def test_cut_iteration_is_reprobed_and_recovers(stats):
+    review(1, False, times=50)
+    assert iteration_budget("critic", "visual", NEVER) == 1
+    assert iteration_budget("critic", "visual", ALWAYS) == 2
+    # Probes that approve again replace the old rejections in the window
+    review(1, True, times=50)
+    assert iteration_budget("critic", "visual", NEVER) >= 2
+
+def test_budgets_are_kept_per_agent_and_difficulty(stats):
+    review(1, False, times=50)
+    assert iteration_budget("critic", "visual", NEVER) == 1
+    assert iteration_budget("critic", "applied", NEVER) == 2
+    assert iteration_budget("code_critic", "visual", NEVER) == 2
@@ -0,0 +1,47 @@
+import time
+from render_profile import RenderProfiler, aggregate, write_profile
+
+# Progress output of Manim 0.18 (tqdm bars are rewritten with \r; the renderer feeds each update)
+LINES = [
+    "Animation 0: Write(Text('x')):  50%|#####     | 15/30 [00:00<00:00, 40.1it/s]",
+    "Animation 0: Write(Text('x')): 100%|##########| 30/30 [00:00<00:00, 41.3it/s]",
+    "Animation 1: Write(MathTex('x^2')): 100%|##########| 30/30 [00:01<00:00, 21.3it/s]",
+    "Waiting 2: 100%|##########| 60/60 [00:00<00:00, 180.2it/s]",
+    "Animation 3 : Using cached data (hash : 2615330290_1285149484_223132457)",
+    "Animation 4: FadeOut(Text('x')), etc.: 100%|##########| 15/15 [00:00<00:00, 60.0it/s]",
+]
+
+def profile_lines(wait_seconds: float = 0.0) -> dict:
+    profiler = RenderProfiler()
+    for line in LINES:
+        profiler.feed(line)
+        if line.startswith("Waiting"):
+            time.sleep(wait_seconds)
+            profiler.feed(line)
+    return profiler.finish(0)
+
+def test_parses_manim_progress_lines():
+    profile = profile_lines()
+    animations = {a["index"]: a for a in profile["animations"]}
+    assert sorted(animations) == [0, 1, 2, 4]
+    assert (animations[0]["animation"], animations[0]["mobject"], animations[0]["type"]) == ("Write", "Text", "text")
+    assert (animations[1]["mobject"], animations[1]["type"], animations[1]["action"]) == ("MathTex", "text", "fade_in")
+    assert (animations[2]["animation"], animations[2]["action"], animations[2]["frames"]) == ("Wait", "wait", 60)
+    assert (animations[4]["action"], animations[4]["type"]) == ("fade_out", "text")
+    assert profile["cached_animations"] == [3]
+    assert profile["frames"] == 135
+
+def test_wait_time_is_not_setup_of_next_animation():
+    profile = profile_lines(wait_seconds=0.2)
+    animations = {a["index"]: a for a in profile["animations"]}
+    assert animations[2]["render_s"] >= 0.2
+    assert animations[4]["setup_s"] < 0.1
+
+def test_aggregate_reports_waits(tmp_path):
+    write_profile(tmp_path / "scene_1.render_profile.json", profile_lines())
+    report = aggregate([tmp_path / "scene_1.render_profile.json"])
+    assert report["by_action"]["wait"]["count"] == 1
+    assert report["by_type"]["(wait)"]["frames"] == 60
+    assert report["by_type"]["text"]["count"] == 3
+    assert "unknown" not in report["by_type"]
+    assert "Wait" in report["by_manim_class"] and "Write(Text)" in report["by_manim_class"]
@@ -0,0 +1,159 @@
+import os
+import json
+import math
+from typing import Optional, Tuple, TYPE_CHECKING
+from pydantic import BaseModel
+from pipeline_stats import get_stats
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+# Token accounting and compact serialization for inter-agent payloads.
+# Token counts are estimated (~4 characters per token) unless the provider
+# reports usage, which is preferred when available.
+
+CHARS_PER_TOKEN = 4
+
+# (input tokens, output tokens) per agent. Output caps are about twice the
+# longest responses seen, since a cut-off response is a wasted call.
+AGENT_BUDGETS = {
+    "planner": (1500, 2048),
+    "teacher": (1500, 1500),
+    "storyboard": (3000, 2048),
+    "critic": (4000, 1024),
+    "audio": (3000, 1500),
+    "manim": (8000, 4096),
+    "code_critic": (8000, 1536),
+}
+
+# Gemini 2.5 counts thinking tokens against max_output_tokens, so thinking
+# gets its own budget and the cap is the visible output plus that budget.
+DEFAULT_THINKING_BUDGET = 1024
+
+# Short keys used in compact payloads; the legend is sent along with them
+SHORT_KEYS = {
+    "scene_id": "scene",
+    "objects": "obj",
+    "animations": "anim",
+    "action": "act",
+    "target": "tgt",
+    "description": "desc",
+    "position": "pos",
+    "label": "lbl",
+    "duration": "dur",
+    "total_duration": "total",
+    "voice_style": "voice",
+    "segments": "seg",
+    "key_points": "points",
+}
+
+# Provider field that caps the number of generated tokens
+OUTPUT_LIMIT_FIELDS = {
+    "ChatOllama": "num_predict",
+    "ChatGoogleGenerativeAI": "max_output_tokens",
+    "ChatOpenAI": "max_tokens",
+}
+
+def count_tokens(text: str) -> int:
+    """Estimates the number of tokens in a string."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _shorten(value):
+    if isinstance(value, dict):
+        if "segments" in value and isinstance(value["segments"], list):
+            # Segment lists become [text, start_time, duration] triples
+            value = dict(value)
+            value["segments"] = [
+                [s["text"], round(s["start_time"], 2), round(s["duration"], 2)]
+                for s in value["segments"]
+            ]
+        return {SHORT_KEYS.get(k, k): _shorten(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_shorten(v) for v in value]
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+def compact(model: BaseModel, short_keys: bool = True) -> str:
+    """Serializes a model without nulls, with short keys and no whitespace.
+
+    Use short_keys=False when the LLM is expected to answer in the same schema.
+    """
+    data = model.model_dump(exclude_none=True)
+    if short_keys:
+        data = _shorten(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def legend(payload: str) -> str:
+    """Explains the short keys that appear in a compact payload."""
+    used = [f"{short}={full}" for full, short in SHORT_KEYS.items() if f'"{short}":' in payload]
+    if not used:
+        return ""
+    note = "Compact JSON, nulls omitted. Keys: " + ", ".join(used)
+    if '"seg":' in payload:
+        note += ". seg items are [text, start_time, duration]"
+    return note + "."
+
+def with_legend(prompt: str) -> str:
+    """Appends the short-key legend to a prompt containing compact payloads."""
+    note = legend(prompt)
+    return f"{prompt}\n({note})" if note else prompt
+
+def fit_to_budget(text: str, max_tokens: int) -> str:
+    """Truncates the middle of a text so it fits the token budget."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max_tokens * CHARS_PER_TOKEN
+    head, tail = text[: keep * 2 // 3], text[-(keep // 3):]
+    dropped = len(text) - len(head) - len(tail)
+    return f"{head}\n...[{dropped} characters truncated to fit the input budget]...\n{tail}"
+
+def budget_for(agent: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    return AGENT_BUDGETS.get(agent, (None, None))
+
+# Finish reasons meaning the output cap was hit (OpenAI, Gemini, Ollama)
+TRUNCATED_FINISH_REASONS = {"length", "MAX_TOKENS"}
+
+class OutputTruncatedError(Exception):
+    """The response stopped at the output token cap, so it is incomplete."""
+
+    def __init__(self, agent: Optional[str], max_tokens: Optional[int]):
+        self.agent = agent
+        self.max_tokens = max_tokens
+        super().__init__(f"{agent or 'LLM'} output was cut off at the {max_tokens}-token cap")
+
+def thinking_budget() -> int:
+    return int(os.getenv("GEMINI_THINKING_BUDGET", DEFAULT_THINKING_BUDGET))
+
+def limit_output(llm: "BaseChatModel", max_tokens: Optional[int]) -> "BaseChatModel":
+    """Returns a copy of the model capped at max_tokens visible generated tokens."""
+    field = OUTPUT_LIMIT_FIELDS.get(type(llm).__name__)
+    if not max_tokens or not field:
+        return llm
+    if type(llm).__name__ == "ChatGoogleGenerativeAI":
+        thinking = thinking_budget()
+        return llm.model_copy(update={field: max_tokens + thinking, "thinking_budget": thinking})
+    return llm.model_copy(update={field: max_tokens})
+
+def check_truncated(message, agent: Optional[str], max_tokens: Optional[int]):
+    """Raises OutputTruncatedError if the provider stopped at the output cap."""
+    metadata = getattr(message, "response_metadata", None) or {}
+    reason = metadata.get("finish_reason") or metadata.get("done_reason")
+    if reason in TRUNCATED_FINISH_REASONS:
+        raise OutputTruncatedError(agent, max_tokens)
+
+def output_tokens(message) -> int:
+    """Generated tokens for a response, from provider usage when reported."""
+    usage = getattr(message, "usage_metadata", None)
+    if usage and usage.get("output_tokens"):
+        return usage["output_tokens"]
+    return count_tokens(str(getattr(message, "content", message)))
+
+def record_usage(agent: Optional[str], input_tokens: int, generated_tokens: int):
+    """Accumulates per-agent token counts in the shared pipeline stats."""
+    name = agent or "unknown"
+    get_stats().increment_many({
+        f"tokens.{name}.calls": 1,
+        f"tokens.{name}.input": input_tokens,
+        f"tokens.{name}.output": generated_tokens,
+    })
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import threading
+import functools
+import contextvars
+from pathlib import Path
+from typing import Optional
+
+# Lightweight span tracing for the pipeline.
+# Enable with TRACE=1: every graph node, LLM call, subprocess and TTS call is
+# recorded as a timed span, and `Tracer.export` writes a Chrome trace-event
+# file (open in chrome://tracing or Perfetto) plus a JSON summary.
+# When disabled, `span()` returns a shared no-op object.
+
+# Span attributes that are meaningful to sum in the summary
+ADDITIVE_ATTRIBUTES = {"bytes", "chars", "input_tokens", "output_tokens", "inputs"}
+
+def tracing_enabled() -> bool:
+    return os.getenv("TRACE", "0") == "1"
+
+class Tracer:
+    """Collects spans for one session run."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.events = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def _ts(self, t: float) -> float:
+        # Chrome trace timestamps are microseconds
+        return (t - self._origin) * 1e6
+
+    def add_span(self, name: str, cat: str, start: float, end: float, attrs: dict):
+        event = {
+            "name": name, "cat": cat, "ph": "X",
+            "ts": self._ts(start), "dur": (end - start) * 1e6,
+            "pid": self._pid, "tid": threading.get_ident(),
+            "args": attrs,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def add_instant(self, name: str, cat: str, attrs: dict):
+        event = {
+            "name": name, "cat": cat, "ph": "i", "s": "t",
+            "ts": self._ts(time.perf_counter()),
+            "pid": self._pid, "tid": threading.get_ident(),
+            "args": attrs,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self) -> dict:
+        """Per-span-name timings plus sums of numeric and boolean attributes."""
+        spans = {}
+        instants = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            if event["ph"] == "i":
+                entry = instants.setdefault(event["name"], {"count": 0})
+                entry["count"] += 1
+                for key, value in event["args"].items():
+                    if isinstance(value, bool):
+                        entry[key] = entry.get(key, 0) + int(value)
+                continue
+            entry = spans.setdefault(event["name"], {"durations": [], "attributes": {}})
+            entry["durations"].append(event["dur"] / 1e6)
+            for key, value in event["args"].items():
+                if isinstance(value, bool) or (key in ADDITIVE_ATTRIBUTES and isinstance(value, (int, float))):
+                    entry["attributes"][key] = entry["attributes"].get(key, 0) + value
+
+        for entry in spans.values():
+            durations = sorted(entry.pop("durations"))
+            entry.update({
+                "count": len(durations),
+                "total_s": sum(durations),
+                "mean_s": sum(durations) / len(durations),
+                "p50_s": durations[len(durations) // 2],
+                "p95_s": durations[min(len(durations) - 1, int(0.95 * len(durations)))],
+                "max_s": durations[-1],
+            })
+        return {
+            "name": self.name,
+            "wall_s": time.perf_counter() - self._origin,
+            "spans": spans,
+            "events": instants,
+        }
+
+    def export(self, directory) -> Path:
+        """Writes trace.json (Chrome trace events) and trace_summary.json."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            events = list(self.events)
+        trace_path = directory / "trace.json"
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        with open(directory / "trace_summary.json", 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        print(f"--- TRACE: Wrote {len(events)} events to {trace_path} ---")
+        return trace_path
+
+_current = contextvars.ContextVar("tracer", default=None)
+
+def start_trace(name: str, force: bool = False) -> Optional[Tracer]:
+    """Starts collecting spans in the current context if tracing is enabled."""
+    if not (force or tracing_enabled()):
+        return None
+    tracer = Tracer(name)
+    _current.set(tracer)
+    return tracer
+
+def stop_trace():
+    _current.set(None)
+
+def current_tracer() -> Optional[Tracer]:
+    return _current.get()
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class _Span:
+    def __init__(self, tracer: Tracer, name: str, cat: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer.add_span(self.name, self.cat, self.start, time.perf_counter(), self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Adds attributes known only after the work is done (tokens, bytes...)."""
+        self.attrs.update(attrs)
+
+def span(name: str, cat: str = "pipeline", **attrs):
+    """Times a block of work: `with span("tts", chars=120) as s: ...; s.set(bytes=n)`."""
+    tracer = _current.get()
+    if tracer is None:
+        return NULL_SPAN
+    return _Span(tracer, name, cat, attrs)
+
+def event(name: str, cat: str = "pipeline", **attrs):
+    """Records an instant event, e.g. a cache lookup."""
+    tracer = _current.get()
+    if tracer is not None:
+        tracer.add_instant(name, cat, attrs)
+
+def traced_node(name: str, node):
+    """Wraps a graph node so each execution is recorded as a span."""
+    @functools.wraps(node)
+    def wrapper(state):
+        if _current.get() is None:
+            return node(state)
+        with span(f"node.{name}", cat="node",
+                  step=state.get("current_step_index", 0),
+                  critic_iteration=state.get("critic_iterations", 0),
+                  code_iteration=state.get("code_critic_iterations", 0)):
+            return node(state)
+    return wrapper
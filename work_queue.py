@@ -0,0 +1,322 @@
+"""Durable work queue for dispatching graph nodes to other processes or machines.
+
+Set WORK_QUEUE to a SQLite file on a filesystem every worker can reach and
+the nodes listed in QUEUED_NODES (default: renderer) are no longer run in
+the process that calls `compiled_graph.invoke`. Instead their input state is
+enqueued and the graph waits for a worker to return the node's update:
+
+    WORK_QUEUE=/shared/agentic/queue.db python main.py
+    WORK_QUEUE=/shared/agentic/queue.db python work_queue.py --nodes renderer
+
+Workers claim tasks under a lease and renew it with heartbeats while the
+node runs. A task whose lease expires (worker crashed or lost the share) is
+re-queued for another worker, up to WORK_QUEUE_MAX_ATTEMPTS attempts. A
+task no worker claims within WORK_QUEUE_CLAIM_TIMEOUT seconds (e.g. no
+workers are running) is withdrawn and the node runs in the calling process.
+
+Workers must run from the same project root on the shared filesystem so
+session paths (sessions/<topic>/...) resolve to the same files.
+"""
+import os
+import time
+import uuid
+import pickle
+import socket
+import sqlite3
+import argparse
+import functools
+import importlib
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional
+
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_CLAIM_TIMEOUT = 120.0
+POLL_INTERVAL = 0.5
+
+# Nodes a worker can run, as "module:function"
+NODES = {
+    "planner": "agents.planner:planner_agent",
+    "teacher": "agents.teacher:teacher_agent",
+    "storyboard": "agents.storyboard:storyboard_agent",
+    "critic": "agents.critic:critic_agent",
+    "tts": "agents.audio:tts_agent",
+    "audio": "agents.audio:audio_agent",
+    "manim": "agents.manim_codegen:manim_codegen_agent",
+    "code_critic": "agents.code_critic:code_critic_agent",
+    "renderer": "agents.renderer:renderer_agent",
+}
+
+class TaskFailed(Exception):
+    pass
+
+class TaskUnclaimed(TaskFailed):
+    """No worker claimed the task in time; it was withdrawn from the queue."""
+
+def lease_seconds() -> float:
+    return float(os.getenv("WORK_QUEUE_LEASE", DEFAULT_LEASE_SECONDS))
+
+def claim_timeout() -> float:
+    """Seconds a task may stay unclaimed before it is withdrawn; 0 waits forever."""
+    return float(os.getenv("WORK_QUEUE_CLAIM_TIMEOUT", DEFAULT_CLAIM_TIMEOUT))
+
+class WorkQueue:
+    """Tasks with lease-based claiming, stored in a SQLite file."""
+
+    def __init__(self, path: str, max_attempts: Optional[int] = None):
+        self.path = path
+        self.max_attempts = max_attempts or int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    finished_at REAL,
+                    result BLOB,
+                    error TEXT
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Rollback journal rather than WAL: WAL needs shared memory, which
+        # network filesystems don't provide
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, kind: str, payload) -> str:
+        task_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO tasks (id, kind, payload, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (task_id, kind, pickle.dumps(payload), time.time()),
+            )
+        return task_id
+
+    def _requeue_expired(self, conn: sqlite3.Connection) -> int:
+        now = time.time()
+        conn.execute(
+            "UPDATE tasks SET status = 'failed', finished_at = ?, error = 'Lease expired ' || attempts || ' time(s)' "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        cursor = conn.execute(
+            "UPDATE tasks SET status = 'queued', lease_owner = NULL, lease_expires = NULL "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (now,),
+        )
+        if cursor.rowcount:
+            print(f"--- QUEUE: Re-queued {cursor.rowcount} task(s) with expired leases ---")
+        return cursor.rowcount
+
+    def claim(self, owner: str, kinds: List[str], lease: float) -> Optional[dict]:
+        """Leases the oldest queued task of the given kinds."""
+        placeholders = ", ".join("?" for _ in kinds)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._requeue_expired(conn)
+            row = conn.execute(
+                f"SELECT id, kind, payload, attempts FROM tasks WHERE status = 'queued' AND kind IN ({placeholders}) "
+                "ORDER BY created_at LIMIT 1",
+                kinds,
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (owner, time.time() + lease, row["id"]),
+                )
+            conn.execute("COMMIT")
+        if not row:
+            return None
+        return {"id": row["id"], "kind": row["kind"], "payload": pickle.loads(row["payload"]),
+                "attempt": row["attempts"] + 1}
+
+    def heartbeat(self, task_id: str, owner: str, lease: float) -> bool:
+        """Extends the lease; False means the task was re-queued to someone else."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (time.time() + lease, task_id, owner),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, task_id: str, owner: str, result) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, finished_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (pickle.dumps(result), time.time(), task_id, owner),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, task_id: str, owner: str, error: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (error, time.time(), task_id, owner),
+            )
+        return cursor.rowcount == 1
+
+    def withdraw(self, task_id: str) -> bool:
+        """Removes a task nobody has claimed; False if a worker claimed it meanwhile."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'withdrawn', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), task_id),
+            )
+        return cursor.rowcount == 1
+
+    def wait(self, task_id: str, poll_interval: float = POLL_INTERVAL, timeout: Optional[float] = None):
+        """Blocks until the task is done and returns its result.
+
+        Raises TaskUnclaimed if the task stays queued for `timeout` seconds
+        (default WORK_QUEUE_CLAIM_TIMEOUT) without a worker claiming it.
+        """
+        timeout = claim_timeout() if timeout is None else timeout
+        queued_since = time.time()
+        while True:
+            # Plain reads; the write lock is only taken to recover an expired lease
+            with self._connect() as conn:
+                row = conn.execute("SELECT status, result, error, lease_expires FROM tasks WHERE id = ?",
+                                   (task_id,)).fetchone()
+            if row["status"] == "leased" and row["lease_expires"] < time.time():
+                # Waiters also recover expired leases so a queue with no
+                # live workers still surfaces failures
+                with self._connect() as conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    self._requeue_expired(conn)
+                    conn.execute("COMMIT")
+                continue
+            if row["status"] == "done":
+                return pickle.loads(row["result"])
+            if row["status"] == "failed":
+                raise TaskFailed(row["error"])
+            if row["status"] != "queued":
+                queued_since = time.time()
+            elif timeout and time.time() - queued_since > timeout and self.withdraw(task_id):
+                raise TaskUnclaimed(f"No worker claimed the task within {timeout:.0f}s")
+            time.sleep(poll_interval)
+
+    def counts(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT kind, status, COUNT(*) AS n FROM tasks GROUP BY kind, status").fetchall()
+        return {f"{row['kind']}.{row['status']}": row["n"] for row in rows}
+
+# --- Dispatching graph nodes ---
+
+def queued_nodes() -> set:
+    return {n.strip() for n in os.getenv("QUEUED_NODES", "renderer").split(",") if n.strip()}
+
+def runs_locally(name: str) -> bool:
+    """False if the node is dispatched to queue workers instead of this process."""
+    return not os.getenv("WORK_QUEUE") or name not in queued_nodes()
+
+@functools.lru_cache(maxsize=None)
+def _get_queue(path: str) -> WorkQueue:
+    return WorkQueue(path)
+
+def queued_node(name: str, node: Callable) -> Callable:
+    """Wraps a graph node so it runs on a queue worker when WORK_QUEUE is set."""
+    @functools.wraps(node)
+    def wrapper(state):
+        if runs_locally(name):
+            return node(state)
+        queue = _get_queue(os.getenv("WORK_QUEUE"))
+        task_id = queue.enqueue(name, dict(state))
+        print(f"--- QUEUE: Dispatched {name} as task {task_id[:8]} ---")
+        try:
+            result = queue.wait(task_id)
+        except TaskUnclaimed as e:
+            print(f"--- QUEUE: {e}; running {name} locally ---")
+            return node(state)
+        # Mirror the worker's session cache writes so this process doesn't
+        # drop them on its next save
+        session = state.get("session")
+        if session and result.get("cache") is not None:
+            session.cache.update(result["cache"])
+        return result["update"]
+    return wrapper
+
+def _load_node(name: str) -> Callable:
+    module_name, function_name = NODES[name].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def run_task(queue: WorkQueue, task: dict, owner: str, lease: float):
+    """Runs one node task while a heartbeat thread keeps the lease alive."""
+    stop = threading.Event()
+    lost = threading.Event()
+
+    def beat():
+        while not stop.wait(lease / 3):
+            if not queue.heartbeat(task["id"], owner, lease):
+                lost.set()
+                return
+
+    heartbeat = threading.Thread(target=beat, daemon=True)
+    heartbeat.start()
+    try:
+        state = task["payload"]
+        session = state.get("session")
+        before = dict(session.cache) if session else {}
+        update = _load_node(task["kind"])(state)
+        # Only the entries this node wrote: other branches may have updated
+        # the coordinator's cache in the meantime
+        changed = {k: v for k, v in session.cache.items() if before.get(k) != v} if session else None
+        result = {"update": update, "cache": changed}
+        if lost.is_set() or not queue.complete(task["id"], owner, result):
+            print(f"--- QUEUE: Lost lease on {task['id'][:8]}; result discarded ---")
+    except Exception as e:
+        queue.fail(task["id"], owner, f"{type(e).__name__}: {e}")
+        print(f"--- QUEUE: Task {task['id'][:8]} failed: {e} ---")
+    finally:
+        stop.set()
+        heartbeat.join()
+
+def worker(queue_path: str, nodes: List[str], max_tasks: Optional[int] = None):
+    unknown = set(nodes) - set(NODES)
+    if unknown:
+        raise ValueError(f"Unknown nodes: {', '.join(sorted(unknown))}")
+    queue = WorkQueue(queue_path)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    lease = lease_seconds()
+    # Import the node modules up front so the first task doesn't pay for it
+    for name in nodes:
+        _load_node(name)
+    print(f"--- QUEUE: Worker {owner} serving {', '.join(nodes)} from {queue_path} ---")
+    done = 0
+    while max_tasks is None or done < max_tasks:
+        task = queue.claim(owner, nodes, lease)
+        if not task:
+            time.sleep(POLL_INTERVAL)
+            continue
+        print(f"--- QUEUE: Running {task['kind']} task {task['id'][:8]} (attempt {task['attempt']}) ---")
+        run_task(queue, task, owner, lease)
+        done += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Work queue worker for dispatched graph nodes.")
+    parser.add_argument("--queue", default=os.getenv("WORK_QUEUE"), help="Queue database (default: $WORK_QUEUE)")
+    parser.add_argument("--nodes", default="renderer", help="Comma-separated nodes to serve")
+    parser.add_argument("--max-tasks", type=int, default=None, help="Exit after this many tasks")
+    parser.add_argument("--status", action="store_true", help="Print task counts and exit")
+    args = parser.parse_args()
+    if not args.queue:
+        parser.error("--queue or WORK_QUEUE is required")
+    if args.status:
+        for key, n in sorted(WorkQueue(args.queue).counts().items()):
+            print(f"{key}: {n}")
+        return
+    worker(args.queue, [n.strip() for n in args.nodes.split(",") if n.strip()], args.max_tasks)
+
+if __name__ == "__main__":
+    main()